@@ -13,15 +13,21 @@ def launch_application():
     parser.add_argument('--run-db-fixes', action='store_true', help='Run full database fixes')
     parser.add_argument('--generate-test-data', action='store_true', help='Generate test blood units')
     parser.add_argument('--test-units', type=int, default=50, help='Number of test blood units to generate (default: 50)')
+    parser.add_argument('--import-units', metavar='CSV', help='Bulk import blood units from a CSV file and exit')
+    parser.add_argument('--sweep-expired', action='store_true', help='Mark expired blood units and exit')
     args = parser.parse_args()
     
     try:
         # Set up proper Python path
         current_dir = os.path.dirname(os.path.abspath(__file__))
         sys.path.insert(0, current_dir)
+        # The application modules import each other as top-level packages
+        # (database, utils, views); importing them under a single name also
+        # keeps one process-wide connection pool.
+        sys.path.insert(0, os.path.join(current_dir, 'src'))
         
         # Test database connection
-        from src.database.connection import get_connection
+        from database.connection import get_connection, close_pool
         print("Testing database connection...")
         connection = get_connection()
         if connection:
@@ -32,23 +38,35 @@ def launch_application():
             messagebox.showerror("Database Error", "Failed to connect to the database")
             return
         
-        # Run database fixes if requested or by default
+        # Bring the schema up to date (a single version check when current)
+        from utils.migrations import run_migrations
+        if run_migrations() is None:
+            messagebox.showerror("Database Error", "Failed to update the database schema")
+            return
+        
+        # Run the legacy fix scripts only when explicitly requested
         if args.run_db_fixes:
-            from src.utils.fix_database import fix_all_database_tables
+            from utils.fix_database import fix_all_database_tables
             print("Running comprehensive database fixes...")
             fix_all_database_tables()
-        else:
-            # Just run the blood_requests fix by default
-            from src.utils.fix_database import fix_blood_requests_table
-            print("Running basic database fixes...")
-            fix_blood_requests_table()
-              # Initialize the database tables if needed
-        from src.utils.initialize_db import initialize_database
-        initialize_database()
+        
+        # Bulk import blood units without starting the GUI
+        if args.import_units:
+            from utils.bulk_intake import import_blood_units_csv
+            import_blood_units_csv(args.import_units)
+            close_pool()
+            return
+        
+        # One expiry sweep without starting the GUI
+        if args.sweep_expired:
+            from utils.expiry_sweeper import sweep_expired_units
+            sweep_expired_units()
+            close_pool()
+            return
         
         # Generate test data if requested
         if args.generate_test_data:
-            from src.utils.generate_test_data import generate_test_blood_units
+            from utils.generate_test_data import generate_test_blood_units
             print(f"Generating {args.test_units} test blood units...")
             success = generate_test_blood_units(args.test_units)
             if success:
@@ -66,13 +84,26 @@ def launch_application():
                     return
         
         # Import the main application
-        from src.app import BloodDonationApp
+        from app import BloodDonationApp
+        from database.notifications import start_listener, stop_listener
+        from utils.expiry_sweeper import start_sweeper, stop_sweeper
+        from database.instrumentation import log_summary
+        
+        # Listen for changes made by other sessions so open views stay current
+        start_listener()
+        # Mark units Expired as they pass their expiration date and keep the
+        # partitions of partitioned tables up to date
+        start_sweeper()
         
         # Launch the application
         print("Starting Blood Donation System...")
         root = tk.Tk()
         app = BloodDonationApp(root)
         root.mainloop()
+        stop_sweeper()
+        stop_listener()
+        close_pool()
+        log_summary()
         
     except Exception as e:
         messagebox.showerror("Error", f"Failed to launch application: {str(e)}")
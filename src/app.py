@@ -5,12 +5,15 @@ from database.connection import test_connection
 from views.donor_views import DonorManagementFrame
 from views.receiver_views import ReceiverManagementFrame
 from views.blood_request_views import BloodRequestManagementFrame
+from views.live_updates import LiveUpdates
 
 class BloodDonationApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Blood Donation Management System")
         self.root.geometry("1200x800")
+        # Refresh the open lists when rows change in the database
+        self.live_updates = LiveUpdates(self.root)
         self.setup_ui()
         
     def setup_ui(self):
@@ -41,22 +44,16 @@ class BloodDonationApp:
         self.notebook.add(self.blood_requests_tab, text="Blood Requests")
         
         # Set up individual tabs
-        self.donor_management = DonorManagementFrame(self.donors_tab)
+        self.donor_management = DonorManagementFrame(self.donors_tab, self.live_updates)
         self.setup_receivers_tab()
         self.setup_blood_requests_tab()
         
     def setup_receivers_tab(self):
-        self.receiver_management = ReceiverManagementFrame(self.receivers_tab)
+        self.receiver_management = ReceiverManagementFrame(self.receivers_tab, self.live_updates)
         
     def setup_blood_requests_tab(self):
         # Import blood request views and create the management frame
         
-        # Run database fixes first
-        from utils.fix_database import fix_blood_requests_table
-        from utils.fix_blood_units import create_blood_units_table
-        fix_blood_requests_table()
-        create_blood_units_table()
-        
         # Create a label to confirm the tab is active
         info_frame = tk.Frame(self.blood_requests_tab, pady=5)
         info_frame.pack(fill="x")
@@ -66,7 +63,7 @@ class BloodDonationApp:
         
         # Initialize the blood request management frame
         try:
-            self.request_management = BloodRequestManagementFrame(self.blood_requests_tab)
+            self.request_management = BloodRequestManagementFrame(self.blood_requests_tab, self.live_updates)
         except Exception as e:
             error_msg = f"Failed to load Blood Request Management: {str(e)}"
             error_label = tk.Label(self.blood_requests_tab, text=error_msg, fg="red")
@@ -88,21 +85,34 @@ def main():
             print("Database connection successful")
             connection.close()
             
-            # Initialize the database tables
-            from utils.initialize_db import initialize_database
-            initialize_database()
+            # Bring the schema up to date (a single version check when current)
+            from utils.migrations import run_migrations
+            run_migrations()
+            
+            # Listen for changes made by other sessions
+            from database.notifications import start_listener
+            start_listener()
             
-            # Fix database tables if needed
-            from utils.fix_database import fix_blood_requests_table
-            from utils.fix_blood_units import create_blood_units_table
-            fix_blood_requests_table()
-            create_blood_units_table()
+            # Mark units Expired as they pass their expiration date and
+            # keep the partitions of partitioned tables up to date
+            from utils.expiry_sweeper import start_sweeper
+            start_sweeper()
         
         # Start the application
         root = tk.Tk()
         app = BloodDonationApp(root)
         root.mainloop()
         
+        # Stop listening and release pooled database connections on exit
+        from database.connection import close_pool
+        from database.instrumentation import log_summary
+        from database.notifications import stop_listener
+        from utils.expiry_sweeper import stop_sweeper
+        stop_sweeper()
+        stop_listener()
+        close_pool()
+        log_summary()
+        
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,95 @@
+"""
+Blood Type Registry
+
+Blood_Types is a fixed lookup table, so it is read once per process and
+kept in memory. Repositories and views translate between blood_type_id and
+type_name through the registry instead of querying the table (or keeping
+their own hard-coded id maps), and can ask it which donor types a
+recipient can receive.
+"""
+
+import threading
+
+from database.connection import get_connection
+from models.blood_type import BLOOD_TYPE_COMPATIBILITY, UNIVERSAL_DONOR_TYPE
+
+
+class BloodTypeRegistry:
+    """Immutable snapshot of the Blood_Types table."""
+
+    def __init__(self, rows):
+        # rows: (blood_type_id, type_name) in blood_type_id order
+        self._names = {blood_type_id: type_name for blood_type_id, type_name in rows}
+        self._ids = {type_name: blood_type_id for blood_type_id, type_name in rows}
+
+    def id_for(self, type_name):
+        """blood_type_id of a type name such as "AB+", or None if unknown."""
+        return self._ids.get(type_name)
+
+    def name_for(self, blood_type_id):
+        """Type name of a blood_type_id, or None if unknown."""
+        return self._names.get(blood_type_id)
+
+    def names(self):
+        """All type names, in blood_type_id order (e.g. for a combobox)."""
+        return tuple(self._names.values())
+
+    def ids(self):
+        return tuple(self._names)
+
+    def compatible_donor_types(self, recipient_type):
+        """Donor type names a recipient can receive, most preferred first."""
+        return tuple(name for name in BLOOD_TYPE_COMPATIBILITY.get(recipient_type, ())
+                     if name in self._ids)
+
+    def compatible_donor_ids(self, recipient_blood_type_id):
+        """Same as compatible_donor_types, by blood_type_id."""
+        donors = self.compatible_donor_types(self.name_for(recipient_blood_type_id))
+        return tuple(self._ids[name] for name in donors)
+
+    def universal_donor_id(self):
+        return self._ids.get(UNIVERSAL_DONOR_TYPE)
+
+    def __contains__(self, type_name):
+        return type_name in self._ids
+
+    def __repr__(self):
+        return f"BloodTypeRegistry({self._names})"
+
+
+_registry = None
+_lock = threading.Lock()
+
+
+def _load_registry():
+    conn = get_connection()
+    if conn is None:
+        raise Exception("Could not connect to the database to read the blood types")
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT blood_type_id, type_name FROM Blood_Types ORDER BY blood_type_id")
+            rows = cursor.fetchall()
+        conn.rollback()
+    finally:
+        conn.close()
+
+    return BloodTypeRegistry(rows)
+
+
+def get_blood_types():
+    """Return the cached blood type registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        with _lock:
+            if _registry is None:
+                _registry = _load_registry()
+    return _registry
+
+
+def refresh_blood_types():
+    """Reload the registry, e.g. after (re)initializing the database."""
+    global _registry
+    with _lock:
+        _registry = _load_registry()
+    return _registry
@@ -0,0 +1,136 @@
+"""
+Entity Cache
+
+A small read-through cache for the repositories' by-id lookups
+(get_donor_by_id, get_receiver_by_id, get_request_by_id,
+get_blood_unit_by_id), which the views call repeatedly for the same ids.
+
+Each entity has its own bounded cache: least recently used entries are
+evicted once it is full, and entries expire after a short TTL so data
+changed by other sessions is never stale for long. Repositories invalidate
+entries when they write, and when the change listener
+(database/notifications.py) is running, changes reported by the database
+invalidate them as well.
+
+Set BLOOD_CACHE_DISABLED=1 in the environment, or call
+set_caching_enabled(False), to bypass the cache entirely (e.g. in tests).
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database.notifications import subscribe
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 30.0
+
+_enabled = os.environ.get("BLOOD_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+class EntityCache:
+    """Thread-safe LRU cache with per-entry expiry."""
+
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """
+        Return the cached value for key, calling loader() on a miss.
+        None results are not cached, so a missing row is looked up again.
+        Callers get a copy and may modify it freely.
+        """
+        if not _enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.copy(entry[0])
+            self.misses += 1
+
+        value = loader()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = (copy.copy(value), time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(table, depends_on=()):
+    """
+    Return the process-wide cache for a table's rows, keyed by primary key.
+
+    Args:
+        table: Table name as reported by the change listener (e.g. "donors")
+        depends_on: Other tables whose columns the cached rows include
+            (e.g. the receiver name of a request); any change to them
+            clears this cache
+    """
+    with _caches_lock:
+        cache = _caches.get(table)
+        if cache is None:
+            cache = _caches[table] = EntityCache(table)
+            subscribe(lambda event: _apply_change(cache, event), tables=(table,))
+            if depends_on:
+                subscribe(lambda event: cache.clear(), tables=depends_on)
+        return cache
+
+
+def _apply_change(cache, event):
+    if event.ids is None:
+        cache.clear()
+    else:
+        cache.invalidate(*event.ids)
+
+
+def set_caching_enabled(enabled):
+    """Turn the entity caches on or off; turning them off also empties them."""
+    global _enabled
+    _enabled = bool(enabled)
+    if not _enabled:
+        clear_caches()
+
+
+def clear_caches():
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.clear()
+
+
+def cache_stats():
+    """{table: {"entries", "hits", "misses"}} for every entity cache."""
+    with _caches_lock:
+        caches = dict(_caches)
+    return {table: cache.stats() for table, cache in caches.items()}
@@ -1,17 +1,100 @@
-import psycopg2
+import threading
+from contextlib import contextmanager
+
 # Use relative import instead of absolute import
 from .db_config import config
+from .instrumentation import InstrumentedCursor, instrumentation_enabled
+from .prepared import PreparingConnection
+from .pool import ConnectionPool
+
+# Defaults used when database.ini has no [pool] section
+POOL_DEFAULTS = {
+    'min_size': 1,
+    'max_size': 10,
+    'idle_timeout': 300.0,
+    'health_check_after': 30.0,
+    'checkout_timeout': 30.0,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Cursor class of pooled connections (None: InstrumentedCursor when
+# instrumentation is enabled, otherwise psycopg2's default cursor)
+_cursor_factory = None
+
+def _pool_settings():
+    """Read pool sizing from the optional [pool] section of database.ini."""
+    settings = dict(POOL_DEFAULTS)
+    try:
+        overrides = config(section='pool')
+    except Exception:
+        overrides = {}
+
+    for key, default in POOL_DEFAULTS.items():
+        if key in overrides:
+            settings[key] = type(default)(overrides[key])
+    return settings
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                params = config()  # reads 'postgresql' section from database.ini
+                # Tracks the prepared statements of each session
+                params['connection_factory'] = PreparingConnection
+                if _cursor_factory is not None:
+                    params['cursor_factory'] = _cursor_factory
+                elif instrumentation_enabled():
+                    params['cursor_factory'] = InstrumentedCursor
+                _pool = ConnectionPool(params, **_pool_settings())
+    return _pool
+
+def set_cursor_factory(factory):
+    """
+    Make pooled connections create cursors of class `factory` (a subclass of
+    psycopg2.extensions.cursor), e.g. to count or time queries. Closes the
+    current pool so that every connection handed out afterwards uses it.
+    """
+    global _cursor_factory
+    _cursor_factory = factory
+    close_pool()
 
 def get_connection():
-    """Establish and return a new database connection."""
+    """
+    Check out a connection from the pool.
+
+    Callers use it exactly like a psycopg2 connection; close() returns it
+    to the pool instead of tearing down the socket.
+    """
     try:
-        params = config()  # reads 'postgresql' section from database.ini
-        conn = psycopg2.connect(**params)
-        return conn
+        return get_pool().getconn()
     except Exception as e:
         print(f"Connection failed: {e}")
         return None
 
+@contextmanager
+def pooled_connection():
+    """Context manager yielding a pooled connection that is always returned."""
+    with get_pool().connection() as conn:
+        yield conn
+
+def get_pool_stats():
+    """Return pool counters (size, idle, in_use, waits, ...) or None before first use."""
+    if _pool is None:
+        return None
+    return _pool.stats()
+
+def close_pool():
+    """Close all pooled connections, e.g. when the application exits."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
 def test_connection():
     """Quick test to verify everything's working."""
     conn = None
@@ -28,4 +111,4 @@ def test_connection():
         return False
     finally:
         if conn is not None:
-            conn.close()
\ No newline at end of file
+            conn.close()
@@ -0,0 +1,403 @@
+"""
+Query Instrumentation
+
+Every pooled connection creates InstrumentedCursor cursors, so each
+statement any repository (or view, or utility) sends is timed; code that
+needs dict rows asks dict_cursor_factory() for an instrumented DictCursor.
+Per statement fingerprint (the SQL with literals replaced and whitespace
+collapsed) the module keeps call counts, a latency histogram, rows returned
+and the calling functions. Statements slower than slow_query_ms are written to a
+rotating slow-query log.
+
+Settings come from the optional [instrumentation] section of database.ini:
+
+    [instrumentation]
+    enabled = true
+    slow_query_ms = 200
+    log_file = slow_queries.log
+    max_bytes = 5242880
+    backup_count = 3
+
+query_summary() returns the statistics and dump_summary() prints them,
+together with the executions and estimated planning time saved of each
+prepared statement (see prepared.py); the application writes the summary
+to the log when it exits.
+
+For named (server-side) cursors only the DECLARE is timed; rows fetched
+while iterating them are not counted.
+"""
+
+import functools
+import logging
+import logging.handlers
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import psycopg2.extensions
+import psycopg2.extras
+from psycopg2 import sql
+
+from .db_config import config
+
+# Defaults used when database.ini has no [instrumentation] section
+INSTRUMENTATION_DEFAULTS = {
+    'enabled': True,
+    'slow_query_ms': 200.0,
+    'log_file': 'slow_queries.log',
+    'max_bytes': 5 * 1024 * 1024,
+    'backup_count': 3,
+}
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Callers kept per fingerprint in the summary
+TOP_CALLERS = 3
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Frames in these files are skipped when looking for the caller of a statement
+_INTERNAL_FILES = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ("instrumentation.py", "streaming.py", "prepared.py", "pool.py", "connection.py")
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+_settings = None
+_stats = {}
+# prepared statement name -> {"planning_ms", "executions", "planning_ms_saved"}
+_prepared_stats = {}
+_stats_lock = threading.Lock()
+_statements = 0
+_slow_log = None
+
+
+def _load_settings():
+    settings = dict(INSTRUMENTATION_DEFAULTS)
+    try:
+        overrides = config(section='instrumentation')
+    except Exception:
+        overrides = {}
+
+    for key, default in INSTRUMENTATION_DEFAULTS.items():
+        if key not in overrides:
+            continue
+        if isinstance(default, bool):
+            settings[key] = overrides[key].strip().lower() in ('1', 'true', 'yes', 'on')
+        else:
+            settings[key] = type(default)(overrides[key])
+    return settings
+
+
+def get_settings():
+    """Instrumentation settings, read from database.ini on first use."""
+    global _settings
+    if _settings is None:
+        _settings = _load_settings()
+    return _settings
+
+
+def instrumentation_enabled():
+    return get_settings()['enabled']
+
+
+def query_text(query, context=None):
+    """
+    SQL text of a statement passed to execute(): str, bytes or a
+    psycopg2.sql Composable. Composables are rendered with context (a
+    connection or cursor) when given; without one, literals become ? and
+    identifiers are quoted as written, which is enough for a fingerprint.
+    """
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    if isinstance(query, sql.Composable) and context is not None:
+        return query.as_string(context)
+    if isinstance(query, sql.Composed):
+        return "".join(query_text(part) for part in query.seq)
+    if isinstance(query, sql.SQL):
+        return query.string
+    if isinstance(query, sql.Identifier):
+        return ".".join('"' + name.replace('"', '""') + '"' for name in query.strings)
+    if isinstance(query, sql.Placeholder):
+        return f"%({query.name})s" if query.name else "%s"
+    if isinstance(query, sql.Literal):
+        return "?"
+    return str(query)
+
+
+def fingerprint(query):
+    """The statement with literals replaced by ? and whitespace collapsed."""
+    # Composables are not hashable, so only the text goes through the cache
+    return _fingerprint_text(query_text(query))
+
+
+@functools.lru_cache(maxsize=2048)
+def _fingerprint_text(query):
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip().rstrip(";")
+
+
+def _caller():
+    """module.function:line of the innermost frame outside the database plumbing."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_INTERNAL_FILES) and "psycopg2" not in filename \
+                and not filename.endswith("contextlib.py"):
+            module = frame.f_globals.get("__name__", "?")
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "?"
+
+
+def _get_slow_log():
+    global _slow_log
+    if _slow_log is None:
+        settings = get_settings()
+        log_file = settings['log_file']
+        if not os.path.isabs(log_file):
+            log_file = os.path.join(_PROJECT_ROOT, log_file)
+        handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=settings['max_bytes'], backupCount=settings['backup_count'], encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger = logging.getLogger("blood_donation.queries")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _slow_log = logger
+    return _slow_log
+
+
+class QueryStats:
+    """Aggregated timings of one statement fingerprint."""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        self.callers = Counter()
+
+    def add(self, duration_ms, rows, caller):
+        self.calls += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        if rows is not None:
+            self.rows += rows
+        for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.callers[caller] += 1
+
+    def percentile_ms(self, fraction):
+        """Upper bound of the histogram bucket holding the given percentile."""
+        rank = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return HISTOGRAM_BUCKETS_MS[i] if i < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": self.percentile_ms(0.50),
+            "p95_ms": self.percentile_ms(0.95),
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "histogram": dict(zip([f"<={b}" for b in HISTOGRAM_BUCKETS_MS] + ["more"], self.buckets)),
+            "callers": self.callers.most_common(TOP_CALLERS),
+        }
+
+
+def record(query, duration, rows=None):
+    """
+    Record one executed statement.
+
+    Args:
+        query: SQL as passed to execute() (str, bytes or a psycopg2.sql Composable)
+        duration: Seconds the statement took
+        rows: Rows returned or affected, None if unknown
+
+    Never raises: a failure to record is printed so that it cannot replace
+    the statement's own result or error.
+    """
+    try:
+        _record(query, duration, rows)
+    except Exception as e:
+        print(f"Could not record query statistics: {e}")
+
+
+def _record(query, duration, rows):
+    global _statements
+    key = fingerprint(query)
+    caller = _caller()
+    duration_ms = duration * 1000
+    with _stats_lock:
+        _statements += 1
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = QueryStats(key)
+        stats.add(duration_ms, rows, caller)
+
+    if duration_ms >= get_settings()['slow_query_ms']:
+        try:
+            _get_slow_log().warning(f"slow query {duration_ms:.1f} ms rows={rows} caller={caller} sql={key}")
+        except Exception as e:
+            print(f"Could not write the slow query log: {e}")
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor that records every statement it sends."""
+
+    def _rows(self):
+        # rowcount is -1 when unknown (e.g. the DECLARE of a named cursor)
+        return self.rowcount if self.rowcount >= 0 else None
+
+    def _record(self, query, started):
+        duration = time.perf_counter() - started
+        try:
+            query = query_text(query, self)
+        except Exception:
+            # e.g. the connection is already closed; fall back to the unquoted text
+            query = query_text(query)
+        record(query, duration, self._rows())
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._record(query, started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._record(query, started)
+
+    def callproc(self, procname, parameters=None):
+        started = time.perf_counter()
+        try:
+            return super().callproc(procname, parameters)
+        finally:
+            record(f"CALL {procname}", time.perf_counter() - started, self._rows())
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._record(sql, started)
+
+
+class InstrumentedDictCursor(InstrumentedCursor, psycopg2.extras.DictCursor):
+    """DictCursor that records every statement it sends."""
+
+
+def dict_cursor_factory(connection):
+    """
+    DictCursor class for connection.cursor(cursor_factory=...). Passing a
+    cursor_factory overrides the connection's own, so use this rather than
+    DictCursor to keep the statements instrumented whenever the
+    connection's cursors are.
+    """
+    factory = getattr(connection, "cursor_factory", None)
+    if isinstance(factory, type) and issubclass(factory, InstrumentedCursor):
+        return InstrumentedDictCursor
+    return psycopg2.extras.DictCursor
+
+
+def record_statement_planning(name, planning_ms):
+    """Record the measured planning time of a prepared statement."""
+    with _stats_lock:
+        stats = _prepared_stats.setdefault(name, {"planning_ms": 0.0, "executions": 0, "planning_ms_saved": 0.0})
+        stats["planning_ms"] = planning_ms
+
+
+def record_prepared_execution(name, planning_ms_saved):
+    """Record one EXECUTE of a prepared statement and the planning time it skipped."""
+    with _stats_lock:
+        stats = _prepared_stats.setdefault(name, {"planning_ms": 0.0, "executions": 0, "planning_ms_saved": 0.0})
+        stats["executions"] += 1
+        stats["planning_ms_saved"] += planning_ms_saved
+
+
+def prepared_summary():
+    """{statement name: {"planning_ms", "executions", "planning_ms_saved"}}"""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _prepared_stats.items()}
+
+
+def statement_count():
+    """Statements recorded since the process started (or the last reset)."""
+    return _statements
+
+
+def query_summary():
+    """Statistics of every fingerprint, the most total time first."""
+    with _stats_lock:
+        stats = [s.as_dict() for s in _stats.values()]
+    return sorted(stats, key=lambda s: s["total_ms"], reverse=True)
+
+
+def reset_stats():
+    global _statements
+    with _stats_lock:
+        _stats.clear()
+        _prepared_stats.clear()
+        _statements = 0
+
+
+def format_summary(limit=20):
+    """The summary as text, one block per fingerprint."""
+    lines = [f"{'calls':>8} {'total ms':>11} {'mean ms':>9} {'p95 ms':>8} {'max ms':>9} {'rows':>10}  statement"]
+    for s in query_summary()[:limit]:
+        lines.append(f"{s['calls']:>8} {s['total_ms']:>11.1f} {s['mean_ms']:>9.2f} {s['p95_ms']:>8} "
+                     f"{s['max_ms']:>9.1f} {s['rows']:>10}  {s['fingerprint'][:120]}")
+        for caller, calls in s["callers"]:
+            lines.append(f"{'':>60}{calls:>8}x {caller}")
+
+    prepared = prepared_summary()
+    if prepared:
+        lines.append("")
+        lines.append(f"{'executions':>10} {'plan ms':>9} {'saved ms':>11}  prepared statement")
+        for name, stats in sorted(prepared.items()):
+            lines.append(f"{stats['executions']:>10} {stats['planning_ms']:>9.3f} "
+                         f"{stats['planning_ms_saved']:>11.1f}  {name}")
+    return "\n".join(lines)
+
+
+def dump_summary(file=None, limit=20):
+    """Print the summary (to stdout by default)."""
+    print(format_summary(limit), file=file or sys.stdout)
+
+
+def log_summary(limit=20):
+    """Write the summary to the query log, e.g. when the application exits."""
+    if not _stats:
+        return
+    try:
+        _get_slow_log().info("query summary\n" + format_summary(limit))
+    except Exception as e:
+        print(f"Could not write the query summary: {e}")
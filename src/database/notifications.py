@@ -0,0 +1,159 @@
+"""
+Change Notifications
+
+Statement-level triggers (migration 8) send a NOTIFY on CHANGE_CHANNEL
+whenever rows of the watched tables change, with a payload such as
+"donors:UPDATE:12,40" ("*" instead of ids when too many rows changed).
+
+ChangeListener keeps one dedicated connection LISTENing on that channel
+in a background thread and hands each change to the subscribed callbacks
+(repository caches, the views' live-update pump). Callbacks run on the
+listener thread and must be quick and thread-safe. After a lost connection
+the listener reconnects and reports every table as changed, since
+notifications sent in the meantime are gone.
+"""
+
+import select
+import threading
+from collections import namedtuple
+
+import psycopg2
+import psycopg2.extensions
+
+from .db_config import config
+
+CHANGE_CHANNEL = "entity_changes"
+
+# Watched table -> primary key column sent in the payload
+NOTIFIED_TABLES = {
+    "donors": "donor_id",
+    "receivers": "receiver_id",
+    "blood_units": "unit_id",
+    "blood_requests": "request_id",
+}
+
+# Above this many rows one statement notifies "*" instead of listing ids
+MAX_NOTIFIED_IDS = 500
+
+# Seconds between checks of the stop flag, and before reconnecting
+POLL_TIMEOUT = 1.0
+RECONNECT_DELAY = 5.0
+
+# ids is a frozenset of ints, or None when "anything in the table" changed
+ChangeEvent = namedtuple("ChangeEvent", ["table", "operation", "ids"])
+
+
+def parse_payload(payload):
+    """Turn a trigger payload into a ChangeEvent (None if it is malformed)."""
+    try:
+        table, operation, ids = payload.split(":", 2)
+        if ids == "*":
+            return ChangeEvent(table, operation, None)
+        return ChangeEvent(table, operation, frozenset(int(i) for i in ids.split(",") if i))
+    except ValueError:
+        print(f"Ignoring malformed change notification: {payload!r}")
+        return None
+
+
+class ChangeListener(threading.Thread):
+    def __init__(self, connect_params):
+        super().__init__(name="change-listener", daemon=True)
+        self.connect_params = connect_params
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def subscribe(self, callback, tables=None):
+        """
+        Call callback(event) for changes to `tables` (all watched tables if None).
+        Returns a function that removes the subscription.
+        """
+        entry = (callback, frozenset(tables) if tables else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def stop(self):
+        self._stop_event.set()
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, tables in subscribers:
+            if tables is None or event.table in tables:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in change subscriber: {e}")
+
+    def run(self):
+        first_connection = True
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**self.connect_params)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+
+                if not first_connection:
+                    # Anything may have changed while we were disconnected
+                    for table in NOTIFIED_TABLES:
+                        self.dispatch(ChangeEvent(table, "RECONNECT", None))
+                first_connection = False
+
+                while not self._stop_event.is_set():
+                    if select.select([conn], [], [], POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        event = parse_payload(conn.notifies.pop(0).payload)
+                        if event is not None:
+                            self.dispatch(event)
+            except Exception as e:
+                print(f"Change listener error: {e}")
+                self._stop_event.wait(RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_listener():
+    """Return the process-wide listener, creating (but not starting) it on first use."""
+    global _listener
+    if _listener is None:
+        with _listener_lock:
+            if _listener is None:
+                _listener = ChangeListener(config())
+    return _listener
+
+
+def subscribe(callback, tables=None):
+    """Subscribe to change events; see ChangeListener.subscribe."""
+    return get_listener().subscribe(callback, tables)
+
+
+def start_listener():
+    """Start listening for changes (idempotent)."""
+    listener = get_listener()
+    if not listener.is_alive():
+        listener.start()
+    return listener
+
+
+def stop_listener():
+    """Stop the listener thread, e.g. when the application exits."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
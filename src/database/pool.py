@@ -0,0 +1,278 @@
+"""
+Connection Pool
+
+This module provides a thread-safe pool of PostgreSQL connections so the
+repositories do not pay for a new TCP connection and authentication
+handshake on every call.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a psycopg2 connection checked out from a pool.
+
+    It behaves like the underlying connection (cursor(), commit(), rollback(),
+    ``with connection:`` transactions, ...) except that close() hands the
+    connection back to the pool instead of closing the socket.
+    """
+
+    def __init__(self, pool, raw_connection):
+        self._pool = pool
+        self._raw = raw_connection
+
+    @property
+    def raw(self):
+        """The underlying psycopg2 connection (None once returned)."""
+        return self._raw
+
+    def close(self):
+        """Return the connection to the pool. Safe to call more than once."""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+    @property
+    def closed(self):
+        return 1 if self._raw is None else self._raw.closed
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        # Same semantics as psycopg2: the block is a transaction that is
+        # committed on success and rolled back on error.
+        self._raw.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._raw.__exit__(exc_type, exc_value, traceback)
+
+    def __del__(self):
+        # A repository that forgets to close() must not leak a pool slot.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections.
+
+    Args:
+        connect_params (dict): Keyword arguments for psycopg2.connect().
+        min_size (int): Connections opened eagerly and kept even when idle.
+        max_size (int): Upper bound on open connections.
+        idle_timeout (float): Seconds after which an idle connection above
+            min_size is closed.
+        health_check_after (float): Connections idle for longer than this are
+            pinged with ``SELECT 1`` on checkout before being handed out.
+        checkout_timeout (float): Seconds to wait for a free connection when
+            the pool is at max_size.
+    """
+
+    def __init__(self, connect_params, min_size=1, max_size=10, idle_timeout=300.0,
+                 health_check_after=30.0, checkout_timeout=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self.connect_params = dict(connect_params)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw_connection, returned_at)
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+        }
+
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic()))
+            self._stats["connections_created"] += 1
+
+    def _open(self):
+        return psycopg2.connect(**self.connect_params)
+
+    def _discard(self, conn):
+        self._stats["connections_closed"] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_for):
+        """
+        Cheap liveness check; only round-trips when the connection sat idle.
+        Called without the lock held, so a stalled server only blocks the
+        thread checking out this connection.
+        """
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+
+        healthy = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+        except Exception:
+            healthy = False
+
+        with self._lock:
+            self._stats["health_checks"] += 1
+            if not healthy:
+                self._stats["health_check_failures"] += 1
+        return healthy
+
+    def _prune_idle(self, now):
+        """Close idle connections that outlived idle_timeout (lock must be held)."""
+        while len(self._idle) + self._in_use > self.min_size and self._idle:
+            conn, returned_at = self._idle[0]
+            if now - returned_at < self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+
+    def getconn(self):
+        """Check out a connection, blocking up to checkout_timeout if the pool is full."""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            candidate = None
+            with self._lock:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+
+                while True:
+                    now = time.monotonic()
+                    self._prune_idle(now)
+
+                    # Most recently returned connections are the warmest.
+                    # The slot is reserved while the connection is checked
+                    # outside the lock.
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        self._in_use += 1
+                        candidate = (conn, now - returned_at)
+                        break
+
+                    if self._in_use < self.max_size:
+                        # Reserve the slot before connecting outside the lock
+                        self._in_use += 1
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolExhaustedError(
+                            f"No database connection available after {self.checkout_timeout}s "
+                            f"(max_size={self.max_size})")
+                    self._stats["waits"] += 1
+                    self._lock.wait(remaining)
+
+            if candidate is None:
+                break
+
+            conn, idle_for = candidate
+            if self._is_healthy(conn, idle_for):
+                with self._lock:
+                    self._stats["checkouts"] += 1
+                return PooledConnection(self, conn)
+
+            # Broken: give the slot back and try the next idle connection
+            with self._lock:
+                self._in_use -= 1
+                self._discard(conn)
+                self._lock.notify()
+
+        try:
+            conn = self._open()
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._stats["connections_created"] += 1
+            self._stats["checkouts"] += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Return a raw connection to the pool, resetting any open transaction."""
+        reusable = not conn.closed
+        if reusable:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                reusable = False
+
+        with self._lock:
+            self._in_use -= 1
+            if reusable and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks out a connection and always returns it."""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Return a snapshot of the pool counters for sizing decisions."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "size": len(self._idle) + self._in_use,
+            })
+        return snapshot
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
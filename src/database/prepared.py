@@ -0,0 +1,91 @@
+"""
+Prepared Statements
+
+The hottest lookups are run as server-side prepared statements so that
+PostgreSQL parses and plans them once per connection instead of on every
+call. Pooled connections are PreparingConnection objects, which remember
+the statements PREPAREd on their session; execute_prepared() PREPAREs a
+statement the first time a connection runs it and EXECUTEs it from then on.
+Nothing needs to be set up or torn down by the callers: the statements
+live as long as the pooled connection (prepared statements are not undone
+by ROLLBACK), and a replaced connection simply prepares them again.
+
+Statement names include a hash of the SQL, so a query whose text depends
+on the schema gets a new statement when the text changes.
+
+The planning time of each statement is measured once per process with
+EXPLAIN (SUMMARY). Executions after the first CUSTOM_PLAN_EXECUTIONS on a
+connection, which can use the cached generic plan, are counted in the
+instrumentation as that much planning time saved (an estimate: the server
+keeps planning per call if the generic plan looks costlier).
+"""
+
+import json
+import zlib
+
+import psycopg2.extensions
+
+from .instrumentation import record_prepared_execution, record_statement_planning
+
+# PostgreSQL plans the first executions of a prepared statement with the
+# actual parameters before it considers switching to a cached generic plan
+CUSTOM_PLAN_EXECUTIONS = 5
+
+# Planning time (ms) per statement name, measured once per process
+_planning_ms = {}
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that tracks the statements prepared on its session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # statement name -> executions on this connection
+        self.prepared = {}
+
+
+def statement_name(name, query):
+    return f"{name}_{zlib.crc32(query.encode('utf-8')):08x}"
+
+
+def _positional(query):
+    """Turn the %s placeholders of a query into PREPARE's $1, $2, ..."""
+    parts = query.split("%s")
+    return "".join(part + (f"${i}" if i < len(parts) else "") for i, part in enumerate(parts, start=1))
+
+
+def _measure_planning(cursor, name, query, params):
+    cursor.execute("EXPLAIN (SUMMARY, FORMAT JSON) " + query, params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    _planning_ms[name] = plan[0].get("Planning Time", 0.0)
+    record_statement_planning(name, _planning_ms[name])
+
+
+def execute_prepared(cursor, name, query, params):
+    """
+    Run query (with %s placeholders) as the prepared statement `name`.
+
+    Falls back to a plain execute() on connections that do not track
+    prepared statements (i.e. not from the pool).
+    """
+    connection = cursor.connection
+    prepared = getattr(connection, "prepared", None)
+    query = query.strip().rstrip(";")
+    if prepared is None:
+        cursor.execute(query, params)
+        return
+
+    statement = statement_name(name, query)
+    if statement not in prepared:
+        if name not in _planning_ms:
+            _measure_planning(cursor, name, query, params)
+        cursor.execute(f"PREPARE {statement} AS {_positional(query)}")
+        prepared[statement] = 0
+
+    placeholders = ", ".join(["%s"] * len(params))
+    cursor.execute(f"EXECUTE {statement} ({placeholders})", params)
+    prepared[statement] += 1
+    generic = prepared[statement] > CUSTOM_PLAN_EXECUTIONS
+    record_prepared_execution(name, _planning_ms.get(name, 0.0) if generic else 0.0)
@@ -1,7 +1,73 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import psycopg2
 from database.db_config import config
+from database.cache import get_cache
 from database.connection import get_connection
+from database.prepared import execute_prepared
+from database.schema import get_schema
+from database.repositories.paging import (DEFAULT_PAGE_SIZE, key_select_list, keyset_order_by, keyset_predicate,
+                                         mapping_row_key, offset_clause, resolve_sort_key, split_page)
+
+# Whitelisted sort options for get_requests_page (the primary key is appended)
+REQUEST_SORT_OPTIONS = {
+    "id": (),
+    "date": ("br.request_date",),
+    "receiver": ("r.first_name", "r.last_name"),
+    "blood_type": ("bt.type_name",),
+    "units": ("br.units_required",),
+    "status": ("br.status",),
+    "priority": ("br.priority",),
+}
+
+def _request_select_list(schema) -> str:
+    """SELECT list shared by the request queries, adapted to the installed schema."""
+    if schema.has_column('blood_requests', 'units_fulfilled'):
+        fulfilled = "COALESCE(br.units_fulfilled, 0)"
+    else:
+        fulfilled = "0"
+    notes = "br.notes" if schema.has_column('blood_requests', 'notes') else "''"
+    
+    return f"""
+        br.request_id, br.receiver_id, 
+        r.first_name || ' ' || r.last_name as receiver_name,
+        br.blood_type_id, bt.type_name as blood_type,
+        br.units_required, br.request_date, br.priority, br.status,
+        {fulfilled} as units_fulfilled,
+        {notes} as notes,
+        {fulfilled} as units_assigned
+    """
+
+# Queries also EXPLAINed by utils/check_indexes.py
+def requests_page_query(sort_key, after=None, limit=DEFAULT_PAGE_SIZE, descending=True, offset=0,
+                        status=None):
+    """(query, params) of get_requests_page; fetches limit + 1 rows."""
+    predicate, params = keyset_predicate(sort_key, after, descending)
+    query = f"""
+        SELECT {_request_select_list(get_schema())}, {key_select_list(sort_key)}
+        FROM Blood_Requests br
+        JOIN Receivers r ON br.receiver_id = r.receiver_id
+        JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
+        WHERE {predicate}
+    """
+    if status:
+        query += " AND br.status = %s"
+        params += (status,)
+    query += f" ORDER BY {keyset_order_by(sort_key, descending)} LIMIT %s{offset_clause(after, offset)}"
+    return query, params + (limit + 1,)
+
+def request_by_id_query():
+    """Query of get_request_by_id, adapted to the installed schema."""
+    return f"""
+        SELECT {_request_select_list(get_schema())}
+        FROM Blood_Requests br
+        JOIN Receivers r ON br.receiver_id = r.receiver_id
+        JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
+        WHERE br.request_id = %s
+    """
+
+def _request_cache():
+    # Cached requests carry the receiver's name, so receiver changes clear them too
+    return get_cache("blood_requests", depends_on=("receivers",))
 
 class BloodRequestRepo:
     @staticmethod
@@ -24,16 +90,11 @@ class BloodRequestRepo:
             if actual_priority not in valid_priorities:
                 actual_priority = 'Medium'  # Default to Medium if invalid
                 
+            # Pick the INSERT from the cached schema map
+            notes_column_exists = get_schema().has_column('blood_requests', 'notes')
+            
             with connection:
                 with connection.cursor() as cursor:
-                    # First check if the 'notes' column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'notes'
-                    """)
-                    notes_column_exists = cursor.fetchone() is not None
-                    
-                    # Create the SQL statement based on whether notes column exists
                     if notes_column_exists:
                         cursor.execute("""
                             INSERT INTO Blood_Requests 
@@ -67,57 +128,196 @@ class BloodRequestRepo:
                         SET status = %s
                         WHERE request_id = %s
                     """, (status, request_id))
+            _request_cache().invalidate(int(request_id))
         finally:
             connection.close()
             
     @staticmethod
-    def update_units_fulfilled(request_id: int, units_fulfilled: int) -> None:
-        """Update the number of units fulfilled for a blood request"""
+    def fulfill_units(request_id: int, units: int = 1) -> Optional[Dict[str, Any]]:
+        """
+        Count `units` more units as fulfilled for a request.
+        
+        The increment and the switch to Fulfilled (once units_required is
+        reached, unless the request is Cancelled) happen in one UPDATE, so
+        operators assigning units at the same time never overwrite each
+        other's counts. Returns the request's request_id, units_fulfilled,
+        units_required and status, or None if there is no such request.
+        """
         connection = get_connection()
         try:
-            # Check if units_fulfilled column exists
             with connection:
                 with connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'units_fulfilled'
-                    """)
-                    has_units_fulfilled = cursor.fetchone() is not None
-                    
-                    if not has_units_fulfilled:
-                        # Add the units_fulfilled column if it doesn't exist
-                        cursor.execute("""
-                            ALTER TABLE Blood_Requests
-                            ADD COLUMN units_fulfilled INTEGER DEFAULT 0
-                        """)
-                    
-                    # Update the units_fulfilled value
                     cursor.execute("""
                         UPDATE Blood_Requests
-                        SET units_fulfilled = %s
+                        SET units_fulfilled = COALESCE(units_fulfilled, 0) + %s,
+                            status = CASE
+                                WHEN COALESCE(units_fulfilled, 0) + %s >= units_required
+                                     AND status != 'Cancelled'
+                                    THEN 'Fulfilled'
+                                ELSE status
+                            END
                         WHERE request_id = %s
-                    """, (units_fulfilled, request_id))
+                        RETURNING request_id, units_fulfilled, units_required, status
+                    """, (units, units, request_id))
                     
-                    # Get units required to check if we're done
+                    result = cursor.fetchone()
+                    if result is None:
+                        return None
+                    columns = [desc[0] for desc in cursor.description]
+                    fulfillment = dict(zip(columns, result))
+            _request_cache().invalidate(int(request_id))
+            return fulfillment
+        finally:
+            connection.close()
+
+    @staticmethod
+    def allocate_blood_units(request_id: int, max_units: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Allocate Available units to a request, first-expired-first-out.
+        
+        Locks the request row, picks compatible Available, unexpired units with
+        the earliest expiration_date (O- last, see get_compatible_blood_units) using FOR UPDATE SKIP LOCKED (so operators
+        allocating at the same time never wait on or double-book the same unit),
+        marks them Assigned and bumps units_fulfilled/status, all in a single
+        statement. Returns None if the request is not Pending or Processing.
+        """
+        connection = get_connection()
+        try:
+            with connection:
+                with connection.cursor() as cursor:
                     cursor.execute("""
-                        SELECT units_required 
-                        FROM Blood_Requests 
-                        WHERE request_id = %s
-                    """, (request_id,))
-                    
-                    units_required = cursor.fetchone()[0]
+                        WITH req AS (
+                            SELECT request_id, blood_type_id, units_required,
+                                   LEAST(
+                                       GREATEST(units_required - COALESCE(units_fulfilled, 0), 0),
+                                       COALESCE(%s::integer, units_required)
+                                   ) AS units_needed
+                            FROM Blood_Requests
+                            WHERE request_id = %s
+                            AND status IN ('Pending', 'Processing')
+                            FOR UPDATE
+                        ),
+                        picked AS (
+                            SELECT bu.unit_id
+                            FROM req
+                            JOIN Blood_Type_Compatibility c ON c.recipient_blood_type_id = req.blood_type_id
+                            JOIN Blood_Units bu ON bu.blood_type_id = c.donor_blood_type_id
+                            WHERE bu.status = 'Available'
+                            AND bu.expiration_date >= CURRENT_DATE
+                            ORDER BY c.conserve, bu.expiration_date, c.preference, bu.unit_id
+                            LIMIT (SELECT units_needed FROM req)
+                            FOR UPDATE OF bu SKIP LOCKED
+                        ),
+                        assigned AS (
+                            UPDATE Blood_Units bu
+                            SET status = 'Assigned'
+                            FROM picked
+                            WHERE bu.unit_id = picked.unit_id
+                            RETURNING bu.unit_id, bu.expiration_date
+                        ),
+                        allocation AS (
+                            SELECT COUNT(*)::integer AS units_allocated,
+                                   COALESCE(array_agg(unit_id ORDER BY expiration_date, unit_id), '{}') AS unit_ids
+                            FROM assigned
+                        )
+                        UPDATE Blood_Requests br
+                        SET units_fulfilled = COALESCE(br.units_fulfilled, 0) + allocation.units_allocated,
+                            status = CASE
+                                WHEN COALESCE(br.units_fulfilled, 0) + allocation.units_allocated >= br.units_required
+                                    THEN 'Fulfilled'
+                                WHEN allocation.units_allocated > 0 THEN 'Processing'
+                                ELSE br.status
+                            END
+                        FROM req, allocation
+                        WHERE br.request_id = req.request_id
+                        RETURNING br.request_id, allocation.units_allocated, allocation.unit_ids,
+                                  br.units_fulfilled, br.units_required, br.status
+                    """, (max_units, request_id))
                     
-                    print(f"Checking if request {request_id} is fulfilled: {units_fulfilled} >= {units_required}")
+                    result = cursor.fetchone()
+                    if result is None:
+                        return None
+                    columns = [desc[0] for desc in cursor.description]
+                    allocation = dict(zip(columns, result))
+            _request_cache().invalidate(int(request_id))
+            get_cache("blood_units").invalidate(*allocation["unit_ids"])
+            return allocation
+        finally:
+            connection.close()
+
+    @staticmethod
+    def assign_blood_units(request_id: int, unit_ids: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Assign the chosen units to a request.
+        
+        Like allocate_blood_units, but for units picked by an operator: in a
+        single statement the request row is locked, those of the units that
+        are still Available, unexpired and compatible are marked Assigned (at
+        most as many as the request still needs) and units_fulfilled/status
+        are bumped, so units are never left Assigned without being counted.
+        Returns None (and assigns nothing) if the request is not Pending or
+        Processing; unit_ids of the result lists the units actually assigned.
+        """
+        connection = get_connection()
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        WITH req AS (
+                            SELECT request_id, blood_type_id,
+                                   GREATEST(units_required - COALESCE(units_fulfilled, 0), 0) AS units_needed
+                            FROM Blood_Requests
+                            WHERE request_id = %s
+                            AND status IN ('Pending', 'Processing')
+                            FOR UPDATE
+                        ),
+                        picked AS (
+                            SELECT bu.unit_id
+                            FROM req
+                            JOIN Blood_Type_Compatibility c ON c.recipient_blood_type_id = req.blood_type_id
+                            JOIN Blood_Units bu ON bu.blood_type_id = c.donor_blood_type_id
+                            WHERE bu.unit_id = ANY(%s::integer[])
+                            AND bu.status = 'Available'
+                            AND bu.expiration_date >= CURRENT_DATE
+                            ORDER BY bu.unit_id
+                            LIMIT (SELECT units_needed FROM req)
+                            FOR UPDATE OF bu
+                        ),
+                        assigned AS (
+                            UPDATE Blood_Units bu
+                            SET status = 'Assigned'
+                            FROM picked
+                            WHERE bu.unit_id = picked.unit_id
+                            AND bu.status = 'Available'
+                            RETURNING bu.unit_id
+                        ),
+                        allocation AS (
+                            SELECT COUNT(*)::integer AS units_allocated,
+                                   COALESCE(array_agg(unit_id ORDER BY unit_id), '{}') AS unit_ids
+                            FROM assigned
+                        )
+                        UPDATE Blood_Requests br
+                        SET units_fulfilled = COALESCE(br.units_fulfilled, 0) + allocation.units_allocated,
+                            status = CASE
+                                WHEN COALESCE(br.units_fulfilled, 0) + allocation.units_allocated >= br.units_required
+                                    THEN 'Fulfilled'
+                                WHEN allocation.units_allocated > 0 THEN 'Processing'
+                                ELSE br.status
+                            END
+                        FROM req, allocation
+                        WHERE br.request_id = req.request_id
+                        RETURNING br.request_id, allocation.units_allocated, allocation.unit_ids,
+                                  br.units_fulfilled, br.units_required, br.status
+                    """, (request_id, [int(unit_id) for unit_id in unit_ids]))
                     
-                    # If all units are fulfilled, update status to "Fulfilled"
-                    if units_fulfilled >= units_required:
-                        print(f"Setting request {request_id} status to Fulfilled")
-                        cursor.execute("""
-                            UPDATE Blood_Requests
-                            SET status = 'Fulfilled'
-                            WHERE request_id = %s 
-                            AND status != 'Cancelled'
-                        """, (request_id,))
+                    result = cursor.fetchone()
+                    if result is None:
+                        return None
+                    columns = [desc[0] for desc in cursor.description]
+                    allocation = dict(zip(columns, result))
+            _request_cache().invalidate(int(request_id))
+            get_cache("blood_units").invalidate(*allocation["unit_ids"])
+            return allocation
         finally:
             connection.close()
 
@@ -126,236 +326,118 @@ class BloodRequestRepo:
     @staticmethod
     def get_all_requests(status: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all blood requests with receiver and blood type information"""
+        query = f"""
+            SELECT {_request_select_list(get_schema())}
+            FROM Blood_Requests br
+            JOIN Receivers r ON br.receiver_id = r.receiver_id
+            JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
+        """
+        params = ()
+        if status:
+            query += " WHERE br.status = %s"
+            params = (status,)
+        query += " ORDER BY br.request_date DESC"
+        
         connection = get_connection()
         try:
             with connection:
                 with connection.cursor() as cursor:
-                    # First check if notes column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'notes'
-                    """)
-                    notes_column_exists = cursor.fetchone() is not None
-                    
-                    # Check if units_fulfilled column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'units_fulfilled'
-                    """)
-                    has_units_fulfilled = cursor.fetchone() is not None
-                    
-                    query = """
-                        SELECT br.request_id, br.receiver_id, 
-                               r.first_name || ' ' || r.last_name as receiver_name,
-                               br.blood_type_id, bt.type_name as blood_type,
-                               br.units_required, br.request_date, br.priority, br.status,
-                    """
-                    
-                    # Add units_fulfilled column if it exists
-                    if has_units_fulfilled:
-                        query += " COALESCE(br.units_fulfilled, 0) as units_fulfilled,"
-                    else:
-                        query += " 0 as units_fulfilled,"
-                    
-                    # Add notes column to query if it exists
-                    if notes_column_exists:
-                        query += " br.notes,"
-                    
-                    query += """
-                               COALESCE(br.units_fulfilled, 0) as units_assigned
-                        FROM Blood_Requests br
-                        JOIN Receivers r ON br.receiver_id = r.receiver_id
-                        JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
-                    """
-                    
-                    if status:
-                        query += " WHERE br.status = %s"
-                        query += " GROUP BY br.request_id, r.first_name, r.last_name, bt.type_name"
-                        query += " ORDER BY br.request_date DESC"
-                        cursor.execute(query, (status,))
-                    else:
-                        query += " GROUP BY br.request_id, r.first_name, r.last_name, bt.type_name"
-                        query += " ORDER BY br.request_date DESC"
-                        cursor.execute(query)
+                    cursor.execute(query, params)
                     
                     columns = [desc[0] for desc in cursor.description]
-                    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                    
-                    # Add empty notes if the column doesn't exist
-                    if not notes_column_exists:
-                        for result in results:
-                            result['notes'] = ''
-                    
-                    return results
+                    return [dict(zip(columns, row)) for row in cursor.fetchall()]
         finally:
             connection.close()
     
     @staticmethod
-    def get_request_by_id(request_id: int) -> Dict[str, Any]:
-        """Get a specific blood request by ID with receiver and blood type information"""
+    def get_requests_page(status: Optional[str] = None, after: Optional[tuple] = None,
+                          limit: int = DEFAULT_PAGE_SIZE, sort_by: str = "date",
+                          descending: bool = True, offset: int = 0) -> Tuple[List[Dict[str, Any]], Optional[tuple]]:
+        """
+        Get one page of blood requests, newest first unless sort_by (one of
+        REQUEST_SORT_OPTIONS) says otherwise.
+        Returns (requests, next_after); pass next_after back to get the next
+        page, it is None on the last page.
+        """
+        sort_key = resolve_sort_key(REQUEST_SORT_OPTIONS, sort_by, "br.request_id")
+        query, params = requests_page_query(sort_key, after, limit, descending, offset, status)
+        
         connection = get_connection()
         try:
             with connection:
                 with connection.cursor() as cursor:
-                    # First check if notes column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'notes'
-                    """)
-                    notes_column_exists = cursor.fetchone() is not None
-                    
-                    # Check if units_fulfilled column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'units_fulfilled'
-                    """)
-                    has_units_fulfilled = cursor.fetchone() is not None
-                    
-                    query = """
-                        SELECT br.request_id, br.receiver_id, 
-                               r.first_name || ' ' || r.last_name as receiver_name,
-                               br.blood_type_id, bt.type_name as blood_type,
-                               br.units_required, br.request_date, br.priority, br.status,
-                    """
-                    
-                    # Add units_fulfilled column if it exists
-                    if has_units_fulfilled:
-                        query += " COALESCE(br.units_fulfilled, 0) as units_fulfilled,"
-                    else:
-                        query += " 0 as units_fulfilled,"
-                    
-                    # Add notes column to query if it exists
-                    if notes_column_exists:
-                        query += " br.notes,"
-                    
-                    query += """
-                               COALESCE(br.units_fulfilled, 0) as units_assigned
-                        FROM Blood_Requests br
-                        JOIN Receivers r ON br.receiver_id = r.receiver_id
-                        JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
-                        WHERE br.request_id = %s
-                    """
-                    
-                    cursor.execute(query, (request_id,))
+                    cursor.execute(query, params)
                     
                     columns = [desc[0] for desc in cursor.description]
-                    result = cursor.fetchone()
-                    data = dict(zip(columns, result)) if result else None
-                    
-                    # Add empty notes if the column doesn't exist
-                    if data and not notes_column_exists:
-                        data['notes'] = ''
-                        
-                    return data
+                    requests = [dict(zip(columns, row)) for row in cursor.fetchall()]
         finally:
             connection.close()
+        
+        return split_page(requests, limit, mapping_row_key(sort_key))
     
     @staticmethod
-    def search_requests(search_term: str) -> List[Dict[str, Any]]:
-        """Search for blood requests by receiver name, blood type, status, or priority"""
+    def count_requests(status: Optional[str] = None) -> int:
+        """Return the number of blood requests, optionally only those with a status"""
+        query = "SELECT COUNT(*) FROM Blood_Requests"
+        params = ()
+        if status:
+            query += " WHERE status = %s"
+            params = (status,)
+        
         connection = get_connection()
-        search_pattern = f"%{search_term}%"
         try:
             with connection:
                 with connection.cursor() as cursor:
-                    # First check if notes column exists
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_requests' AND column_name = 'notes'
-                    """)
-                    notes_column_exists = cursor.fetchone() is not None
-                    
-                    query = """
-                        SELECT br.request_id, br.receiver_id, 
-                               r.first_name || ' ' || r.last_name as receiver_name,
-                               br.blood_type_id, bt.type_name as blood_type,
-                               br.units_required, br.request_date, br.priority, br.status,
-                    """
-                    
-                    # Add notes column to query if it exists
-                    if notes_column_exists:
-                        query += " br.notes,"
-                    
-                    query += """
-                               0 as units_assigned
-                        FROM Blood_Requests br
-                        JOIN Receivers r ON br.receiver_id = r.receiver_id
-                        JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
-                        WHERE r.first_name ILIKE %s 
-                           OR r.last_name ILIKE %s
-                           OR bt.type_name ILIKE %s
-                           OR br.status::text ILIKE %s
-                           OR br.priority::text ILIKE %s
-                        GROUP BY br.request_id, r.first_name, r.last_name, bt.type_name
-                        ORDER BY br.request_date DESC
-                    """
-                    
-                    cursor.execute(query, (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
+                    cursor.execute(query, params)
+                    return cursor.fetchone()[0]
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def get_request_by_id(request_id: int) -> Dict[str, Any]:
+        """Get a specific blood request by ID with receiver and blood type information"""
+        return _request_cache().get(int(request_id), lambda: BloodRequestRepo._fetch_request(request_id))
+    
+    @staticmethod
+    def _fetch_request(request_id: int) -> Optional[Dict[str, Any]]:
+        query = request_by_id_query()
+        
+        connection = get_connection()
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    execute_prepared(cursor, "get_request_by_id", query, (request_id,))
                     
                     columns = [desc[0] for desc in cursor.description]
-                    results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                    
-                    # Add empty notes if the column doesn't exist
-                    if not notes_column_exists:
-                        for result in results:
-                            result['notes'] = ''
-                    
-                    return results
+                    result = cursor.fetchone()
+                    return dict(zip(columns, result)) if result else None
         finally:
             connection.close()
-            
-        # Blood unit compatibility functionality has been removed
+    
+    @staticmethod
+    def search_requests(search_term: str) -> List[Dict[str, Any]]:
+        """Search for blood requests by receiver name, blood type, status, or priority"""
+        search_pattern = f"%{search_term}%"
+        query = f"""
+            SELECT {_request_select_list(get_schema())}
+            FROM Blood_Requests br
+            JOIN Receivers r ON br.receiver_id = r.receiver_id
+            JOIN Blood_Types bt ON br.blood_type_id = bt.blood_type_id
+            WHERE r.first_name ILIKE %s 
+               OR r.last_name ILIKE %s
+               OR bt.type_name ILIKE %s
+               OR br.status::text ILIKE %s
+               OR br.priority::text ILIKE %s
+            ORDER BY br.request_date DESC
+        """
         
         connection = get_connection()
         try:
             with connection:
                 with connection.cursor() as cursor:
-                    # First check the actual schema of blood_units table
-                    cursor.execute("""
-                        SELECT column_name FROM information_schema.columns
-                        WHERE table_name = 'blood_units'
-                    """)
-                    available_columns = [row[0] for row in cursor.fetchall()]
-                    
-                    # Determine the correct column names based on what's in the database
-                    date_column = "donation_date" if "donation_date" in available_columns else "collection_date"
-                    location_column = "location" if "location" in available_columns else "storage_location"
-                    
-                    compatible_types = compatibility.get(blood_type_id, [])
-                    if not compatible_types:
-                        return []
-                    
-                    placeholders = ", ".join(["%s"] * len(compatible_types))
-                    
-                    # Build the query with the correct column names and include donor information
-                    query = f"""
-                        SELECT bu.unit_id, bu.blood_type_id, bt.type_name, 
-                               bu.{date_column}, bu.expiry_date, 
-                               d.donor_id, d.first_name || ' ' || d.last_name as donor_name,
-                    """
-                    
-                    # Add volume_ml if it exists, otherwise use a constant
-                    if "volume_ml" in available_columns:
-                        query += "bu.volume_ml, "
-                    else:
-                        query += "'450' as volume_ml, "  # Standard volume for a blood bag
-                    
-                    query += f"""
-                               bu.{location_column}
-                        FROM Blood_Units bu
-                        JOIN Blood_Types bt ON bu.blood_type_id = bt.blood_type_id
-                        JOIN Donors d ON bu.donor_id = d.donor_id
-                        WHERE bu.status = 'Available' 
-                        AND bu.blood_type_id IN ({placeholders})
-                        ORDER BY bu.expiry_date ASC
-                    """
-                    
-                    cursor.execute(query, compatible_types)
+                    cursor.execute(query, (search_pattern, search_pattern, search_pattern, search_pattern, search_pattern))
                     
                     columns = [desc[0] for desc in cursor.description]
                     return [dict(zip(columns, row)) for row in cursor.fetchall()]
         finally:
             connection.close()
-    
-        # Blood unit assignment functionality has been removed
-
@@ -1,4 +1,213 @@
+import csv
+import datetime
+import io
+import itertools
+
+from database.cache import get_cache
 from database.connection import get_connection
+from database.prepared import execute_prepared
+from database.repositories.paging import (DEFAULT_PAGE_SIZE, key_select_list, keyset_order_by, keyset_predicate,
+                                         offset_clause, resolve_sort_key, split_page, tuple_row_key)
+from database.schema import get_schema
+from database.streaming import DEFAULT_ITERSIZE, stream_rows
+
+# Statuses a blood unit can be loaded with through bulk intake
+UNIT_STATUSES = ('Available', 'Assigned', 'Allocated', 'Used', 'Expired', 'Quarantined', 'Discarded')
+
+# Per blood type totals from the trigger-maintained Inventory_Summary
+INVENTORY_BY_BLOOD_TYPE_QUERY = """
+SELECT bt.type_name,
+       COALESCE(SUM(s.unit_count) FILTER (WHERE s.status = 'Available'), 0)::integer,
+       COALESCE(SUM(s.unit_count) FILTER (WHERE s.status = 'Used'), 0)::integer,
+       COALESCE(SUM(s.unit_count) FILTER (WHERE s.status = 'Expired'), 0)::integer,
+       COALESCE(SUM(s.unit_count), 0)::integer
+FROM Blood_Types bt
+LEFT JOIN Inventory_Summary s ON s.blood_type_id = bt.blood_type_id
+GROUP BY bt.type_name
+ORDER BY bt.type_name
+"""
+
+# Whitelisted sort options for get_blood_units_page (the primary key is appended)
+UNIT_SORT_OPTIONS = {
+    "id": (),
+    "collected": ("u.collection_date",),
+    "expires": ("u.expiration_date",),
+    "blood_type": ("bt.type_name",),
+    "status": ("u.status",),
+}
+
+# Default shelf life of whole blood, matching DonorManagementFrame.save_donation
+DEFAULT_SHELF_LIFE_DAYS = 42
+
+# Limits of the bulk intake staging table's columns (INTEGER, VARCHAR(100))
+INT_MIN, INT_MAX = -2 ** 31, 2 ** 31 - 1
+STORAGE_LOCATION_MAX_LENGTH = 100
+
+# Units expired per transaction by expire_overdue_units
+EXPIRY_BATCH_SIZE = 1000
+
+# Queries also EXPLAINed by utils/check_indexes.py
+AVAILABLE_UNITS_BY_TYPE_QUERY = """
+SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
+      u.blood_type_id, bt.type_name, 
+      u.collection_date, u.expiration_date, u.status
+FROM Blood_Units u
+JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
+LEFT JOIN Donors d ON u.donor_id = d.donor_id
+WHERE u.blood_type_id = %s AND u.status = 'Available'
+ORDER BY u.collection_date ASC
+"""
+
+EXPIRE_OVERDUE_UNITS_QUERY = """
+WITH overdue AS (
+    SELECT unit_id
+    FROM Blood_Units
+    WHERE status = 'Available'
+    AND expiration_date < CURRENT_DATE
+    ORDER BY expiration_date
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE Blood_Units bu
+SET status = 'Expired'
+FROM overdue
+WHERE bu.unit_id = overdue.unit_id
+RETURNING bu.unit_id
+"""
+
+def blood_units_page_query(sort_key, after=None, limit=DEFAULT_PAGE_SIZE, descending=True, offset=0):
+    """(query, params) of get_blood_units_page; fetches limit + 1 rows."""
+    predicate, params = keyset_predicate(sort_key, after, descending)
+    query = f"""
+    SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
+          u.blood_type_id, bt.type_name, 
+          u.collection_date, u.expiration_date, u.status,
+          {key_select_list(sort_key)}
+    FROM Blood_Units u
+    JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
+    LEFT JOIN Donors d ON u.donor_id = d.donor_id
+    WHERE {predicate}
+    ORDER BY {keyset_order_by(sort_key, descending)}
+    LIMIT %s{offset_clause(after, offset)}
+    """
+    return query, params + (limit + 1,)
+
+def compatible_units_query(schema):
+    """Query of get_compatible_blood_units, adapted to the installed schema."""
+    storage_location = "u.storage_location" if schema.has_column('blood_units', 'storage_location') else "NULL"
+    volume_ml = "u.volume_ml" if schema.has_column('blood_units', 'volume_ml') else "450"
+    return f"""
+    SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
+          u.blood_type_id, bt.type_name, 
+          u.collection_date, u.expiration_date, u.status,
+          {storage_location}, {volume_ml}, c.preference
+    FROM Blood_Type_Compatibility c
+    JOIN Blood_Units u ON u.blood_type_id = c.donor_blood_type_id
+    JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
+    LEFT JOIN Donors d ON u.donor_id = d.donor_id
+    WHERE c.recipient_blood_type_id = %s
+    AND u.status = 'Available'
+    AND u.expiration_date >= CURRENT_DATE
+    ORDER BY c.conserve, u.expiration_date, c.preference, u.unit_id
+    """
+
+# Status changes transition_status allows: current status -> new statuses
+ALLOWED_STATUS_TRANSITIONS = {
+    'Available': ('Assigned', 'Expired'),
+    'Assigned': ('Used',),
+}
+
+def _parse_date(value, field):
+    if isinstance(value, datetime.date):
+        return value
+    if not value:
+        raise ValueError(f"{field} is required")
+    try:
+        return datetime.datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{field} must be in YYYY-MM-DD format")
+
+def _parse_int(value, field, required=True):
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"{field} is required")
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a whole number")
+    if not INT_MIN <= number <= INT_MAX:
+        raise ValueError(f"{field} is out of range")
+    return number
+
+def _parse_intake_row(unit):
+    """Validate one bulk intake row and return it in staging-table column order."""
+    donor_id = _parse_int(unit.get("donor_id"), "donor_id", required=False)
+    blood_type_id = _parse_int(unit.get("blood_type_id"), "blood_type_id")
+    collection_date = _parse_date(unit.get("collection_date"), "collection_date")
+
+    if unit.get("expiration_date"):
+        expiration_date = _parse_date(unit.get("expiration_date"), "expiration_date")
+    else:
+        expiration_date = collection_date + datetime.timedelta(days=DEFAULT_SHELF_LIFE_DAYS)
+    if expiration_date <= collection_date:
+        raise ValueError("expiration_date must be after collection_date")
+
+    status = unit.get("status") or 'Available'
+    if status not in UNIT_STATUSES:
+        raise ValueError(f"status must be one of: {', '.join(UNIT_STATUSES)}")
+
+    volume_ml = _parse_int(unit.get("volume_ml"), "volume_ml", required=False)
+    if volume_ml is None:
+        volume_ml = 450
+    if volume_ml <= 0 or volume_ml > 550:
+        raise ValueError("volume_ml must be between 1 and 550")
+
+    storage_location = unit.get("storage_location") or None
+    if storage_location is not None:
+        storage_location = str(storage_location)
+        if len(storage_location) > STORAGE_LOCATION_MAX_LENGTH:
+            raise ValueError(f"storage_location must be at most {STORAGE_LOCATION_MAX_LENGTH} characters")
+        if "\x00" in storage_location:
+            raise ValueError("storage_location must not contain NUL characters")
+    return (donor_id, blood_type_id, collection_date, expiration_date, status,
+            storage_location, volume_ml)
+
+def _intake_lines(units, rejected):
+    """Yield one staging-table CSV line per valid row; invalid rows go to `rejected`."""
+    line = io.StringIO()
+    writer = csv.writer(line)
+    for row_number, unit in enumerate(units, start=1):
+        try:
+            values = _parse_intake_row(unit)
+        except ValueError as e:
+            rejected.append((row_number, str(e)))
+            continue
+        writer.writerow((row_number,) + tuple("" if v is None else v for v in values))
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+
+class _LineReader:
+    """File-like object for copy_expert that reads from an iterator of lines."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def read(self, size=-1):
+        chunks = [self._buffer]
+        available = len(self._buffer)
+        for line in self._lines:
+            chunks.append(line)
+            available += len(line)
+            if 0 <= size <= available:
+                break
+        data = "".join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
 
 class BloodUnitRepository:
     def add_blood_unit(self, donor_id, blood_type_id, collection_date, expiration_date, status, 
@@ -22,23 +231,14 @@ class BloodUnitRepository:
         unit_id = None
         
         try:
+            # Column availability comes from the cached schema map
+            schema = get_schema()
+            has_storage_location = schema.has_column('blood_units', 'storage_location')
+            has_volume_ml = schema.has_column('blood_units', 'volume_ml')
+            
             conn = get_connection()
             cur = conn.cursor()
             
-            # Check if storage_location column exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns
-                WHERE table_name = 'blood_units' AND column_name = 'storage_location'
-            """)
-            has_storage_location = cur.fetchone() is not None
-            
-            # Check if volume_ml column exists
-            cur.execute("""
-                SELECT column_name FROM information_schema.columns
-                WHERE table_name = 'blood_units' AND column_name = 'volume_ml'
-            """)
-            has_volume_ml = cur.fetchone() is not None
-            
             # Construct the query based on available columns
             if has_storage_location and has_volume_ml:
                 query = """
@@ -92,7 +292,10 @@ class BloodUnitRepository:
         return unit_id
     
     def get_blood_unit_by_id(self, unit_id):
-        """Get a blood unit by its ID."""
+        """Get a blood unit by its ID, served from the entity cache when possible."""
+        return get_cache("blood_units").get(int(unit_id), lambda: self._fetch_blood_unit(unit_id))
+
+    def _fetch_blood_unit(self, unit_id):
         conn = None
         blood_unit = None
         
@@ -108,7 +311,7 @@ class BloodUnitRepository:
             WHERE u.unit_id = %s
             """
             
-            cur.execute(query, (unit_id,))
+            execute_prepared(cur, "get_blood_unit_by_id", query, (unit_id,))
             row = cur.fetchone()
             
             if row:
@@ -134,31 +337,78 @@ class BloodUnitRepository:
     
     def get_all_blood_units(self):
         """Get all blood units from the database."""
+        return list(self.iter_blood_units())
+
+    def iter_blood_units(self, itersize=DEFAULT_ITERSIZE):
+        """
+        Yield every blood unit, newest collection first, without loading them all.
+        
+        Rows come from a server-side cursor in batches of itersize, so memory
+        use stays constant however many units are stored.
+        
+        Yields:
+            dict: unit_id, donor_id, donor_name, blood_type_id, blood_type,
+                collection_date, expiration_date and status
+        """
+        query = """
+        SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
+              u.blood_type_id, bt.type_name, 
+              u.collection_date, u.expiration_date, u.status
+        FROM Blood_Units u
+        JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
+        LEFT JOIN Donors d ON u.donor_id = d.donor_id
+        ORDER BY u.collection_date DESC
+        """
+        
+        try:
+            for row in stream_rows(query, itersize=itersize):
+                yield {
+                    "unit_id": row[0],
+                    "donor_id": row[1],
+                    "donor_name": f"{row[2]} {row[3]}",
+                    "blood_type_id": row[4],
+                    "blood_type": row[5],
+                    "collection_date": row[6],
+                    "expiration_date": row[7],
+                    "status": row[8]
+                }
+        except Exception as e:
+            print(f"Error fetching blood units: {e}")
+            raise
+
+    def get_blood_units_page(self, after=None, limit=DEFAULT_PAGE_SIZE, sort_by="collected", descending=True, offset=0):
+        """
+        Get one page of blood units, most recently collected first by default.
+        
+        Args:
+            after (tuple): The next_after key returned with the previous page,
+                or None for the first page
+            limit (int): Maximum number of units to return
+            sort_by (str): One of UNIT_SORT_OPTIONS
+            descending (bool): Sort in descending order
+            offset (int): Rows to skip when jumping to a position without a key
+            
+        Returns:
+            tuple: (blood_units, next_after); next_after is None on the last page
+        """
         conn = None
         blood_units = []
         
+        sort_key = resolve_sort_key(UNIT_SORT_OPTIONS, sort_by, "u.unit_id")
+        query, params = blood_units_page_query(sort_key, after, limit, descending, offset)
+        
         try:
             conn = get_connection()
             cur = conn.cursor()
             
-            query = """
-            SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
-                  u.blood_type_id, bt.type_name, 
-                  u.collection_date, u.expiration_date, u.status
-            FROM Blood_Units u
-            JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
-            LEFT JOIN Donors d ON u.donor_id = d.donor_id
-            ORDER BY u.collection_date DESC
-            """
-            
-            cur.execute(query)
-            rows = cur.fetchall()
+            cur.execute(query, params)
+            rows, next_after = split_page(cur.fetchall(), limit, tuple_row_key(sort_key))
             
             for row in rows:
                 blood_units.append({
                     "unit_id": row[0],
                     "donor_id": row[1],
-                    "donor_name": f"{row[2]} {row[3]}",
+                    "donor_name": f"{row[2]} {row[3]}" if row[2] and row[3] else "Unknown Donor",
                     "blood_type_id": row[4],
                     "blood_type": row[5],
                     "collection_date": row[6],
@@ -174,7 +424,24 @@ class BloodUnitRepository:
             if conn:
                 conn.close()
         
-        return blood_units
+        return blood_units, next_after
+
+    def count_blood_units(self):
+        """Return the number of blood units (read from Inventory_Summary, not a table scan)."""
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT COALESCE(SUM(unit_count), 0)::integer FROM Inventory_Summary")
+            count = cur.fetchone()[0]
+            cur.close()
+            return count
+        except Exception as e:
+            print(f"Error counting blood units: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
 
     def update_blood_unit_status(self, unit_id, new_status):
         """Update the status of a blood unit."""
@@ -191,8 +458,9 @@ class BloodUnitRepository:
             WHERE unit_id = %s
             """
 
-            cur.execute(query, (new_status, unit_id))
+            execute_prepared(cur, "update_blood_unit_status", query, (new_status, unit_id))
             conn.commit()
+            get_cache("blood_units").invalidate(int(unit_id))
             success = cur.rowcount > 0
             cur.close()
         except Exception as e:
@@ -206,6 +474,120 @@ class BloodUnitRepository:
 
         return success
 
+    def transition_status(self, unit_ids=None, from_status='Available', to_status='Assigned',
+                          blood_type_id=None, expires_before=None):
+        """
+        Move a batch of units from one status to another in a single statement.
+        
+        The units are chosen by id (unit_ids) and/or by a predicate
+        (blood_type_id, expires_before: expiration_date earlier than the
+        date); only those currently in from_status change. They are locked
+        in unit_id order, so two batches overlapping each other wait instead
+        of deadlocking, and a unit another operator moved first is skipped.
+        
+        Args:
+            unit_ids (list): IDs of the units, None to select by predicate only
+            from_status (str): Status the units are expected to be in
+            to_status (str): New status, one of ALLOWED_STATUS_TRANSITIONS[from_status]
+            blood_type_id (int): Only units of this blood type
+            expires_before (date): Only units expiring before this date
+            
+        Returns:
+            list: IDs of the units that actually changed status
+        """
+        if to_status not in ALLOWED_STATUS_TRANSITIONS.get(from_status, ()):
+            raise ValueError(f"Blood units cannot go from {from_status} to {to_status}")
+        if unit_ids is None and blood_type_id is None and expires_before is None:
+            raise ValueError("transition_status needs unit_ids or a predicate")
+        if unit_ids is not None and not unit_ids:
+            return []
+        
+        conditions = ["status = %s"]
+        params = [from_status]
+        if unit_ids is not None:
+            conditions.append("unit_id = ANY(%s::integer[])")
+            params.append([int(unit_id) for unit_id in unit_ids])
+        if blood_type_id is not None:
+            conditions.append("blood_type_id = %s")
+            params.append(blood_type_id)
+        if expires_before is not None:
+            conditions.append("expiration_date < %s")
+            params.append(_parse_date(expires_before, "expires_before"))
+        params.extend([to_status, from_status])
+        
+        conn = None
+        transitioned = []
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute(f"""
+            WITH target AS (
+                SELECT unit_id
+                FROM Blood_Units
+                WHERE {" AND ".join(conditions)}
+                ORDER BY unit_id
+                FOR UPDATE
+            )
+            UPDATE Blood_Units bu
+            SET status = %s
+            FROM target
+            WHERE bu.unit_id = target.unit_id
+            AND bu.status = %s
+            RETURNING bu.unit_id
+            """, params)
+            transitioned = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            get_cache("blood_units").invalidate(*transitioned)
+            cur.close()
+        except Exception as e:
+            print(f"Error changing blood unit status: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        return transitioned
+
+    def expire_overdue_units(self, batch_size=EXPIRY_BATCH_SIZE):
+        """
+        Mark one batch of Available units past their expiration date as Expired.
+        
+        The batch is picked through the (status, expiration_date) index and
+        locked with SKIP LOCKED, so units being allocated right now are left
+        for the next batch instead of blocking the sweep. Each batch commits
+        on its own to keep lock times short.
+        
+        Args:
+            batch_size (int): Maximum number of units to expire
+            
+        Returns:
+            list: IDs of the units marked Expired (empty when none are left)
+        """
+        conn = None
+        unit_ids = []
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute(EXPIRE_OVERDUE_UNITS_QUERY, (batch_size,))
+            unit_ids = [row[0] for row in cur.fetchall()]
+            conn.commit()
+            get_cache("blood_units").invalidate(*unit_ids)
+            cur.close()
+        except Exception as e:
+            print(f"Error expiring blood units: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        return unit_ids
+
     def get_available_blood_units_by_type(self, blood_type_id):
         """Get all available blood units with the specified blood type."""
         conn = None
@@ -215,18 +597,7 @@ class BloodUnitRepository:
             conn = get_connection()
             cur = conn.cursor()
             
-            query = """
-            SELECT u.unit_id, u.donor_id, d.first_name, d.last_name, 
-                  u.blood_type_id, bt.type_name, 
-                  u.collection_date, u.expiration_date, u.status
-            FROM Blood_Units u
-            JOIN Blood_Types bt ON u.blood_type_id = bt.blood_type_id
-            LEFT JOIN Donors d ON u.donor_id = d.donor_id
-            WHERE u.blood_type_id = %s AND u.status = 'Available'
-            ORDER BY u.collection_date ASC
-            """
-            
-            cur.execute(query, (blood_type_id,))
+            cur.execute(AVAILABLE_UNITS_BY_TYPE_QUERY, (blood_type_id,))
             rows = cur.fetchall()
             
             for row in rows:
@@ -251,4 +622,258 @@ class BloodUnitRepository:
             if conn:
                 conn.close()
         
-        return blood_units
\ No newline at end of file
+        return blood_units
+
+    def get_compatible_blood_units(self, recipient_blood_type_id):
+        """
+        Get all available, unexpired units a recipient of the given blood type can receive.
+        
+        Uses the precomputed Blood_Type_Compatibility matrix, so every compatible
+        donor type is fetched in one query. Units are ordered by expiration_date,
+        except that O- units for other recipients are listed last to conserve them.
+        
+        Args:
+            recipient_blood_type_id (int): Blood type ID of the recipient
+            
+        Returns:
+            list: Blood unit dicts, each with a "preference" score (0 = exact match)
+        """
+        conn = None
+        blood_units = []
+        
+        query = compatible_units_query(get_schema())
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            
+            cur.execute(query, (recipient_blood_type_id,))
+            rows = cur.fetchall()
+            
+            for row in rows:
+                blood_units.append({
+                    "unit_id": row[0],
+                    "donor_id": row[1],
+                    "donor_name": f"{row[2]} {row[3]}" if row[2] and row[3] else "Unknown Donor",
+                    "blood_type_id": row[4],
+                    "blood_type": row[5],
+                    "collection_date": row[6],
+                    "expiration_date": row[7],
+                    "status": row[8],
+                    "storage_location": row[9],
+                    "volume_ml": row[10],
+                    "preference": row[11]
+                })
+            
+            cur.close()
+        except Exception as e:
+            print(f"Error getting compatible blood units: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        return blood_units
+
+    def get_inventory_summary(self):
+        """
+        Get unit counts per blood type, status and storage location.
+        
+        Reads the trigger-maintained Inventory_Summary table, so the cost does
+        not depend on how many units are stored.
+        
+        Returns:
+            list: Dicts with blood_type_id, blood_type, status, storage_location
+                (None when not set) and unit_count, for every non-empty group
+        """
+        conn = None
+        summary = []
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("""
+            SELECT s.blood_type_id, bt.type_name, s.status,
+                   NULLIF(s.storage_location, ''), s.unit_count
+            FROM Inventory_Summary s
+            JOIN Blood_Types bt ON bt.blood_type_id = s.blood_type_id
+            WHERE s.unit_count > 0
+            ORDER BY bt.type_name, s.status, s.storage_location
+            """)
+            for row in cur.fetchall():
+                summary.append({
+                    "blood_type_id": row[0],
+                    "blood_type": row[1],
+                    "status": row[2],
+                    "storage_location": row[3],
+                    "unit_count": row[4]
+                })
+            cur.close()
+        except Exception as e:
+            print(f"Error reading inventory summary: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        return summary
+
+    def get_inventory_by_blood_type(self):
+        """
+        Get the inventory totals of every blood type, one row per type.
+        
+        Returns:
+            list: Dicts with blood_type, available_units, used_units,
+                expired_units and total_units, ordered by blood type
+        """
+        conn = None
+        inventory = []
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute(INVENTORY_BY_BLOOD_TYPE_QUERY)
+            for row in cur.fetchall():
+                inventory.append({
+                    "blood_type": row[0],
+                    "available_units": row[1],
+                    "used_units": row[2],
+                    "expired_units": row[3],
+                    "total_units": row[4]
+                })
+            cur.close()
+        except Exception as e:
+            print(f"Error reading blood type inventory: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        return inventory
+
+    def bulk_add_blood_units(self, units):
+        """
+        Load many blood units in one transaction using COPY.
+        
+        Rows are validated in Python as they are streamed into a temporary
+        staging table with COPY FROM STDIN (the input is never held in memory
+        as a whole), and rows that reference an unknown donor or blood
+        type (or a blood type different from the donor's) are rejected with a
+        single set-based check. Rejected rows are reported, never abort the batch.
+        Donors.last_donation_date is then advanced with one UPDATE.
+        
+        Args:
+            units (iterable of dict): Rows with donor_id, blood_type_id and
+                collection_date, and optionally expiration_date (defaults to
+                collection_date + 42 days), status (default 'Available'),
+                storage_location and volume_ml (default 450).
+            
+        Returns:
+            dict: "inserted" (int), "unit_ids" (list), "donors_updated" (int) and
+                "rejected" (list of (row_number, reason), row numbers are 1-based)
+        """
+        rejected = []
+        result = {"inserted": 0, "unit_ids": [], "donors_updated": 0, "rejected": rejected}
+        
+        # Validate up to the first good row before connecting; the rest is
+        # validated while COPY reads it
+        lines = _intake_lines(units, rejected)
+        first_line = next(lines, None)
+        if first_line is None:
+            return result
+        source = _LineReader(itertools.chain([first_line], lines))
+        
+        schema = get_schema()
+        insert_columns = ["donor_id", "blood_type_id", "collection_date", "expiration_date", "status"]
+        if schema.has_column('blood_units', 'storage_location'):
+            insert_columns.append("storage_location")
+        if schema.has_column('blood_units', 'volume_ml'):
+            insert_columns.append("volume_ml")
+        column_list = ", ".join(insert_columns)
+        
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            
+            cur.execute("""
+            CREATE TEMP TABLE blood_unit_intake (
+                row_number INTEGER PRIMARY KEY,
+                donor_id INTEGER,
+                blood_type_id INTEGER NOT NULL,
+                collection_date DATE NOT NULL,
+                expiration_date DATE NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                storage_location VARCHAR(100),
+                volume_ml INTEGER NOT NULL
+            ) ON COMMIT DROP
+            """)
+            cur.copy_expert("""
+            COPY blood_unit_intake (row_number, donor_id, blood_type_id, collection_date,
+                                    expiration_date, status, storage_location, volume_ml)
+            FROM STDIN WITH (FORMAT csv)
+            """, source)
+            
+            # Reject rows whose references do not resolve, in one statement
+            cur.execute("""
+            DELETE FROM blood_unit_intake s
+            WHERE NOT EXISTS (SELECT 1 FROM Blood_Types bt WHERE bt.blood_type_id = s.blood_type_id)
+               OR (s.donor_id IS NOT NULL AND NOT EXISTS (
+                       SELECT 1 FROM Donors d
+                       WHERE d.donor_id = s.donor_id AND d.blood_type_id = s.blood_type_id))
+            RETURNING s.row_number, s.donor_id, s.blood_type_id,
+                      EXISTS (SELECT 1 FROM Blood_Types bt WHERE bt.blood_type_id = s.blood_type_id),
+                      EXISTS (SELECT 1 FROM Donors d WHERE d.donor_id = s.donor_id)
+            """)
+            for row_number, donor_id, blood_type_id, type_exists, donor_exists in cur.fetchall():
+                if not type_exists:
+                    reason = f"Unknown blood_type_id {blood_type_id}"
+                elif not donor_exists:
+                    reason = f"Unknown donor_id {donor_id}"
+                else:
+                    reason = f"blood_type_id {blood_type_id} does not match donor {donor_id}'s blood type"
+                rejected.append((row_number, reason))
+            
+            cur.execute(f"""
+            INSERT INTO Blood_Units ({column_list})
+            SELECT {column_list}
+            FROM blood_unit_intake
+            ORDER BY row_number
+            RETURNING unit_id
+            """)
+            result["unit_ids"] = [row[0] for row in cur.fetchall()]
+            result["inserted"] = len(result["unit_ids"])
+            
+            # Advance each donor's last donation date with one set-based statement
+            cur.execute("""
+            UPDATE Donors d
+            SET last_donation_date = s.last_collection
+            FROM (
+                SELECT donor_id, MAX(collection_date) AS last_collection
+                FROM blood_unit_intake
+                WHERE donor_id IS NOT NULL
+                GROUP BY donor_id
+            ) s
+            WHERE d.donor_id = s.donor_id
+            AND (d.last_donation_date IS NULL OR d.last_donation_date < s.last_collection)
+            RETURNING d.donor_id
+            """)
+            updated_donors = [row[0] for row in cur.fetchall()]
+            result["donors_updated"] = len(updated_donors)
+            
+            conn.commit()
+            get_cache("donors").invalidate(*updated_donors)
+            cur.close()
+        except Exception as e:
+            print(f"Error in bulk blood unit intake: {e}")
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+        
+        rejected.sort()
+        return result
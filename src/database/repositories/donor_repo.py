@@ -1,27 +1,135 @@
+from database.blood_types import get_blood_types
+from database.cache import get_cache
 from database.connection import get_connection
+from database.prepared import execute_prepared
+from database.repositories.paging import (DEFAULT_PAGE_SIZE, key_select_list, keyset_order_by, keyset_predicate,
+                                         offset_clause, resolve_sort_key, split_page, tuple_row_key)
+from database.streaming import DEFAULT_ITERSIZE, stream_rows
+from database.search import (DEFAULT_SEARCH_LIMIT, DONOR_SEARCH_EXPRESSION, normalize_term,
+                             search_expression, search_params, search_predicate)
 import datetime
 
+# Sort key of the donor list; ends with the primary key so it is unique
+DONOR_SORT_KEY = ("d.last_name", "d.first_name", "d.donor_id")
+
+# Whitelisted sort options for get_donors_page (the primary key is appended)
+DONOR_SORT_OPTIONS = {
+    "id": (),
+    "name": ("d.last_name", "d.first_name"),
+    "blood_type": ("bt.type_name",),
+    "phone": ("d.phone_number",),
+    # Never-donated sorts first; a NULL would break the keyset comparison
+    "last_donation": ("COALESCE(d.last_donation_date, DATE '0001-01-01')",),
+}
+
+# Queries also EXPLAINed by utils/check_indexes.py
+DONOR_BY_ID_QUERY = """
+SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
+       bt.type_name, d.phone_number, d.email, d.address,
+       d.registration_date, d.last_donation_date
+FROM Donors d
+JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
+WHERE d.donor_id = %s;
+"""
+
+def donors_page_query(sort_key, after=None, limit=DEFAULT_PAGE_SIZE, descending=False, offset=0):
+    """(query, params) of get_donors_page; fetches limit + 1 rows."""
+    predicate, params = keyset_predicate(sort_key, after, descending)
+    query = f"""
+    SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
+           bt.type_name, d.phone_number, d.email, d.address,
+           d.registration_date, d.last_donation_date,
+           {key_select_list(sort_key)}
+    FROM Donors d
+    JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
+    WHERE {predicate}
+    ORDER BY {keyset_order_by(sort_key, descending)}
+    LIMIT %s{offset_clause(after, offset)};
+    """
+    return query, params + (limit + 1,)
+
+def donor_search_query(term, limit=DEFAULT_SEARCH_LIMIT):
+    """(query, params) of search_donors for a normalized search term."""
+    where_sql, order_sql = search_predicate(search_expression(DONOR_SEARCH_EXPRESSION, "d"))
+    where_params, order_params = search_params(term)
+    query = f"""
+    SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
+           bt.type_name, d.phone_number, d.email, d.address,
+           d.registration_date, d.last_donation_date
+    FROM Donors d
+    JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
+    WHERE {where_sql}
+    ORDER BY {order_sql}, {keyset_order_by(DONOR_SORT_KEY)}
+    LIMIT %s;
+    """
+    return query, where_params + order_params + (limit,)
+
 class DonorRepository:
     def get_all_donors(self):
         """Get all donors from the database."""
+        return list(self.iter_donors())
+
+    def iter_donors(self, itersize=DEFAULT_ITERSIZE):
+        """
+        Yield every donor in name order without loading them all.
+        
+        Rows come from a server-side cursor in batches of itersize.
+        """
+        query = """
+        SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
+               bt.type_name, d.phone_number, d.email, d.address,
+               d.registration_date, d.last_donation_date
+        FROM Donors d
+        JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
+        ORDER BY d.last_name, d.first_name;
+        """
+        
+        try:
+            for row in stream_rows(query, itersize=itersize):
+                yield {
+                    "donor_id": row[0],
+                    "first_name": row[1],
+                    "last_name": row[2],
+                    "dob": row[3],
+                    "gender": row[4],
+                    "blood_type": row[5],
+                    "phone_number": row[6],
+                    "email": row[7],
+                    "address": row[8],
+                    "registration_date": row[9],
+                    "last_donation_date": row[10]
+                }
+        except Exception as e:
+            print(f"Error fetching donors: {e}")
+            raise
+
+    def get_donors_page(self, after=None, limit=DEFAULT_PAGE_SIZE, sort_by="name", descending=False, offset=0):
+        """
+        Get one page of donors.
+        
+        Args:
+            after (tuple): The next_after key returned with the previous page,
+                or None for the first page
+            limit (int): Maximum number of donors to return
+            sort_by (str): One of DONOR_SORT_OPTIONS
+            descending (bool): Reverse the sort order
+            offset (int): Rows to skip when jumping to a position without a key
+            
+        Returns:
+            tuple: (donors, next_after); next_after is None on the last page
+        """
         conn = None
         donors = []
         
+        sort_key = resolve_sort_key(DONOR_SORT_OPTIONS, sort_by, "d.donor_id")
+        query, params = donors_page_query(sort_key, after, limit, descending, offset)
+        
         try:
             conn = get_connection()
             cur = conn.cursor()
             
-            query = """
-            SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
-                   bt.type_name, d.phone_number, d.email, d.address,
-                   d.registration_date, d.last_donation_date
-            FROM Donors d
-            JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
-            ORDER BY d.last_name, d.first_name;
-            """
-            
-            cur.execute(query)
-            rows = cur.fetchall()
+            cur.execute(query, params)
+            rows, next_after = split_page(cur.fetchall(), limit, tuple_row_key(sort_key))
             
             for row in rows:
                 donors.append({
@@ -46,10 +154,30 @@ class DonorRepository:
             if conn:
                 conn.close()
                 
-        return donors
+        return donors, next_after
+
+    def count_donors(self):
+        """Return the number of donors."""
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT COUNT(*) FROM Donors;")
+            count = cur.fetchone()[0]
+            cur.close()
+            return count
+        except Exception as e:
+            print(f"Error counting donors: {e}")
+            raise
+        finally:
+            if conn:
+                conn.close()
 
     def get_donor_by_id(self, donor_id):
-        """Get donor by ID."""
+        """Get donor by ID, served from the entity cache when possible."""
+        return get_cache("donors").get(int(donor_id), lambda: self._fetch_donor(donor_id))
+
+    def _fetch_donor(self, donor_id):
         conn = None
         donor = None
         
@@ -57,16 +185,7 @@ class DonorRepository:
             conn = get_connection()
             cur = conn.cursor()
             
-            query = """
-            SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
-                   bt.type_name, d.phone_number, d.email, d.address,
-                   d.registration_date, d.last_donation_date
-            FROM Donors d
-            JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
-            WHERE d.donor_id = %s;
-            """
-            
-            cur.execute(query, (donor_id,))
+            execute_prepared(cur, "get_donor_by_id", DONOR_BY_ID_QUERY, (donor_id,))
             row = cur.fetchone()
             
             if row:
@@ -94,30 +213,27 @@ class DonorRepository:
                 
         return donor
 
-    def search_donors(self, search_term):
-        """Search donors by name, email, or phone."""
+    def search_donors(self, search_term, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Search donors by name, email, or phone.
+        
+        Uses the trigram index on the donor search expression: substring and
+        fuzzy matches are returned best match first, at most `limit` rows.
+        """
         conn = None
         donors = []
         
+        term = normalize_term(search_term)
+        if not term:
+            return donors
+        
+        query, params = donor_search_query(term, limit)
+        
         try:
             conn = get_connection()
             cur = conn.cursor()
             
-            search_term = f"%{search_term}%"
-            
-            query = """
-            SELECT d.donor_id, d.first_name, d.last_name, d.dob, d.gender,
-                   bt.type_name, d.phone_number, d.email, d.address,
-                   d.registration_date, d.last_donation_date
-            FROM Donors d
-            JOIN Blood_Types bt ON d.blood_type_id = bt.blood_type_id
-            WHERE LOWER(d.first_name) LIKE LOWER(%s)
-               OR LOWER(d.last_name) LIKE LOWER(%s)
-               OR LOWER(d.email) LIKE LOWER(%s)
-               OR d.phone_number LIKE %s;
-            """
-            
-            cur.execute(query, (search_term, search_term, search_term, search_term))
+            cur.execute(query, params)
             rows = cur.fetchall()
             
             for row in rows:
@@ -151,17 +267,12 @@ class DonorRepository:
         success = False
         
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # First get the blood type ID
-            cur.execute("SELECT blood_type_id FROM Blood_Types WHERE type_name = %s", (blood_type,))
-            blood_type_id = cur.fetchone()
-            
+            blood_type_id = get_blood_types().id_for(blood_type)
             if not blood_type_id:
                 raise Exception("Invalid blood type")
-                
-            blood_type_id = blood_type_id[0]
+            
+            conn = get_connection()
+            cur = conn.cursor()
             
             # Insert the donor
             query = """
@@ -200,17 +311,12 @@ class DonorRepository:
         success = False
         
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            
-            # First get the blood type ID
-            cur.execute("SELECT blood_type_id FROM Blood_Types WHERE type_name = %s", (blood_type,))
-            blood_type_id = cur.fetchone()
-            
+            blood_type_id = get_blood_types().id_for(blood_type)
             if not blood_type_id:
                 raise Exception("Invalid blood type")
-                
-            blood_type_id = blood_type_id[0]
+            
+            conn = get_connection()
+            cur = conn.cursor()
             
             # Update the donor
             if last_donation_date:
@@ -254,6 +360,7 @@ class DonorRepository:
                 )
             
             conn.commit()
+            get_cache("donors").invalidate(int(donor_id))
             success = True
             
             cur.close()
@@ -282,6 +389,7 @@ class DonorRepository:
             cur.execute(query, (donor_id,))
             
             conn.commit()
+            get_cache("donors").invalidate(int(donor_id))
             success = True
             
             cur.close()
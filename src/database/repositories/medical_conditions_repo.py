@@ -1,21 +1,20 @@
 from typing import List, Dict, Any
-import psycopg2
 from psycopg2 import sql
-from src.database.db_config import config
+from database.connection import get_connection
 
 class MedicalConditionsRepo:
     def __init__(self):
         self.connection = None
 
     def connect(self):
-        """Establish a database connection."""
-        params = config()
-        self.connection = psycopg2.connect(**params)
+        """Check out a database connection from the pool."""
+        self.connection = get_connection()
 
     def close(self):
-        """Close the database connection."""
+        """Return the database connection to the pool."""
         if self.connection is not None:
             self.connection.close()
+            self.connection = None
 
     def get_all_conditions(self) -> List[Dict[str, Any]]:
         """Retrieve all medical conditions."""
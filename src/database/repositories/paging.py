@@ -0,0 +1,85 @@
+"""
+Keyset Pagination
+
+Helpers shared by the repositories' *_page methods. A page is fetched with
+a row-value comparison on the sort key, e.g.
+
+    WHERE (d.last_name, d.first_name, d.donor_id) > (%s, %s, %s)
+    ORDER BY d.last_name, d.first_name, d.donor_id
+    LIMIT 201
+
+so each page is an index range scan no matter how deep the user scrolls,
+unlike OFFSET which reads and throws away every earlier row. The sort key
+must end with the primary key to make it unique.
+
+Sortable lists declare their sort options as a whitelist mapping an option
+name to SQL expressions; resolve_sort_key() turns one into a key (with the
+primary key appended), so user input never reaches the ORDER BY clause.
+The key expressions are also selected as _sort_key_N columns, which is
+where next_after is read from. OFFSET is only used to jump straight to a
+position (e.g. dragging a scrollbar) when no key is known.
+"""
+
+DEFAULT_PAGE_SIZE = 200
+
+
+def keyset_predicate(key_columns, after, descending=False):
+    """
+    Return (sql, params) restricting a query to rows past the `after` key.
+    With no `after` (first page) the predicate is TRUE.
+    """
+    if after is None:
+        return "TRUE", ()
+
+    operator = "<" if descending else ">"
+    columns = ", ".join(key_columns)
+    placeholders = ", ".join(["%s"] * len(key_columns))
+    return f"({columns}) {operator} ({placeholders})", tuple(after)
+
+
+def keyset_order_by(key_columns, descending=False):
+    """ORDER BY list matching keyset_predicate."""
+    direction = " DESC" if descending else ""
+    return ", ".join(f"{column}{direction}" for column in key_columns)
+
+
+def resolve_sort_key(sort_options, sort_by, primary_key):
+    """Key columns for a whitelisted sort option, ending with the primary key."""
+    if sort_by not in sort_options:
+        raise ValueError(f"Unsupported sort option: {sort_by!r}")
+    return tuple(sort_options[sort_by]) + (primary_key,)
+
+
+def key_select_list(key_columns):
+    """Select the key expressions as _sort_key_0, _sort_key_1, ..."""
+    return ", ".join(f"{column} AS _sort_key_{i}" for i, column in enumerate(key_columns))
+
+
+def tuple_row_key(key_columns):
+    """next_after extractor for tuple rows that end with key_select_list()."""
+    count = len(key_columns)
+    return lambda row: tuple(row[-count:])
+
+
+def mapping_row_key(key_columns):
+    """next_after extractor for dict-like rows that include key_select_list()."""
+    names = [f"_sort_key_{i}" for i in range(len(key_columns))]
+    return lambda row: tuple(row[name] for name in names)
+
+
+def offset_clause(after, offset):
+    """OFFSET for a positional jump; ignored when paging from a key."""
+    if after is None and offset:
+        return f" OFFSET {int(offset)}"
+    return ""
+
+
+def split_page(rows, limit, key):
+    """
+    Trim the look-ahead row (queries fetch limit + 1) and return
+    (rows, next_after), where next_after is None on the last page.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, key(rows[-1])
+    return rows, None
@@ -1,25 +1,88 @@
+from database.blood_types import get_blood_types
+from database.cache import get_cache
 from database.connection import get_connection
-import psycopg2
-import psycopg2.extras
+from database.instrumentation import dict_cursor_factory
+from database.repositories.paging import (DEFAULT_PAGE_SIZE, key_select_list, keyset_order_by, keyset_predicate,
+                                         mapping_row_key, offset_clause, resolve_sort_key, split_page)
+from database.search import (DEFAULT_SEARCH_LIMIT, RECEIVER_SEARCH_EXPRESSION, normalize_term,
+                             search_expression, search_params, search_predicate)
+
+# Sort key of the receiver list; ends with the primary key so it is unique
+RECEIVER_SORT_KEY = ("r.first_name", "r.last_name", "r.receiver_id")
+
+# Whitelisted sort options for get_receivers_page (the primary key is appended)
+RECEIVER_SORT_OPTIONS = {
+    "id": (),
+    "name": ("r.first_name", "r.last_name"),
+    "blood_type": ("bt.type_name",),
+    "hospital": ("r.hospital_name",),
+    "reason": ("r.reason_for_transfusion",),
+}
+
+# Queries also EXPLAINed by utils/check_indexes.py
+def receivers_page_query(sort_key, after=None, limit=DEFAULT_PAGE_SIZE, descending=False, offset=0):
+    """(query, params) of get_receivers_page; fetches limit + 1 rows."""
+    predicate, params = keyset_predicate(sort_key, after, descending)
+    query = f"""
+        SELECT r.*, bt.type_name as blood_type, {key_select_list(sort_key)}
+        FROM Receivers r
+        JOIN Blood_Types bt ON r.blood_type_id = bt.blood_type_id
+        WHERE {predicate}
+        ORDER BY {keyset_order_by(sort_key, descending)}
+        LIMIT %s{offset_clause(after, offset)}
+    """
+    return query, params + (limit + 1,)
+
+def receiver_search_query(term, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    (query, params) of search_receivers for a normalized search term: an
+    indexed equality lookup when the term is a blood type (e.g. "AB+"),
+    otherwise a fuzzy match on name and hospital.
+    """
+    blood_type_id = get_blood_types().id_for(term.upper())
+    if blood_type_id is not None:
+        query = f"""
+            SELECT r.*, bt.type_name as blood_type
+            FROM Receivers r
+            JOIN Blood_Types bt ON r.blood_type_id = bt.blood_type_id
+            WHERE r.blood_type_id = %s
+            ORDER BY {keyset_order_by(RECEIVER_SORT_KEY)}
+            LIMIT %s
+        """
+        return query, (blood_type_id, limit)
+
+    where_sql, order_sql = search_predicate(search_expression(RECEIVER_SEARCH_EXPRESSION, "r"))
+    where_params, order_params = search_params(term)
+    query = f"""
+        SELECT r.*, bt.type_name as blood_type
+        FROM Receivers r
+        JOIN Blood_Types bt ON r.blood_type_id = bt.blood_type_id
+        WHERE {where_sql}
+        ORDER BY {order_sql}, {keyset_order_by(RECEIVER_SORT_KEY)}
+        LIMIT %s
+    """
+    return query, where_params + order_params + (limit,)
 
 class ReceiverRepository:
     def __init__(self):
         self.connection = None
 
     def connect(self):
+        """Check out a pooled connection for callers that run their own queries."""
         if self.connection is None:
             self.connection = get_connection()
 
     def close(self):
+        """Return the connection taken by connect() to the pool."""
         if self.connection is not None:
             self.connection.close()
             self.connection = None
 
     def add_receiver(self, first_name, last_name, dob, gender, blood_type_id, reason_for_transfusion, hospital_name, ward_details, contact_person_name, contact_person_phone):
-        self.connect()
+        connection = get_connection()
         print(f"Attempting to add receiver: {first_name} {last_name}")
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("""
                     INSERT INTO Receivers (first_name, last_name, dob, gender, blood_type_id, reason_for_transfusion, hospital_name, ward_details, contact_person_name, contact_person_phone)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
@@ -27,20 +90,22 @@ class ReceiverRepository:
                 """, (first_name, last_name, dob, gender, blood_type_id, reason_for_transfusion, hospital_name, ward_details, contact_person_name, contact_person_phone))
                 
                 receiver_id = cursor.fetchone()[0]
-                self.connection.commit()
+                connection.commit()
                 print(f"Receiver added successfully with ID: {receiver_id}")
                 return True
         except Exception as e:
             print(f"Error adding receiver: {e}")
             import traceback
             traceback.print_exc()
-            self.connection.rollback()
+            connection.rollback()
             return False
+        finally:
+            connection.close()
 
     def get_all_receivers(self):
-        self.connect()
+        connection = get_connection()
         try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:                
+            with connection.cursor(cursor_factory=dict_cursor_factory(connection)) as cursor:                
                 # Get all receivers with their blood types
                 cursor.execute("""
                     SELECT r.*, bt.type_name as blood_type 
@@ -55,10 +120,11 @@ class ReceiverRepository:
             print(f"Error getting receivers: {e}")
             import traceback
             traceback.print_exc()
+            connection.rollback()
             
             try:
                 # Fallback: Get receivers without joining to Blood_Types
-                with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                with connection.cursor(cursor_factory=dict_cursor_factory(connection)) as cursor:
                     cursor.execute("""
                         SELECT * FROM Receivers
                         ORDER BY first_name, last_name
@@ -69,22 +135,58 @@ class ReceiverRepository:
             except Exception as e2:
                 print(f"Error in fallback query: {e2}")
                 return []
+        finally:
+            connection.close()
 
-    def search_receivers(self, search_term):
-        self.connect()
+    def get_receivers_page(self, after=None, limit=DEFAULT_PAGE_SIZE, sort_by="name", descending=False, offset=0):
+        """
+        Get one page of receivers, sorted by one of RECEIVER_SORT_OPTIONS.
+        Pass the returned next_after to fetch the following page; it is None
+        on the last page. offset jumps to a position when no key is known.
+        """
+        sort_key = resolve_sort_key(RECEIVER_SORT_OPTIONS, sort_by, "r.receiver_id")
+        query, params = receivers_page_query(sort_key, after, limit, descending, offset)
+        connection = get_connection()
         try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT r.*, bt.type_name as blood_type
-                    FROM Receivers r
-                    JOIN Blood_Types bt ON r.blood_type_id = bt.blood_type_id
-                    WHERE 
-                        LOWER(r.first_name) LIKE %s OR
-                        LOWER(r.last_name) LIKE %s OR
-                        LOWER(r.hospital_name) LIKE %s OR
-                        LOWER(bt.type_name) LIKE %s
-                    ORDER BY r.first_name, r.last_name
-                """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+            with connection.cursor(cursor_factory=dict_cursor_factory(connection)) as cursor:
+                cursor.execute(query, params)
+                receivers = cursor.fetchall()
+            connection.rollback()
+            return split_page(receivers, limit, mapping_row_key(sort_key))
+        except Exception as e:
+            print(f"Error getting receivers page: {e}")
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def count_receivers(self):
+        """Return the number of receivers."""
+        connection = get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM Receivers")
+                count = cursor.fetchone()[0]
+            connection.rollback()
+            return count
+        finally:
+            connection.close()
+
+    def search_receivers(self, search_term, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Search receivers by name or hospital, best match first, or list the
+        receivers of a blood type when the term is one (e.g. "ab+").
+        """
+        term = normalize_term(search_term)
+        if not term:
+            return []
+        
+        query, params = receiver_search_query(term, limit)
+        
+        connection = get_connection()
+        try:
+            with connection.cursor(cursor_factory=dict_cursor_factory(connection)) as cursor:
+                cursor.execute(query, params)
                 results = cursor.fetchall()
                 print(f"Found {len(results)} receivers matching '{search_term}'")
                 return results
@@ -93,11 +195,17 @@ class ReceiverRepository:
             import traceback
             traceback.print_exc()
             return []
+        finally:
+            connection.close()
 
     def get_receiver_by_id(self, receiver_id):
-        self.connect()
+        # Served from the entity cache when possible
+        return get_cache("receivers").get(int(receiver_id), lambda: self._fetch_receiver(receiver_id))
+
+    def _fetch_receiver(self, receiver_id):
+        connection = get_connection()
         try:
-            with self.connection.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+            with connection.cursor(cursor_factory=dict_cursor_factory(connection)) as cursor:
                 cursor.execute("""
                     SELECT r.*, bt.type_name as blood_type
                     FROM Receivers r
@@ -115,11 +223,13 @@ class ReceiverRepository:
             import traceback
             traceback.print_exc()
             return None
+        finally:
+            connection.close()
 
     def update_receiver(self, receiver_id, first_name, last_name, dob, gender, blood_type_id, reason_for_transfusion, hospital_name, ward_details, contact_person_name, contact_person_phone):
-        self.connect()
+        connection = get_connection()
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("""
                     UPDATE Receivers
                     SET first_name = %s, last_name = %s, dob = %s, gender = %s, blood_type_id = %s, 
@@ -128,21 +238,27 @@ class ReceiverRepository:
                     WHERE receiver_id = %s
                 """, (first_name, last_name, dob, gender, blood_type_id, reason_for_transfusion, 
                       hospital_name, ward_details, contact_person_name, contact_person_phone, receiver_id))
-                self.connection.commit()
+                connection.commit()
+                get_cache("receivers").invalidate(int(receiver_id))
                 return True
         except Exception as e:
             print(f"Error updating receiver: {e}")
-            self.connection.rollback()
+            connection.rollback()
             return False
+        finally:
+            connection.close()
 
     def delete_receiver(self, receiver_id):
-        self.connect()
+        connection = get_connection()
         try:
-            with self.connection.cursor() as cursor:
+            with connection.cursor() as cursor:
                 cursor.execute("DELETE FROM Receivers WHERE receiver_id = %s", (receiver_id,))
-                self.connection.commit()
+                connection.commit()
+                get_cache("receivers").invalidate(int(receiver_id))
                 return True
         except Exception as e:
             print(f"Error deleting receiver: {e}")
-            self.connection.rollback()
-            return False
\ No newline at end of file
+            connection.rollback()
+            return False
+        finally:
+            connection.close()
@@ -0,0 +1,122 @@
+from collections import namedtuple
+
+from database.repositories.blood_unit_repo import INVENTORY_BY_BLOOD_TYPE_QUERY
+from database.streaming import DEFAULT_ITERSIZE, stream_rows
+
+# query returns the report rows exactly as displayed and exported (no
+# trailing semicolon, so it can be wrapped in COPY); dated queries take
+# (start_date, end_date)
+ReportQuery = namedtuple("ReportQuery", ["query", "headers", "dated"])
+
+DONOR_ACTIVITY_QUERY = """
+SELECT
+    d.donor_id,
+    d.first_name || ' ' || d.last_name as donor_name,
+    bt.type_name as blood_type,
+    COUNT(bu.unit_id) as donation_count
+FROM
+    Donors d
+JOIN
+    Blood_Types bt ON d.blood_type_id = bt.blood_type_id
+LEFT JOIN
+    Blood_Units bu ON d.donor_id = bu.donor_id AND
+    bu.collection_date BETWEEN %s AND %s
+GROUP BY
+    d.donor_id, d.first_name, d.last_name, bt.type_name
+ORDER BY
+    donation_count DESC, d.last_name, d.first_name
+"""
+
+REQUEST_SUMMARY_QUERY = """
+SELECT
+    bt.type_name,
+    br.priority,
+    br.status,
+    COUNT(br.request_id) as request_count,
+    COALESCE(SUM(br.units_required), 0) as total_units_required
+FROM
+    Blood_Requests br
+JOIN
+    Blood_Types bt ON br.blood_type_id = bt.blood_type_id
+WHERE
+    br.request_date BETWEEN %s AND %s
+GROUP BY
+    bt.type_name, br.priority, br.status
+ORDER BY
+    bt.type_name, br.priority
+"""
+
+MONTHLY_STATISTICS_QUERY = """
+SELECT
+    to_char(DATE_TRUNC('month', bu.collection_date), 'FMMonth YYYY') as month,
+    COUNT(bu.unit_id) as donation_count,
+    COUNT(DISTINCT bu.donor_id) as unique_donors
+FROM
+    Blood_Units bu
+WHERE
+    bu.collection_date BETWEEN %s AND %s
+GROUP BY
+    DATE_TRUNC('month', bu.collection_date)
+ORDER BY
+    DATE_TRUNC('month', bu.collection_date)
+"""
+
+REPORTS = {
+    "donor_activity": ReportQuery(
+        DONOR_ACTIVITY_QUERY, ("Donor ID", "Donor Name", "Blood Type", "Donations"), True),
+    "blood_inventory": ReportQuery(
+        INVENTORY_BY_BLOOD_TYPE_QUERY,
+        ("Blood Type", "Available Units", "Used Units", "Expired Units", "Total Units"), False),
+    "blood_requests": ReportQuery(
+        REQUEST_SUMMARY_QUERY, ("Blood Type", "Priority", "Status", "Request Count", "Units Required"), True),
+    "monthly_statistics": ReportQuery(
+        MONTHLY_STATISTICS_QUERY, ("Month", "Number of Donations", "Unique Donors"), True),
+}
+
+
+class ReportRepository:
+    """
+    Queries behind the reports. Every method is a generator reading from a
+    server-side cursor, so a report never holds the whole result in memory;
+    rows are dicts keyed by column name. Exports go through
+    utils/report_export.py, which COPYs the same queries to a file.
+    """
+
+    def iter_donor_activity(self, start_date, end_date, itersize=DEFAULT_ITERSIZE):
+        """
+        Yield each donor with the number of units collected between the dates.
+
+        Yields:
+            dict: donor_id, donor_name, blood_type, donation_count
+        """
+        try:
+            yield from stream_rows(DONOR_ACTIVITY_QUERY, (start_date, end_date), itersize, as_dicts=True)
+        except Exception as e:
+            print(f"Error fetching donor activity: {e}")
+            raise
+
+    def iter_request_summary(self, start_date, end_date, itersize=DEFAULT_ITERSIZE):
+        """
+        Yield request counts per blood type, priority and status between the dates.
+
+        Yields:
+            dict: type_name, priority, status, request_count, total_units_required
+        """
+        try:
+            yield from stream_rows(REQUEST_SUMMARY_QUERY, (start_date, end_date), itersize, as_dicts=True)
+        except Exception as e:
+            print(f"Error fetching blood request summary: {e}")
+            raise
+
+    def iter_monthly_statistics(self, start_date, end_date, itersize=DEFAULT_ITERSIZE):
+        """
+        Yield donation counts per month between the dates, oldest month first.
+
+        Yields:
+            dict: month (e.g. "March 2025"), donation_count, unique_donors
+        """
+        try:
+            yield from stream_rows(MONTHLY_STATISTICS_QUERY, (start_date, end_date), itersize, as_dicts=True)
+        except Exception as e:
+            print(f"Error fetching monthly statistics: {e}")
+            raise
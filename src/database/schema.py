@@ -0,0 +1,90 @@
+"""
+Schema Capabilities
+
+Column metadata for the tables whose layout differs between installations
+(older databases lack Blood_Requests.notes, Blood_Units.volume_ml, ...).
+It is loaded with a single catalog query the first time it is needed and
+cached for the life of the process, so repositories can choose their SQL
+without probing information_schema on every call.
+"""
+
+import threading
+
+from database.connection import get_connection
+
+# Tables whose columns the repositories need to know about
+INTROSPECTED_TABLES = ('blood_units', 'blood_requests')
+
+
+class SchemaCapabilities:
+    """Immutable snapshot of the columns present in the introspected tables."""
+
+    def __init__(self, columns):
+        # {table_name: frozenset(column_names)}, all lower case
+        self._columns = {table: frozenset(cols) for table, cols in columns.items()}
+
+    def has_table(self, table):
+        return bool(self._columns.get(table.lower()))
+
+    def has_column(self, table, column):
+        return column.lower() in self._columns.get(table.lower(), ())
+
+    def columns(self, table):
+        return self._columns.get(table.lower(), frozenset())
+
+    def __repr__(self):
+        return f"SchemaCapabilities({ {t: sorted(c) for t, c in self._columns.items()} })"
+
+
+_capabilities = None
+_lock = threading.Lock()
+
+
+def _load_capabilities():
+    """Read the column lists of all introspected tables in one round trip."""
+    conn = get_connection()
+    if conn is None:
+        raise Exception("Could not connect to the database to read the schema")
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT table_name, column_name
+                FROM information_schema.columns
+                WHERE table_schema = current_schema()
+                AND table_name = ANY(%s)
+            """, (list(INTROSPECTED_TABLES),))
+
+            columns = {table: set() for table in INTROSPECTED_TABLES}
+            for table_name, column_name in cursor.fetchall():
+                columns[table_name].add(column_name)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    return SchemaCapabilities(columns)
+
+
+def get_schema():
+    """Return the cached schema capabilities, loading them on first use."""
+    global _capabilities
+    if _capabilities is None:
+        with _lock:
+            if _capabilities is None:
+                _capabilities = _load_capabilities()
+    return _capabilities
+
+
+def refresh_schema():
+    """Reload the column metadata; call after running migrations or DDL."""
+    global _capabilities
+    with _lock:
+        _capabilities = _load_capabilities()
+    return _capabilities
+
+
+def invalidate_schema():
+    """Drop the cached metadata so the next get_schema() reloads it."""
+    global _capabilities
+    with _lock:
+        _capabilities = None
@@ -0,0 +1,56 @@
+"""
+Trigram Search
+
+Donor and receiver search is backed by pg_trgm GIN indexes on one
+lower-cased text expression per table (created by migration 7). A term
+matches when it is a substring of the expression or a close fuzzy match
+of one of its words; results are ranked by word similarity and capped at
+a limit, so a keystroke in the search box is an index lookup rather than
+a sequential scan.
+
+The expressions below are used both to build the indexes and in the
+queries. PostgreSQL only uses an expression index when the query repeats
+the expression exactly, so change them together with a new migration.
+"""
+
+DEFAULT_SEARCH_LIMIT = 100
+
+# {t} is replaced by the table alias ("d." in queries, "" in CREATE INDEX)
+DONOR_SEARCH_EXPRESSION = (
+    "lower({t}first_name || ' ' || {t}last_name || ' ' || "
+    "coalesce({t}email, '') || ' ' || {t}phone_number)"
+)
+RECEIVER_SEARCH_EXPRESSION = (
+    "lower({t}first_name || ' ' || {t}last_name || ' ' || {t}hospital_name)"
+)
+
+
+def search_expression(template, alias=""):
+    """Fill in the table alias of one of the expressions above."""
+    return template.format(t=f"{alias}." if alias else "")
+
+
+def normalize_term(search_term):
+    """Lower-case and trim a search term; returns '' for blank input."""
+    return (search_term or "").strip().lower()
+
+
+def like_pattern(term):
+    """%term% with LIKE wildcards in the term escaped."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_predicate(expression):
+    """
+    Return (where_sql, order_sql) for a ranked trigram search on expression.
+    Both take the parameters from search_params().
+    """
+    where_sql = f"({expression} LIKE %s OR %s <%% {expression})"
+    order_sql = f"word_similarity(%s, {expression}) DESC"
+    return where_sql, order_sql
+
+
+def search_params(term):
+    """Parameters for search_predicate's WHERE and ORDER BY, in order."""
+    return (like_pattern(term), term), (term,)
@@ -0,0 +1,49 @@
+"""
+Streaming Queries
+
+Helpers for reading large result sets without holding them in memory.
+Rows come from a named (server-side) cursor, which PostgreSQL hands over
+`itersize` rows at a time, and are yielded one by one, so memory use is
+bounded by the batch size no matter how many rows the query returns.
+
+The generators keep a pooled connection (and an open read transaction)
+until they are exhausted or closed; consume them promptly, or call close()
+/ use contextlib.closing() when stopping early.
+"""
+
+import itertools
+
+from database.connection import get_connection
+
+# Rows fetched from the server per round trip
+DEFAULT_ITERSIZE = 2000
+
+_cursor_ids = itertools.count(1)
+
+
+def stream_rows(query, params=(), itersize=DEFAULT_ITERSIZE, as_dicts=False):
+    """
+    Yield the rows of a query, fetched from the server in batches of itersize.
+    Rows are tuples, or dicts keyed by column name when as_dicts is set.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise Exception("Could not connect to the database")
+
+    try:
+        # Cursor names only need to be unique per connection
+        with conn.cursor(name=f"stream_{next(_cursor_ids)}") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            columns = None
+            for row in cur:
+                if not as_dicts:
+                    yield row
+                    continue
+                if columns is None:
+                    # A named cursor only has a description after the first fetch
+                    columns = [desc[0] for desc in cur.description]
+                yield dict(zip(columns, row))
+        conn.rollback()
+    finally:
+        conn.close()
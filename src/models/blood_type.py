@@ -1,7 +1,42 @@
+# Red cell compatibility: recipient type -> donor types it can receive, in
+# order of preference. The exact match comes first and O- (the universal
+# donor, always in short supply) comes last so it is only used when nothing
+# else is compatible.
+BLOOD_TYPE_COMPATIBILITY = {
+    'O-': ('O-',),
+    'O+': ('O+', 'O-'),
+    'A-': ('A-', 'O-'),
+    'A+': ('A+', 'A-', 'O+', 'O-'),
+    'B-': ('B-', 'O-'),
+    'B+': ('B+', 'B-', 'O+', 'O-'),
+    'AB-': ('AB-', 'A-', 'B-', 'O-'),
+    'AB+': ('AB+', 'AB-', 'A+', 'A-', 'B+', 'B-', 'O+', 'O-'),
+}
+
+UNIVERSAL_DONOR_TYPE = 'O-'
+
+
+def compatible_donor_types(recipient_type):
+    """Return the donor types a recipient can receive, most preferred first."""
+    return BLOOD_TYPE_COMPATIBILITY.get(recipient_type, ())
+
+
+def compatibility_matrix():
+    """
+    Yield (recipient_type, donor_type, preference, conserve) rows.
+    preference is 0 for the exact match; conserve marks universal donor
+    units given to a different type, which should be used last.
+    """
+    for recipient, donors in BLOOD_TYPE_COMPATIBILITY.items():
+        for preference, donor in enumerate(donors):
+            conserve = donor == UNIVERSAL_DONOR_TYPE and recipient != UNIVERSAL_DONOR_TYPE
+            yield recipient, donor, preference, conserve
+
+
 class BloodType:
     def __init__(self, blood_type_id: int, type_name: str):
         self.blood_type_id = blood_type_id
         self.type_name = type_name
 
     def __repr__(self):
-        return f"BloodType(blood_type_id={self.blood_type_id}, type_name='{self.type_name}')"
\ No newline at end of file
+        return f"BloodType(blood_type_id={self.blood_type_id}, type_name='{self.type_name}')"
@@ -0,0 +1,495 @@
+"""
+Repository Benchmarks
+
+Times the public methods of DonorRepository, ReceiverRepository,
+BloodUnitRepository and BloodRequestRepo against the configured database
+at one or more data volumes, and reports p50/p95/p99 latency, round trips
+(statements sent per call) and rows per second.
+
+Run it against a scratch database: with --populate each scale is reached by
+topping the tables up with utils/generate_test_data.py (scales count
+Blood_Units; donors, receivers and requests grow in proportion), and the
+write benchmarks add, change and delete rows of their own (all removed
+again afterwards; units the expiry sweep marks Expired are made Available
+again). Entity caches are disabled so every call reaches the
+database.
+
+Results are written as JSON. Given --baseline, a method fails when its p95
+grew by more than --threshold (relative) and --min-delta-ms (absolute), or
+when it needs more round trips than in the baseline; the exit status is 1
+if anything regressed.
+
+Usage:
+    python src/utils/benchmark_repositories.py --populate --scales 10000,100000,1000000
+    python src/utils/benchmark_repositories.py --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+# Allow running this file directly (python src/utils/benchmark_repositories.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.cache import set_caching_enabled
+from database.connection import get_connection, set_cursor_factory
+from database.instrumentation import InstrumentedCursor, statement_count
+from database.repositories.blood_request_repo import BloodRequestRepo
+from database.repositories.blood_unit_repo import BloodUnitRepository
+from database.repositories.donor_repo import DonorRepository
+from database.repositories.receiver_repo import ReceiverRepository
+from utils.generate_test_data import AVERAGE_DONATIONS_PER_DONOR, generate_test_data
+
+DEFAULT_SCALES = (10000, 100000, 1000000)
+DEFAULT_ITERATIONS = 50
+
+# Calls for methods that read or write whole tables
+BULK_ITERATIONS = 3
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+
+# Table sizes relative to Blood_Units when populating
+RECEIVERS_PER_UNIT = 0.2
+REQUESTS_PER_UNIT = 0.5
+
+# Identifies the donors and receivers added by the write benchmarks
+BENCHMARK_LAST_NAME = "Benchmark"
+
+SAMPLE_SIZE = 500
+
+# Units moved per transition_status call, and calls timed
+TRANSITION_BATCH = 10
+TRANSITION_ITERATIONS = 20
+
+# Units of one request assigned by the assign_blood_units benchmark, one per call
+ASSIGN_ITERATIONS = 20
+
+class BenchmarkContext:
+    """Sample ids and search terms drawn from the data, plus rows created by the write benchmarks."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.samples = {}
+        self.created = {"units": [], "requests": [], "allocated_units": [], "expired_units": []}
+
+    def pick(self, name):
+        return self.rng.choice(self.samples[name])
+
+    def load_samples(self):
+        queries = {
+            "donor_ids": "SELECT donor_id FROM Donors",
+            "receiver_ids": "SELECT receiver_id FROM Receivers",
+            "unit_ids": "SELECT unit_id FROM Blood_Units",
+            "request_ids": "SELECT request_id FROM Blood_Requests",
+            "last_names": "SELECT DISTINCT last_name FROM Donors",
+            "receiver_names": "SELECT DISTINCT first_name FROM Receivers",
+            "blood_type_ids": "SELECT blood_type_id FROM Blood_Types",
+        }
+        connection = get_connection()
+        try:
+            with connection.cursor() as cursor:
+                for name, query in queries.items():
+                    cursor.execute(f"SELECT * FROM ({query}) s ORDER BY random() LIMIT {SAMPLE_SIZE}")
+                    self.samples[name] = [row[0] for row in cursor.fetchall()]
+            connection.rollback()
+        finally:
+            connection.close()
+        missing = [name for name, values in self.samples.items() if not values]
+        if missing:
+            raise Exception(f"No data to benchmark ({', '.join(missing)} empty); run with --populate")
+
+    def load_created(self, table, id_column, add):
+        """Load the ids of the donors or receivers added by the write benchmarks (calling add() if none)."""
+        if not self._created_ids(table, id_column):
+            add(self)
+            self._created_ids(table, id_column)
+
+    def _created_ids(self, table, id_column):
+        connection = get_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT {id_column} FROM {table} WHERE last_name = %s ORDER BY {id_column}",
+                               (BENCHMARK_LAST_NAME,))
+                self.samples[f"created_{table}"] = [row[0] for row in cursor.fetchall()]
+            connection.rollback()
+        finally:
+            connection.close()
+        return self.samples[f"created_{table}"]
+
+    def cleanup(self):
+        """Remove what the write benchmarks added and undo their allocations and expiries."""
+        connection = get_connection()
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("UPDATE Blood_Units SET status = 'Available' WHERE unit_id = ANY(%s)",
+                                   (self.created["allocated_units"] + self.created["expired_units"],))
+                    cursor.execute("DELETE FROM Blood_Requests WHERE request_id = ANY(%s)",
+                                   (self.created["requests"],))
+                    cursor.execute("DELETE FROM Blood_Units WHERE unit_id = ANY(%s)", (self.created["units"],))
+                    cursor.execute("DELETE FROM Donors WHERE last_name = %s", (BENCHMARK_LAST_NAME,))
+                    cursor.execute("DELETE FROM Receivers WHERE last_name = %s", (BENCHMARK_LAST_NAME,))
+        finally:
+            connection.close()
+        for ids in self.created.values():
+            ids.clear()
+
+# run(context) performs one call and returns the number of rows it returned
+# or wrote; prepare(context) runs once before the calls are timed
+Benchmark = namedtuple("Benchmark", ["name", "run", "iterations", "prepare"])
+
+def _benchmark(name, run, iterations=None, prepare=None):
+    return Benchmark(name, run, iterations, prepare)
+
+def _one(_):
+    """Row count of a call that returns a scalar or nothing."""
+    return 1
+
+_donors = DonorRepository()
+_receivers = ReceiverRepository()
+_units = BloodUnitRepository()
+_today = datetime.date.today()
+
+def _add_donor(ctx):
+    _donors.add_donor("Bench", BENCHMARK_LAST_NAME, "1990-01-01", "Female", "O+",
+                      "+92-300-0000000", "bench@example.com", "1 Benchmark Road")
+    return 1
+
+def _update_donor(ctx):
+    _donors.update_donor(ctx.pick("created_donors"), "Bench", BENCHMARK_LAST_NAME, "1990-01-01", "Female",
+                         "O+", "+92-300-0000001", "bench@example.com", "1 Benchmark Road")
+    return 1
+
+def _delete_donor(ctx):
+    ids = ctx.samples["created_donors"]
+    if not ids:
+        return 0
+    _donors.delete_donor(ids.pop())
+    return 1
+
+def _add_receiver(ctx):
+    _receivers.add_receiver("Bench", BENCHMARK_LAST_NAME, "1980-01-01", "Male", ctx.pick("blood_type_ids"),
+                            "Benchmark", "Benchmark Hospital", "Ward 1", "Bench Contact", "+92-300-0000000")
+    return 1
+
+def _update_receiver(ctx):
+    _receivers.update_receiver(ctx.pick("created_receivers"), "Bench", BENCHMARK_LAST_NAME, "1980-01-01", "Male",
+                               ctx.pick("blood_type_ids"), "Benchmark", "Benchmark Hospital", "Ward 2",
+                               "Bench Contact", "+92-300-0000001")
+    return 1
+
+def _delete_receiver(ctx):
+    ids = ctx.samples["created_receivers"]
+    if not ids:
+        return 0
+    _receivers.delete_receiver(ids.pop())
+    return 1
+
+def _add_blood_unit(ctx):
+    unit_id = _units.add_blood_unit(None, ctx.pick("blood_type_ids"), _today,
+                                    _today + datetime.timedelta(days=42), "Available")
+    ctx.created["units"].append(unit_id)
+    return 1
+
+def _bulk_add_blood_units(ctx):
+    blood_type_id = ctx.pick("blood_type_ids")
+    result = _units.bulk_add_blood_units(
+        {"blood_type_id": blood_type_id, "collection_date": _today.isoformat()} for _ in range(100))
+    ctx.created["units"].extend(result["unit_ids"])
+    return result["inserted"]
+
+def _prepare_transition_status(ctx):
+    result = _units.bulk_add_blood_units(
+        {"blood_type_id": ctx.pick("blood_type_ids"), "collection_date": _today.isoformat()}
+        for _ in range(TRANSITION_BATCH * TRANSITION_ITERATIONS))
+    ctx.created["units"].extend(result["unit_ids"])
+    ctx.samples["transition_units"] = list(result["unit_ids"])
+
+def _transition_status(ctx):
+    pending = ctx.samples["transition_units"]
+    batch = pending[:TRANSITION_BATCH]
+    del pending[:TRANSITION_BATCH]
+    return len(_units.transition_status(batch, "Available", "Assigned"))
+
+def _expire_overdue_units(ctx):
+    # The sweep picks generated units; cleanup() makes them Available again
+    unit_ids = _units.expire_overdue_units()
+    ctx.created["expired_units"].extend(unit_ids)
+    return len(unit_ids)
+
+def _create_request(ctx):
+    request_id = BloodRequestRepo.create_request(ctx.pick("receiver_ids"), ctx.pick("blood_type_ids"), 2)
+    ctx.created["requests"].append(request_id)
+    return 1
+
+def _prepare_assign_blood_units(ctx):
+    blood_type_id = ctx.pick("blood_type_ids")
+    request_id = BloodRequestRepo.create_request(ctx.pick("receiver_ids"), blood_type_id, ASSIGN_ITERATIONS)
+    ctx.created["requests"].append(request_id)
+    result = _units.bulk_add_blood_units(
+        {"blood_type_id": blood_type_id, "collection_date": _today.isoformat()} for _ in range(ASSIGN_ITERATIONS))
+    ctx.created["units"].extend(result["unit_ids"])
+    ctx.samples["assign_units"] = (request_id, list(result["unit_ids"]))
+
+def _assign_blood_units(ctx):
+    request_id, unit_ids = ctx.samples["assign_units"]
+    assignment = BloodRequestRepo.assign_blood_units(request_id, unit_ids[:1])
+    del unit_ids[:1]
+    return assignment["units_allocated"] if assignment else 0
+
+def _allocate_blood_units(ctx):
+    allocation = BloodRequestRepo.allocate_blood_units(ctx.rng.choice(ctx.created["requests"]), 1)
+    if not allocation:
+        return 0
+    ctx.created["allocated_units"].extend(allocation["unit_ids"])
+    return allocation["units_allocated"]
+
+BENCHMARKS = [
+    # DonorRepository
+    _benchmark("DonorRepository.get_donor_by_id", lambda ctx: 1 if _donors.get_donor_by_id(ctx.pick("donor_ids")) else 0),
+    _benchmark("DonorRepository.get_donors_page", lambda ctx: len(_donors.get_donors_page()[0])),
+    _benchmark("DonorRepository.count_donors", lambda ctx: _one(_donors.count_donors())),
+    _benchmark("DonorRepository.search_donors", lambda ctx: len(_donors.search_donors(ctx.pick("last_names")))),
+    _benchmark("DonorRepository.get_all_donors", lambda ctx: len(_donors.get_all_donors()), BULK_ITERATIONS),
+    _benchmark("DonorRepository.iter_donors", lambda ctx: sum(1 for _ in _donors.iter_donors()), BULK_ITERATIONS),
+    _benchmark("DonorRepository.add_donor", _add_donor),
+    _benchmark("DonorRepository.update_donor", _update_donor,
+               prepare=lambda ctx: ctx.load_created("donors", "donor_id", _add_donor)),
+    _benchmark("DonorRepository.delete_donor", _delete_donor,
+               prepare=lambda ctx: ctx.load_created("donors", "donor_id", _add_donor)),
+
+    # ReceiverRepository
+    _benchmark("ReceiverRepository.get_receiver_by_id",
+               lambda ctx: 1 if _receivers.get_receiver_by_id(ctx.pick("receiver_ids")) else 0),
+    _benchmark("ReceiverRepository.get_receivers_page", lambda ctx: len(_receivers.get_receivers_page()[0])),
+    _benchmark("ReceiverRepository.count_receivers", lambda ctx: _one(_receivers.count_receivers())),
+    _benchmark("ReceiverRepository.search_receivers",
+               lambda ctx: len(_receivers.search_receivers(ctx.pick("receiver_names")))),
+    _benchmark("ReceiverRepository.get_all_receivers", lambda ctx: len(_receivers.get_all_receivers()),
+               BULK_ITERATIONS),
+    _benchmark("ReceiverRepository.add_receiver", _add_receiver),
+    _benchmark("ReceiverRepository.update_receiver", _update_receiver,
+               prepare=lambda ctx: ctx.load_created("receivers", "receiver_id", _add_receiver)),
+    _benchmark("ReceiverRepository.delete_receiver", _delete_receiver,
+               prepare=lambda ctx: ctx.load_created("receivers", "receiver_id", _add_receiver)),
+
+    # BloodUnitRepository
+    _benchmark("BloodUnitRepository.get_blood_unit_by_id",
+               lambda ctx: 1 if _units.get_blood_unit_by_id(ctx.pick("unit_ids")) else 0),
+    _benchmark("BloodUnitRepository.get_blood_units_page", lambda ctx: len(_units.get_blood_units_page()[0])),
+    _benchmark("BloodUnitRepository.count_blood_units", lambda ctx: _one(_units.count_blood_units())),
+    _benchmark("BloodUnitRepository.get_available_blood_units_by_type",
+               lambda ctx: len(_units.get_available_blood_units_by_type(ctx.pick("blood_type_ids")))),
+    _benchmark("BloodUnitRepository.get_compatible_blood_units",
+               lambda ctx: len(_units.get_compatible_blood_units(ctx.pick("blood_type_ids")))),
+    _benchmark("BloodUnitRepository.get_inventory_summary", lambda ctx: len(_units.get_inventory_summary())),
+    _benchmark("BloodUnitRepository.get_inventory_by_blood_type",
+               lambda ctx: len(_units.get_inventory_by_blood_type())),
+    _benchmark("BloodUnitRepository.get_all_blood_units", lambda ctx: len(_units.get_all_blood_units()),
+               BULK_ITERATIONS),
+    _benchmark("BloodUnitRepository.iter_blood_units", lambda ctx: sum(1 for _ in _units.iter_blood_units()),
+               BULK_ITERATIONS),
+    _benchmark("BloodUnitRepository.add_blood_unit", _add_blood_unit),
+    _benchmark("BloodUnitRepository.update_blood_unit_status",
+               lambda ctx: _one(_units.update_blood_unit_status(ctx.rng.choice(ctx.created["units"]), "Available")),
+               prepare=lambda ctx: ctx.created["units"] or _add_blood_unit(ctx)),
+    _benchmark("BloodUnitRepository.transition_status", _transition_status, TRANSITION_ITERATIONS,
+               prepare=_prepare_transition_status),
+    _benchmark("BloodUnitRepository.bulk_add_blood_units", _bulk_add_blood_units, 10),
+    _benchmark("BloodUnitRepository.expire_overdue_units", _expire_overdue_units, 5),
+
+    # BloodRequestRepo
+    _benchmark("BloodRequestRepo.get_request_by_id",
+               lambda ctx: 1 if BloodRequestRepo.get_request_by_id(ctx.pick("request_ids")) else 0),
+    _benchmark("BloodRequestRepo.get_requests_page", lambda ctx: len(BloodRequestRepo.get_requests_page()[0])),
+    _benchmark("BloodRequestRepo.get_requests_page (Pending)",
+               lambda ctx: len(BloodRequestRepo.get_requests_page(status="Pending")[0])),
+    _benchmark("BloodRequestRepo.count_requests", lambda ctx: _one(BloodRequestRepo.count_requests())),
+    _benchmark("BloodRequestRepo.search_requests",
+               lambda ctx: len(BloodRequestRepo.search_requests(ctx.pick("receiver_names")))),
+    _benchmark("BloodRequestRepo.get_all_requests", lambda ctx: len(BloodRequestRepo.get_all_requests()),
+               BULK_ITERATIONS),
+    _benchmark("BloodRequestRepo.create_request", _create_request),
+    _benchmark("BloodRequestRepo.update_request_status",
+               lambda ctx: _one(BloodRequestRepo.update_request_status(ctx.rng.choice(ctx.created["requests"]),
+                                                                       "Pending")),
+               prepare=lambda ctx: ctx.created["requests"] or _create_request(ctx)),
+    _benchmark("BloodRequestRepo.fulfill_units",
+               lambda ctx: _one(BloodRequestRepo.fulfill_units(ctx.rng.choice(ctx.created["requests"]), 0)),
+               prepare=lambda ctx: ctx.created["requests"] or _create_request(ctx)),
+    _benchmark("BloodRequestRepo.allocate_blood_units", _allocate_blood_units,
+               prepare=lambda ctx: ctx.created["requests"] or _create_request(ctx)),
+    _benchmark("BloodRequestRepo.assign_blood_units", _assign_blood_units, ASSIGN_ITERATIONS,
+               prepare=_prepare_assign_blood_units),
+]
+
+def _percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def run_benchmark(benchmark, ctx, iterations):
+    """Call a benchmark `iterations` times; returns its statistics."""
+    if benchmark.prepare:
+        benchmark.prepare(ctx)
+    iterations = benchmark.iterations or iterations
+    latencies = []
+    rows = 0
+    round_trips = 0
+    for _ in range(iterations):
+        trips_before = statement_count()
+        started = time.perf_counter()
+        rows += benchmark.run(ctx)
+        latencies.append(time.perf_counter() - started)
+        round_trips += statement_count() - trips_before
+    if not round_trips:
+        print(f"  warning: no statements counted for {benchmark.name}; its round trips cannot regress")
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(total / iterations * 1000, 3),
+        "round_trips": round(round_trips / iterations, 2),
+        "rows_per_sec": round(rows / total, 1) if total else 0.0,
+    }
+
+def table_counts():
+    connection = get_connection()
+    try:
+        with connection.cursor() as cursor:
+            counts = {}
+            for table in ("donors", "receivers", "blood_units", "blood_requests"):
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[table] = cursor.fetchone()[0]
+        connection.rollback()
+        return counts
+    finally:
+        connection.close()
+
+def populate(scale, seed):
+    """Top Blood_Units up to `scale` rows, adding donors, receivers and requests in proportion."""
+    missing = scale - table_counts()["blood_units"]
+    if missing <= 0:
+        return True
+    print(f"Populating to {scale} blood units...")
+    # Each scale gets its own seed so topping up adds new rows, not copies
+    result = generate_test_data(
+        donors=max(1, missing // AVERAGE_DONATIONS_PER_DONOR), units=missing,
+        receivers=max(1, int(missing * RECEIVERS_PER_UNIT)), requests=int(missing * REQUESTS_PER_UNIT),
+        seed=seed + scale)
+    return result is not None
+
+def run_benchmarks(scales, iterations=DEFAULT_ITERATIONS, seed=1, populate_data=False, only=None):
+    """
+    Run BENCHMARKS at every scale.
+
+    Returns:
+        dict: {"scales": {scale: {benchmark name: statistics}}, ...}
+    """
+    # Round trips are counted by the instrumented cursor, even if instrumentation is off
+    set_cursor_factory(InstrumentedCursor)
+    set_caching_enabled(False)
+    results = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "iterations": iterations,
+        "scales": {},
+    }
+    for scale in scales:
+        if populate_data and not populate(scale, seed):
+            raise Exception(f"Could not populate the database to {scale} rows")
+        counts = table_counts()
+        print(f"\nScale {scale}: {counts}")
+
+        ctx = BenchmarkContext(seed)
+        ctx.load_samples()
+        scale_results = {"table_counts": counts, "benchmarks": {}}
+        try:
+            for benchmark in BENCHMARKS:
+                if only and only not in benchmark.name:
+                    continue
+                stats = run_benchmark(benchmark, ctx, iterations)
+                scale_results["benchmarks"][benchmark.name] = stats
+                print(f"  {benchmark.name:55} p50 {stats['p50_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms  "
+                      f"p99 {stats['p99_ms']:9.2f} ms  {stats['round_trips']:5.1f} trips  "
+                      f"{stats['rows_per_sec']:10.0f} rows/s")
+        finally:
+            ctx.cleanup()
+        results["scales"][str(scale)] = scale_results
+    return results
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    Returns:
+        list: (scale, benchmark name, reason) for every regression
+    """
+    regressions = []
+    for scale, scale_results in results["scales"].items():
+        baseline_scale = baseline.get("scales", {}).get(scale)
+        if not baseline_scale:
+            continue
+        for name, stats in scale_results["benchmarks"].items():
+            before = baseline_scale["benchmarks"].get(name)
+            if not before:
+                continue
+            delta = stats["p95_ms"] - before["p95_ms"]
+            if delta > min_delta_ms and stats["p95_ms"] > before["p95_ms"] * (1 + threshold):
+                regressions.append((scale, name, f"p95 {before['p95_ms']:.2f} -> {stats['p95_ms']:.2f} ms"))
+            if stats["round_trips"] > before["round_trips"]:
+                regressions.append((scale, name,
+                                    f"round trips {before['round_trips']} -> {stats['round_trips']}"))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the repository methods")
+    parser.add_argument('--scales', default=",".join(str(s) for s in DEFAULT_SCALES),
+                        help='Comma-separated Blood_Units counts (default: 10000,100000,1000000)')
+    parser.add_argument('--populate', action='store_true',
+                        help='Generate data to reach each scale (use a scratch database)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS,
+                        help=f'Calls per method (default: {DEFAULT_ITERATIONS})')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for data and parameter choice')
+    parser.add_argument('--only', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write the results')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write the results to --baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed relative p95 increase (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help=f'Ignore p95 increases smaller than this (default: {DEFAULT_MIN_DELTA_MS})')
+    args = parser.parse_args()
+
+    try:
+        results = run_benchmarks([int(s) for s in args.scales.split(",")], args.iterations, args.seed,
+                                 args.populate, args.only)
+    except Exception as e:
+        print(f"Error running benchmarks: {e}")
+        sys.exit(2)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold, args.min_delta_ms)
+        for scale, name, reason in regressions:
+            print(f"REGRESSION  [{scale}] {name}: {reason}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
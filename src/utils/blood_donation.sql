@@ -1,8 +1,7 @@
 -- Blood Donation Management System Database Schema
 
--- Drop blood unit related tables first since they've been removed from the system
-DROP TABLE IF EXISTS Blood_Request_Units CASCADE;
-DROP TABLE IF EXISTS Blood_Units CASCADE;
+-- Blood_Units is created by the migration runner (src/utils/migrations.py);
+-- this script only creates missing tables and never drops existing data.
 
 -- Create only tables that don't exist
 DO $$
@@ -0,0 +1,62 @@
+"""
+Bulk Donation Intake
+
+Loads blood units exported by collection drives (CSV with a header row) in a
+single COPY-based transaction through BloodUnitRepository.bulk_add_blood_units.
+
+Expected columns: donor_id, blood_type_id, collection_date and optionally
+expiration_date, status, storage_location, volume_ml. Dates are YYYY-MM-DD.
+
+Usage:
+    python src/utils/bulk_intake.py units.csv
+"""
+
+import csv
+import os
+import sys
+
+# Allow running this file directly (python src/utils/bulk_intake.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.repositories.blood_unit_repo import BloodUnitRepository
+
+INTAKE_COLUMNS = ('donor_id', 'blood_type_id', 'collection_date', 'expiration_date',
+                  'status', 'storage_location', 'volume_ml')
+
+def read_intake_csv(path):
+    """Yield one dict per CSV row, with blank fields turned into None."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = {'blood_type_id', 'collection_date'} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {', '.join(sorted(missing))}")
+
+        for row in reader:
+            yield {column: (row.get(column) or '').strip() or None for column in INTAKE_COLUMNS}
+
+def import_blood_units_csv(path):
+    """
+    Import blood units from a CSV file.
+
+    Returns:
+        dict: The bulk_add_blood_units result, or None if the import failed
+    """
+    try:
+        result = BloodUnitRepository().bulk_add_blood_units(read_intake_csv(path))
+    except Exception as e:
+        print(f"Error importing blood units from {path}: {e}")
+        return None
+
+    print(f"Imported {result['inserted']} blood units, "
+          f"updated {result['donors_updated']} donors, "
+          f"rejected {len(result['rejected'])} rows.")
+    for row_number, reason in result['rejected']:
+        # Row 1 is the first line after the header
+        print(f"  Row {row_number} (line {row_number + 1}): {reason}")
+    return result
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python src/utils/bulk_intake.py units.csv")
+        sys.exit(1)
+    sys.exit(0 if import_blood_units_csv(sys.argv[1]) is not None else 1)
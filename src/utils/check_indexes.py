@@ -0,0 +1,164 @@
+"""
+Index Usage Check
+
+Runs EXPLAIN (FORMAT JSON) on the hot repository and report queries and
+reports the indexes each one uses. A query fails the check when one of its
+large tables is read with a sequential scan even though sequential scans
+are disabled for the check, i.e. when no index can serve it. (On a small
+development database the planner would pick sequential scans anyway, so
+the check asks whether an index is usable, not whether it is chosen.)
+Scans of a partition (see partitioning.py) count as scans of its table.
+
+CHECKED_QUERIES names each repository method and builds its SQL with the
+query constants and builders the repository itself executes, so the check
+always EXPLAINs the statements the application sends.
+
+Usage:
+    python src/utils/check_indexes.py [--verbose]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+
+# Allow running this file directly (python src/utils/check_indexes.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import get_connection
+from database.repositories.blood_request_repo import REQUEST_SORT_OPTIONS, request_by_id_query, requests_page_query
+from database.repositories.blood_unit_repo import (AVAILABLE_UNITS_BY_TYPE_QUERY, EXPIRE_OVERDUE_UNITS_QUERY,
+                                                   UNIT_SORT_OPTIONS, blood_units_page_query,
+                                                   compatible_units_query)
+from database.repositories.donor_repo import (DONOR_BY_ID_QUERY, DONOR_SORT_OPTIONS, donor_search_query,
+                                              donors_page_query)
+from database.repositories.paging import resolve_sort_key
+from database.repositories.receiver_repo import RECEIVER_SORT_OPTIONS, receiver_search_query, receivers_page_query
+from database.repositories.report_repo import REPORTS
+from database.schema import get_schema
+
+_today = datetime.date.today()
+_year_ago = _today - datetime.timedelta(days=365)
+
+def _page(build, sort_options, sort_by, primary_key, after, **kwargs):
+    return lambda: build(resolve_sort_key(sort_options, sort_by, primary_key), after, **kwargs)
+
+def _report(report):
+    return lambda: (REPORTS[report].query, (_year_ago, _today))
+
+# (name, tables that must be read through an index, build) where build()
+# returns the repository's own (sql, params)
+CHECKED_QUERIES = [
+    ("DonorRepository.get_donor_by_id", ("donors",), lambda: (DONOR_BY_ID_QUERY, (1,))),
+    ("DonorRepository.get_donors_page", ("donors",),
+     _page(donors_page_query, DONOR_SORT_OPTIONS, "name", "d.donor_id", ("M", "", 0))),
+    ("DonorRepository.search_donors", ("donors",), lambda: donor_search_query("smith")),
+    ("ReceiverRepository.get_receivers_page", ("receivers",),
+     _page(receivers_page_query, RECEIVER_SORT_OPTIONS, "name", "r.receiver_id", ("M", "", 0))),
+    ("ReceiverRepository.search_receivers", ("receivers",), lambda: receiver_search_query("smith")),
+    ("ReceiverRepository.search_receivers (blood type)", ("receivers",), lambda: receiver_search_query("o+")),
+    ("BloodUnitRepository.get_blood_units_page", ("blood_units",),
+     _page(blood_units_page_query, UNIT_SORT_OPTIONS, "collected", "u.unit_id", None)),
+    ("BloodUnitRepository.get_available_blood_units_by_type", ("blood_units",),
+     lambda: (AVAILABLE_UNITS_BY_TYPE_QUERY, (1,))),
+    ("BloodUnitRepository.get_compatible_blood_units", ("blood_units",),
+     lambda: (compatible_units_query(get_schema()), (1,))),
+    ("BloodUnitRepository.expire_overdue_units", ("blood_units",), lambda: (EXPIRE_OVERDUE_UNITS_QUERY, (1000,))),
+    ("BloodRequestRepo.get_requests_page", ("blood_requests",),
+     _page(requests_page_query, REQUEST_SORT_OPTIONS, "date", "br.request_id", None)),
+    ("BloodRequestRepo.get_requests_page (status)", ("blood_requests",),
+     _page(requests_page_query, REQUEST_SORT_OPTIONS, "date", "br.request_id", None, status="Pending")),
+    ("BloodRequestRepo.get_request_by_id", ("blood_requests", "receivers"), lambda: (request_by_id_query(), (1,))),
+    ("ReportRepository.iter_donor_activity", ("blood_units",), _report("donor_activity")),
+    ("ReportRepository.iter_monthly_statistics", ("blood_units",), _report("monthly_statistics")),
+    ("ReportRepository.iter_request_summary", ("blood_requests",), _report("blood_requests")),
+]
+
+def plan_nodes(plan):
+    """Yield a plan node and all nodes below it."""
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from plan_nodes(child)
+
+def explain(cursor, sql, params):
+    """The root plan node of EXPLAIN (FORMAT JSON) for a query."""
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+    result = cursor.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+def partition_parents(cursor):
+    """{partition name: name of the table it belongs to} for every partition in the schema."""
+    cursor.execute("""
+        SELECT c.relname, p.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relkind = 'p' AND p.relnamespace = current_schema()::regnamespace
+    """)
+    return dict(cursor.fetchall())
+
+def check_query(cursor, sql, params, indexed_tables, parents=None):
+    """
+    Returns:
+        tuple: (tables read with a sequential scan, index names used, plan)
+    """
+    parents = parents or {}
+    plan = explain(cursor, sql, params)
+    seq_scanned = set()
+    indexes = set()
+    for node in plan_nodes(plan):
+        if node.get("Index Name"):
+            indexes.add(node["Index Name"])
+        if node["Node Type"] == "Seq Scan":
+            relation = node.get("Relation Name")
+            table = parents.get(relation, relation)
+            if table in indexed_tables:
+                seq_scanned.add(table if table == relation else f"{table} ({relation})")
+    return seq_scanned, indexes, plan
+
+def check_indexes(verbose=False):
+    """
+    EXPLAIN every query in CHECKED_QUERIES and print the result.
+
+    Returns:
+        bool: True if every query can use an index, None if the check could not run
+    """
+    connection = get_connection()
+    if not connection:
+        print("Error: Could not connect to the database.")
+        return None
+
+    failures = 0
+    try:
+        with connection.cursor() as cursor:
+            # Only for this transaction, which is rolled back below
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            parents = partition_parents(cursor)
+            for name, indexed_tables, build in CHECKED_QUERIES:
+                sql, params = build()
+                seq_scanned, indexes, plan = check_query(cursor, sql, params, indexed_tables, parents)
+                if seq_scanned:
+                    failures += 1
+                    print(f"FAIL  {name}: sequential scan of {', '.join(sorted(seq_scanned))}")
+                else:
+                    print(f"ok    {name}: {', '.join(sorted(indexes)) or 'no index needed'}")
+                if verbose:
+                    print(json.dumps(plan, indent=2))
+    except Exception as e:
+        print(f"Error checking index usage: {e}")
+        return None
+    finally:
+        connection.rollback()
+        connection.close()
+
+    print(f"{len(CHECKED_QUERIES) - failures} of {len(CHECKED_QUERIES)} queries can use an index.")
+    return failures == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the hot queries can use an index")
+    parser.add_argument('--verbose', action='store_true', help='Print the full plan of every query')
+    args = parser.parse_args()
+    sys.exit(0 if check_indexes(args.verbose) else 1)
@@ -0,0 +1,61 @@
+"""
+Instrumentation Check
+
+Feeds the statement shapes the repositories pass to execute() -- plain
+text, bytes and psycopg2.sql Composables (as MedicalConditionsRepo builds
+them) -- through fingerprint() and record() and checks each one is
+counted under the expected fingerprint. Needs no database connection.
+
+Usage:
+    python src/utils/check_instrumentation.py
+"""
+
+import os
+import sys
+
+# Allow running this file directly (python src/utils/check_instrumentation.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2 import sql
+
+from database.instrumentation import fingerprint, query_summary, record
+
+# (description, query as passed to execute(), expected fingerprint)
+CHECKED_QUERIES = [
+    ("text", "SELECT * FROM donors WHERE donor_id = 42", "SELECT * FROM donors WHERE donor_id = ?"),
+    ("bytes", b"SELECT name FROM donors WHERE name = 'Ann'", "SELECT name FROM donors WHERE name = ?"),
+    ("sql.SQL", sql.SQL("DELETE FROM medical_conditions WHERE condition_id = %s"),
+     "DELETE FROM medical_conditions WHERE condition_id = %s"),
+    ("sql.Composed",
+     sql.SQL("UPDATE {} SET {} = %s WHERE condition_id = %s").format(
+         sql.Identifier("medical_conditions"), sql.Identifier("condition_name")),
+     'UPDATE "medical_conditions" SET "condition_name" = %s WHERE condition_id = %s'),
+]
+
+
+def check_instrumentation():
+    """Print the result for each query shape; True when all of them pass."""
+    passed = True
+    for description, query, expected in CHECKED_QUERIES:
+        try:
+            key = fingerprint(query)
+            before = next((s["calls"] for s in query_summary() if s["fingerprint"] == key), 0)
+            record(query, 0.001, 1)
+            after = next((s["calls"] for s in query_summary() if s["fingerprint"] == key), 0)
+        except Exception as e:
+            print(f"FAIL {description}: {e}")
+            passed = False
+            continue
+        if key != expected:
+            print(f"FAIL {description}: fingerprint {key!r}, expected {expected!r}")
+            passed = False
+        elif after != before + 1:
+            print(f"FAIL {description}: record() did not count the statement")
+            passed = False
+        else:
+            print(f"ok   {description}: {key}")
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_instrumentation() else 1)
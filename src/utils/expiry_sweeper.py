@@ -0,0 +1,127 @@
+"""
+Blood Unit Expiry Sweeper
+
+Marks Available units whose expiration_date has passed as Expired, in
+batches (BloodUnitRepository.expire_overdue_units), and records each run
+in Expiry_Sweep_Log. The application runs it in a background thread every
+SWEEP_INTERVAL_SECONDS; it can also be run on its own, e.g. from cron. The
+thread also keeps the partitions of partitioned tables up to date
+(utils/partitioning.py), which is a single catalog query when nothing is
+partitioned.
+
+Usage:
+    python src/utils/expiry_sweeper.py [--batch-size N] [--interval SECONDS]
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import threading
+
+# Allow running this file directly (python src/utils/expiry_sweeper.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import get_connection
+from database.repositories.blood_unit_repo import EXPIRY_BATCH_SIZE, BloodUnitRepository
+from utils.partitioning import maintain_partitions
+
+# Units expire at day granularity, so sweeping hourly is plenty
+SWEEP_INTERVAL_SECONDS = 3600
+
+def record_sweep(started_at, units_expired, batches):
+    """Add a row to Expiry_Sweep_Log."""
+    connection = get_connection()
+    try:
+        with connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO Expiry_Sweep_Log (started_at, units_expired, batches)
+                    VALUES (%s, %s, %s)
+                """, (started_at, units_expired, batches))
+    finally:
+        connection.close()
+
+def sweep_expired_units(batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Expire every overdue Available unit, one batch per transaction.
+
+    Returns:
+        int: Number of units marked Expired, or None if the sweep failed
+    """
+    started_at = datetime.datetime.now()
+    repo = BloodUnitRepository()
+    units_expired = 0
+    batches = 0
+    try:
+        while True:
+            unit_ids = repo.expire_overdue_units(batch_size)
+            if not unit_ids:
+                break
+            units_expired += len(unit_ids)
+            batches += 1
+            if len(unit_ids) < batch_size:
+                break
+        record_sweep(started_at, units_expired, batches)
+    except Exception as e:
+        print(f"Error sweeping expired blood units: {e}")
+        return None
+
+    if units_expired:
+        print(f"Marked {units_expired} expired blood units in {batches} batches.")
+    return units_expired
+
+class ExpirySweeper(threading.Thread):
+    """
+    Runs maintain_partitions and sweep_expired_units now and then every
+    `interval` seconds until stopped.
+    """
+
+    def __init__(self, interval=SWEEP_INTERVAL_SECONDS, batch_size=EXPIRY_BATCH_SIZE):
+        super().__init__(name="expiry-sweeper", daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            maintain_partitions()
+            sweep_expired_units(self.batch_size)
+            self._stop_event.wait(self.interval)
+
+_sweeper = None
+
+def start_sweeper(interval=SWEEP_INTERVAL_SECONDS):
+    """Start the background sweeper (idempotent)."""
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = ExpirySweeper(interval)
+        _sweeper.start()
+    return _sweeper
+
+def stop_sweeper():
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.stop()
+        _sweeper = None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mark expired blood units")
+    parser.add_argument('--batch-size', type=int, default=EXPIRY_BATCH_SIZE,
+                        help=f'Units per transaction (default: {EXPIRY_BATCH_SIZE})')
+    parser.add_argument('--interval', type=int,
+                        help='Keep running, sweeping every INTERVAL seconds')
+    args = parser.parse_args()
+
+    if args.interval:
+        sweeper = ExpirySweeper(args.interval, args.batch_size)
+        sweeper.start()
+        try:
+            sweeper.join()
+        except KeyboardInterrupt:
+            sweeper.stop()
+    else:
+        sys.exit(0 if sweep_expired_units(args.batch_size) is not None else 1)
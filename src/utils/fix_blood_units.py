@@ -1,4 +1,39 @@
 from database.connection import get_connection
+from database.schema import invalidate_schema
+
+def apply_blood_units_table(cursor):
+    """
+    Create the Blood_Units table if it is missing.
+    Idempotent; runs inside the caller's transaction. Returns True if the table was created.
+    """
+    # Check if the table exists
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT FROM information_schema.tables
+            WHERE table_name = 'blood_units'
+        );
+    """)
+    table_exists = cursor.fetchone()[0]
+
+    if table_exists:
+        print("Blood_Units table already exists.")
+        return False
+
+    print("Creating Blood_Units table...")
+    # Create the blood_units table
+    cursor.execute("""
+        CREATE TABLE Blood_Units (
+            unit_id SERIAL PRIMARY KEY,
+            donor_id INTEGER REFERENCES Donors(donor_id),
+            blood_type_id INTEGER NOT NULL REFERENCES Blood_Types(blood_type_id),
+            collection_date DATE NOT NULL,
+            expiration_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'Available',
+            storage_location VARCHAR(100),
+            volume_ml INTEGER DEFAULT 450
+        );
+    """)
+    return True
 
 def create_blood_units_table():
     """
@@ -11,38 +46,14 @@ def create_blood_units_table():
         if not conn:
             print("Error: Could not connect to the database.")
             return False
-            
+
         cursor = conn.cursor()
-        
-        # Check if the table exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_name = 'blood_units'
-            );
-        """)
-        table_exists = cursor.fetchone()[0]
-        
-        if not table_exists:
-            print("Creating Blood_Units table...")
-            # Create the blood_units table
-            cursor.execute("""
-                CREATE TABLE Blood_Units (
-                    unit_id SERIAL PRIMARY KEY,
-                    donor_id INTEGER REFERENCES Donors(donor_id),
-                    blood_type_id INTEGER NOT NULL REFERENCES Blood_Types(blood_type_id),
-                    collection_date DATE NOT NULL,
-                    expiration_date DATE NOT NULL,
-                    status VARCHAR(20) NOT NULL DEFAULT 'Available',
-                    storage_location VARCHAR(100),
-                    volume_ml INTEGER DEFAULT 450
-                );
-            """)
+
+        if apply_blood_units_table(cursor):
             conn.commit()
+            invalidate_schema()
             print("Blood_Units table created successfully.")
-        else:
-            print("Blood_Units table already exists.")
-            
+
         cursor.close()
         return True
     except Exception as e:
@@ -58,4 +69,4 @@ def create_blood_units_table():
 
 if __name__ == "__main__":
     # When run directly, create the Blood_Units table
-    create_blood_units_table()
\ No newline at end of file
+    create_blood_units_table()
@@ -9,16 +9,61 @@ sys.path.insert(0, os.path.dirname(parent_dir))
 
 try:
     from database.connection import get_connection
+    from database.schema import invalidate_schema
 except ImportError:
     try:
         from src.database.connection import get_connection
+        from src.database.schema import invalidate_schema
     except ImportError:
         # If running from the src directory
         try:
             from database.connection import get_connection
+            from database.schema import invalidate_schema
         except ImportError:
             raise ImportError("Could not import get_connection, check your Python path")
 
+def apply_blood_requests_fix(cursor):
+    """
+    Make sure blood_requests has units_required and units_fulfilled columns.
+    Idempotent; runs inside the caller's transaction.
+    """
+    # Check if units_requested column exists but units_required doesn't
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'blood_requests'
+        AND column_name IN ('units_requested', 'units_required', 'units_fulfilled')
+    """)
+    columns = [row[0] for row in cursor.fetchall()]
+    
+    print(f"Found columns: {columns}")
+    
+    if 'units_requested' in columns and 'units_required' not in columns:
+        print("Fixing column name: units_requested -> units_required")
+        cursor.execute("""
+            ALTER TABLE blood_requests
+            RENAME COLUMN units_requested TO units_required
+        """)
+        print("Column renamed successfully")
+    elif 'units_required' not in columns:
+        print("Creating units_required column")
+        cursor.execute("""
+            ALTER TABLE blood_requests
+            ADD COLUMN units_required INTEGER NOT NULL DEFAULT 1
+        """)
+        print("Column created successfully")
+    else:
+        print("No fix needed for blood_requests table")
+    
+    # Make sure units_fulfilled column exists
+    if 'units_fulfilled' not in columns:
+        print("Adding units_fulfilled column")
+        cursor.execute("""
+            ALTER TABLE blood_requests
+            ADD COLUMN units_fulfilled INTEGER NOT NULL DEFAULT 0
+        """)
+        print("Units fulfilled column added successfully")
+
 def fix_blood_requests_table():
     """
     Fix the blood_requests table in case the column name is units_requested instead of units_required
@@ -27,47 +72,7 @@ def fix_blood_requests_table():
     try:
         with connection:
             with connection.cursor() as cursor:
-                # Check if units_requested column exists but units_required doesn't
-                cursor.execute("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'blood_requests'
-                    AND column_name IN ('units_requested', 'units_required')
-                """)
-                columns = [row[0] for row in cursor.fetchall()]
-                
-                print(f"Found columns: {columns}")
-                
-                if 'units_requested' in columns and 'units_required' not in columns:
-                    print("Fixing column name: units_requested -> units_required")
-                    cursor.execute("""
-                        ALTER TABLE blood_requests
-                        RENAME COLUMN units_requested TO units_required
-                    """)
-                    print("Column renamed successfully")
-                elif 'units_required' not in columns:
-                    print("Creating units_required column")
-                    cursor.execute("""
-                        ALTER TABLE blood_requests
-                        ADD COLUMN units_required INTEGER NOT NULL DEFAULT 1
-                    """)
-                    print("Column created successfully")
-                else:
-                    print("No fix needed for blood_requests table")
-                  # Make sure units_fulfilled column exists
-                cursor.execute("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'blood_requests'
-                    AND column_name = 'units_fulfilled'
-                """)
-                if not cursor.fetchone():
-                    print("Adding units_fulfilled column")
-                    cursor.execute("""
-                        ALTER TABLE blood_requests
-                        ADD COLUMN units_fulfilled INTEGER NOT NULL DEFAULT 0
-                    """)
-                    print("Units fulfilled column added successfully")
+                apply_blood_requests_fix(cursor)
                 
                 # Print the current structure
                 cursor.execute("""
@@ -79,6 +84,9 @@ def fix_blood_requests_table():
                 print("Current blood_requests table structure:")
                 for row in cursor.fetchall():
                     print(f"  {row[0]} ({row[1]})")
+        
+        # Columns may have been added or renamed
+        invalidate_schema()
     finally:
         connection.close()
 
@@ -148,6 +156,68 @@ def check_blood_units_table():
     finally:
         connection.close()
 
+def apply_blood_unit_status_fix(cursor):
+    """
+    Make blood_units.status a VARCHAR(20) that accepts every status the
+    application uses. Idempotent; runs inside the caller's transaction.
+    """
+    # First check if there's an enum issue
+    cursor.execute("""
+        SELECT
+            pg_enum.enumlabel
+        FROM pg_type 
+        JOIN pg_enum ON pg_enum.enumtypid = pg_type.oid 
+        WHERE pg_type.typname = 'blood_unit_status'
+    """)
+    
+    enum_values = [row[0] for row in cursor.fetchall()]
+    
+    if enum_values:
+        print(f"Found blood_unit_status enum with values: {enum_values}")
+        
+        # Valid statuses that need to be supported
+        valid_statuses = ["Available", "Allocated", "Expired", "Quarantined", "Discarded"]
+        missing_statuses = [status for status in valid_statuses if status not in enum_values]
+        
+        if missing_statuses:
+            print(f"Missing statuses in enum: {missing_statuses}")
+            
+            # The safest approach is to change the column type to varchar
+            print("Changing status column from enum to varchar...")
+            
+            # Create a temporary column, copy data, drop old column, and rename
+            cursor.execute("""
+                ALTER TABLE blood_units ADD COLUMN status_new VARCHAR(20);
+                UPDATE blood_units SET status_new = status::text;
+                ALTER TABLE blood_units DROP COLUMN status;
+                ALTER TABLE blood_units RENAME COLUMN status_new TO status;
+                ALTER TABLE blood_units ALTER COLUMN status SET NOT NULL;
+                ALTER TABLE blood_units ALTER COLUMN status SET DEFAULT 'Available';
+            """)
+            
+            print("Column type changed to VARCHAR(20)")
+    else:
+        # Check if the column exists and its type
+        cursor.execute("""
+            SELECT data_type, character_maximum_length, column_default
+            FROM information_schema.columns
+            WHERE table_name = 'blood_units' AND column_name = 'status'
+        """)
+        column_info = cursor.fetchone()
+        
+        if column_info:
+            data_type, max_length, default_value = column_info
+            print(f"Blood unit status column is type: {data_type}, length: {max_length}, default: {default_value}")
+            
+            # If it's already a varchar but too short
+            if data_type == 'character varying' and max_length < 20:
+                print("Increasing varchar length to 20...")
+                cursor.execute("""
+                    ALTER TABLE blood_units ALTER COLUMN status TYPE VARCHAR(20);
+                """)
+        else:
+            print("Status column not found in blood_units table")
+
 def fix_blood_unit_status_enum():
     """
     Fix the status column in the blood_units table to ensure compatibility with all required status values.
@@ -157,62 +227,7 @@ def fix_blood_unit_status_enum():
     try:
         with connection:
             with connection.cursor() as cursor:
-                # First check if there's an enum issue
-                cursor.execute("""
-                    SELECT
-                        pg_enum.enumlabel
-                    FROM pg_type 
-                    JOIN pg_enum ON pg_enum.enumtypid = pg_type.oid 
-                    WHERE pg_type.typname = 'blood_unit_status'
-                """)
-                
-                enum_values = [row[0] for row in cursor.fetchall()]
-                
-                if enum_values:
-                    print(f"Found blood_unit_status enum with values: {enum_values}")
-                    
-                    # Valid statuses that need to be supported
-                    valid_statuses = ["Available", "Allocated", "Expired", "Quarantined", "Discarded"]
-                    missing_statuses = [status for status in valid_statuses if status not in enum_values]
-                    
-                    if missing_statuses:
-                        print(f"Missing statuses in enum: {missing_statuses}")
-                        
-                        # The safest approach is to change the column type to varchar
-                        print("Changing status column from enum to varchar...")
-                        
-                        # Create a temporary column, copy data, drop old column, and rename
-                        cursor.execute("""
-                            ALTER TABLE blood_units ADD COLUMN status_new VARCHAR(20);
-                            UPDATE blood_units SET status_new = status::text;
-                            ALTER TABLE blood_units DROP COLUMN status;
-                            ALTER TABLE blood_units RENAME COLUMN status_new TO status;
-                            ALTER TABLE blood_units ALTER COLUMN status SET NOT NULL;
-                            ALTER TABLE blood_units ALTER COLUMN status SET DEFAULT 'Available';
-                        """)
-                        
-                        print("Column type changed to VARCHAR(20)")
-                else:
-                    # Check if the column exists and its type
-                    cursor.execute("""
-                        SELECT data_type, character_maximum_length, column_default
-                        FROM information_schema.columns
-                        WHERE table_name = 'blood_units' AND column_name = 'status'
-                    """)
-                    column_info = cursor.fetchone()
-                    
-                    if column_info:
-                        data_type, max_length, default_value = column_info
-                        print(f"Blood unit status column is type: {data_type}, length: {max_length}, default: {default_value}")
-                        
-                        # If it's already a varchar but too short
-                        if data_type == 'character varying' and max_length < 20:
-                            print("Increasing varchar length to 20...")
-                            cursor.execute("""
-                                ALTER TABLE blood_units ALTER COLUMN status TYPE VARCHAR(20);
-                            """)
-                    else:
-                        print("Status column not found in blood_units table")
+                apply_blood_unit_status_fix(cursor)
                 
     except Exception as e:
         print(f"Error fixing blood unit status: {str(e)}")
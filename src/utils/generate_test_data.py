@@ -0,0 +1,425 @@
+"""
+Synthetic Test Data Generator
+
+Fills the database with realistic, reproducible data for load testing:
+donors with their donation history (Blood_Units) and receivers with their
+Blood_Requests, at production-scale volumes.
+
+- Blood types follow BLOOD_TYPE_DISTRIBUTION; a unit always has its donor's
+  type and a request its receiver's.
+- A donor's donations are at least MIN_DONATION_INTERVAL_DAYS apart, units
+  expire UNIT_SHELF_LIFE_DAYS after collection, and statuses follow from the
+  dates (expired units are mostly Used, recent requests still Pending).
+- Output is deterministic: every chunk draws from its own generator seeded
+  with (seed, kind, chunk number), so the same seed, --as-of date and chunk
+  size give the same data whatever the number of workers.
+
+Rows are generated in chunks of CHUNK_SIZE donors (or receivers) together
+with their units (or requests) and loaded with COPY, each chunk in its own
+transaction, by a pool of worker processes. Ids are reserved from the
+tables' sequences up front, so chunks can be built and loaded independently.
+A failed run leaves the chunks that completed loaded.
+
+Usage:
+    python src/utils/generate_test_data.py --donors 1000000 --units 3000000 \\
+        --receivers 200000 --requests 600000 [--seed 42] [--workers 4]
+"""
+
+import argparse
+import datetime
+import io
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import accumulate
+
+# Allow running this file directly (python src/utils/generate_test_data.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.blood_types import get_blood_types
+from database.connection import get_connection
+from database.schema import get_schema
+
+DEFAULT_SEED = 42
+
+# Donors (or receivers) per chunk; their units (or requests) go in the same chunk
+CHUNK_SIZE = 20000
+
+# Worker processes; each holds one database connection while loading
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Share of the population per blood type, in percent
+BLOOD_TYPE_DISTRIBUTION = (
+    ("O+", 37.4), ("A+", 35.7), ("B+", 8.5), ("O-", 6.6),
+    ("A-", 6.3), ("AB+", 3.4), ("B-", 1.5), ("AB-", 0.6),
+)
+BLOOD_TYPE_NAMES = tuple(name for name, _ in BLOOD_TYPE_DISTRIBUTION)
+BLOOD_TYPE_CUM_WEIGHTS = tuple(accumulate(share for _, share in BLOOD_TYPE_DISTRIBUTION))
+
+MIN_DONATION_INTERVAL_DAYS = 56
+UNIT_SHELF_LIFE_DAYS = 42
+
+# How far back request dates go
+HISTORY_DAYS = 3 * 365
+
+# Requests younger than this may still be open
+OPEN_REQUEST_DAYS = 14
+
+AVERAGE_DONATIONS_PER_DONOR = 3
+
+FIRST_NAMES = (
+    "Ahmed", "Ali", "Ayesha", "Bilal", "Fatima", "Hamza", "Hassan", "Hina", "Imran", "Iqra",
+    "Kamran", "Khadija", "Mahnoor", "Maryam", "Noor", "Omar", "Rabia", "Saad", "Sana", "Sara",
+    "Shahid", "Sobia", "Tariq", "Umar", "Usman", "Zainab", "Zara", "Zubair", "Adil", "Nasreen",
+)
+LAST_NAMES = (
+    "Khan", "Ali", "Ahmed", "Malik", "Butt", "Chaudhry", "Qureshi", "Sheikh", "Siddiqui", "Raza",
+    "Hussain", "Iqbal", "Javed", "Mahmood", "Mirza", "Nawaz", "Rashid", "Tariq", "Aslam", "Saleem",
+)
+CITIES = ("Lahore", "Karachi", "Islamabad", "Rawalpindi", "Faisalabad", "Multan", "Peshawar", "Quetta")
+STREETS = ("Mall Road", "Canal Road", "Jinnah Avenue", "Main Boulevard", "Gulberg", "Model Town", "Saddar")
+HOSPITALS = ("City Hospital", "General Hospital", "Maternity Hospital", "Emergency Care Center",
+             "Cardiac Center", "Children's Hospital", "District Hospital")
+WARDS = ("Surgery Ward", "Maternity Ward", "ICU", "Medical Ward", "Cardiac Ward", "Oncology Ward", "Emergency")
+TRANSFUSION_REASONS = ("Surgery recovery", "Childbirth complications", "Accident injuries", "Anemia treatment",
+                       "Heart surgery", "Thalassemia", "Cancer treatment", "Dengue fever")
+
+UNIT_VOLUMES_ML = (450, 450, 450, 500)
+REQUEST_PRIORITIES = (("Low", 20), ("Medium", 50), ("High", 20), ("Urgent", 10))
+REQUEST_UNITS = ((1, 45), (2, 30), (3, 12), (4, 8), (6, 5))
+
+def _chunk_rng(seed, kind, chunk):
+    # Seeded per chunk, so the data does not depend on which worker builds it
+    return random.Random(f"{seed}:{kind}:{chunk}")
+
+def _weighted(rng, table, k):
+    """k values drawn from a ((value, weight), ...) table."""
+    return rng.choices([value for value, _ in table], weights=[weight for _, weight in table], k=k)
+
+def _timestamp(rng, date):
+    clock = datetime.time(rng.randint(8, 19), rng.randint(0, 59), rng.randint(0, 59))
+    return datetime.datetime.combine(date, clock)
+
+def _person(rng, index):
+    """Name, gender, phone, email and address of a synthetic person."""
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    gender = rng.choice(("Male", "Female"))
+    phone = f"+92-3{rng.randint(0, 49):02d}-{rng.randint(0, 9999999):07d}"
+    email = f"{first_name}.{last_name}.{index}@example.com".lower()
+    address = f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+    return first_name, last_name, gender, phone, email, address
+
+def _unit_status(rng, expiration_date, as_of):
+    if expiration_date < as_of:
+        return rng.choices(("Used", "Expired", "Discarded"), weights=(80, 15, 5))[0]
+    return rng.choices(("Available", "Assigned", "Quarantined"), weights=(80, 12, 8))[0]
+
+def _donor_chunk(task):
+    """Donors [first_index, first_index + count) and their donation history."""
+    rng = _chunk_rng(task["seed"], "donors", task["chunk"])
+    as_of = task["as_of"]
+    count = task["count"]
+    type_names = rng.choices(BLOOD_TYPE_NAMES, cum_weights=BLOOD_TYPE_CUM_WEIGHTS, k=count)
+
+    # Donation frequency varies between donors: regulars give most units,
+    # some registered donors have not donated yet
+    activity = [rng.gammavariate(1.5, 1.0) for _ in range(count)]
+    donations = [0] * count
+    if task["unit_count"]:
+        for i in rng.choices(range(count), weights=activity, k=task["unit_count"]):
+            donations[i] += 1
+
+    donors = []
+    units = []
+    unit_id = task["first_unit_id"]
+    for i in range(count):
+        index = task["first_index"] + i
+        donor_id = task["first_id"] + i
+        blood_type_id = task["type_ids"][type_names[i]]
+        first_name, last_name, gender, phone, email, address = _person(rng, index)
+
+        # Walk back from the most recent donation
+        collection_date = as_of - datetime.timedelta(days=rng.randint(0, 365))
+        last_donation_date = collection_date if donations[i] else None
+        first_donation_date = as_of - datetime.timedelta(days=rng.randint(0, HISTORY_DAYS))
+        for _ in range(donations[i]):
+            expiration_date = collection_date + datetime.timedelta(days=UNIT_SHELF_LIFE_DAYS)
+            row = [unit_id, donor_id, blood_type_id, collection_date, expiration_date,
+                   _unit_status(rng, expiration_date, as_of)]
+            if task["storage_location"]:
+                row.append(f"Fridge {rng.randint(1, 8)}-{rng.choice('ABCD')}")
+            if task["volume_ml"]:
+                row.append(rng.choice(UNIT_VOLUMES_ML))
+            units.append(row)
+            unit_id += 1
+            first_donation_date = collection_date
+            collection_date -= datetime.timedelta(
+                days=MIN_DONATION_INTERVAL_DAYS + int(rng.expovariate(1 / 60)))
+
+        registration_date = first_donation_date - datetime.timedelta(days=rng.randint(0, 30))
+        dob = first_donation_date - datetime.timedelta(days=rng.randint(18 * 365, 60 * 365))
+        donors.append((donor_id, first_name, last_name, dob, gender, blood_type_id, phone, email,
+                       address, _timestamp(rng, registration_date), last_donation_date))
+
+    unit_columns = ["unit_id", "donor_id", "blood_type_id", "collection_date", "expiration_date", "status"]
+    if task["storage_location"]:
+        unit_columns.append("storage_location")
+    if task["volume_ml"]:
+        unit_columns.append("volume_ml")
+    return [
+        ("Donors", ["donor_id", "first_name", "last_name", "dob", "gender", "blood_type_id", "phone_number",
+                    "email", "address", "registration_date", "last_donation_date"], donors),
+        ("Blood_Units", unit_columns, units),
+    ]
+
+def _receiver_chunk(task):
+    """Receivers [first_index, first_index + count) and their blood requests."""
+    rng = _chunk_rng(task["seed"], "receivers", task["chunk"])
+    as_of = task["as_of"]
+    count = task["count"]
+    type_names = rng.choices(BLOOD_TYPE_NAMES, cum_weights=BLOOD_TYPE_CUM_WEIGHTS, k=count)
+
+    receivers = []
+    registered = []
+    for i in range(count):
+        index = task["first_index"] + i
+        first_name, last_name, gender, phone, _, _ = _person(rng, index)
+        contact_first_name, _, _, contact_phone, _, _ = _person(rng, index)
+        registration_date = as_of - datetime.timedelta(days=rng.randint(0, HISTORY_DAYS))
+        dob = as_of - datetime.timedelta(days=rng.randint(0, 90 * 365))
+        receivers.append((task["first_id"] + i, first_name, last_name, dob, gender,
+                          task["type_ids"][type_names[i]], rng.choice(TRANSFUSION_REASONS),
+                          rng.choice(HOSPITALS), f"{rng.choice(WARDS)} - Room {rng.randint(1, 450)}",
+                          f"{contact_first_name} {last_name}", contact_phone, _timestamp(rng, registration_date)))
+        registered.append(registration_date)
+
+    request_count = task["request_count"]
+    priorities = _weighted(rng, REQUEST_PRIORITIES, request_count)
+    units_required = _weighted(rng, REQUEST_UNITS, request_count)
+    requests = []
+    for n in range(request_count):
+        i = rng.randrange(count)
+        age = rng.randint(0, (as_of - registered[i]).days)
+        if age > OPEN_REQUEST_DAYS:
+            status = rng.choices(("Fulfilled", "Cancelled"), weights=(85, 15))[0]
+        else:
+            status = rng.choices(("Pending", "Processing", "Fulfilled"), weights=(50, 30, 20))[0]
+        row = [task["first_request_id"] + n, receivers[i][0], receivers[i][5], units_required[n],
+               _timestamp(rng, as_of - datetime.timedelta(days=age)), priorities[n], status]
+        if task["units_fulfilled"]:
+            if status == "Fulfilled":
+                row.append(units_required[n])
+            elif status == "Processing":
+                row.append(rng.randint(0, units_required[n] - 1))
+            else:
+                row.append(0)
+        requests.append(row)
+
+    request_columns = ["request_id", "receiver_id", "blood_type_id", "units_required", "request_date",
+                       "priority", "status"]
+    if task["units_fulfilled"]:
+        request_columns.append("units_fulfilled")
+    return [
+        ("Receivers", ["receiver_id", "first_name", "last_name", "dob", "gender", "blood_type_id",
+                       "reason_for_transfusion", "hospital_name", "ward_details", "contact_person_name",
+                       "contact_person_phone", "registration_date"], receivers),
+        ("Blood_Requests", request_columns, requests),
+    ]
+
+_CHUNK_BUILDERS = {"donors": _donor_chunk, "receivers": _receiver_chunk}
+
+def _copy_rows(cursor, table, columns, rows):
+    """Load rows with COPY FROM STDIN (text format; the generated values never need escaping)."""
+    if not rows:
+        return
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def _load_chunk(task):
+    """Build one chunk and load it in a single transaction. Runs in a worker process."""
+    tables = _CHUNK_BUILDERS[task["kind"]](task)
+    connection = get_connection()
+    if connection is None:
+        raise Exception("Could not connect to the database")
+    try:
+        with connection:
+            with connection.cursor() as cursor:
+                # Parents first, so the foreign keys of the children resolve
+                for table, columns, rows in tables:
+                    _copy_rows(cursor, table, columns, rows)
+    finally:
+        connection.close()
+    return {table: len(rows) for table, _, rows in tables}
+
+def _reserve_ids(cursor, table, id_column, count):
+    """Advance the table's id sequence by count and return the first reserved id."""
+    if count == 0:
+        return None
+    # Keeps concurrent inserts from taking ids between nextval and setval
+    cursor.execute(f"LOCK TABLE {table} IN EXCLUSIVE MODE")
+    cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", (table, id_column))
+    sequence = cursor.fetchone()[0]
+    cursor.execute("SELECT nextval(%s)", (sequence,))
+    first_id = cursor.fetchone()[0]
+    cursor.execute("SELECT setval(%s, %s)", (sequence, first_id + count - 1))
+    return first_id
+
+def _chunk_tasks(kind, parents, children, chunk_size, first_parent_id, first_child_id, common):
+    chunks = -(-parents // chunk_size)
+    tasks = []
+    parent_offset = child_offset = 0
+    for chunk in range(chunks):
+        count = min(chunk_size, parents - parent_offset)
+        # Children are shared out in proportion to the chunk's parents
+        child_count = (children * (parent_offset + count) // parents
+                       - children * parent_offset // parents)
+        task = dict(common, kind=kind, chunk=chunk, first_index=parent_offset, count=count,
+                    first_id=first_parent_id + parent_offset)
+        if kind == "donors":
+            task.update(unit_count=child_count,
+                        first_unit_id=(first_child_id or 0) + child_offset)
+        else:
+            task.update(request_count=child_count,
+                        first_request_id=(first_child_id or 0) + child_offset)
+        tasks.append(task)
+        parent_offset += count
+        child_offset += child_count
+    return tasks
+
+def generate_test_data(donors=0, units=0, receivers=0, requests=0, seed=DEFAULT_SEED,
+                       workers=DEFAULT_WORKERS, as_of=None, chunk_size=CHUNK_SIZE):
+    """
+    Generate and load synthetic donors, blood units, receivers and requests.
+
+    Args:
+        donors, units, receivers, requests: Number of rows to add to each table
+        seed: Seed of the generator; the same seed gives the same data
+        workers: Worker processes loading chunks in parallel (1 loads in-process)
+        as_of: Date the data is generated relative to (default: today)
+        chunk_size: Donors (or receivers) per chunk
+
+    Returns:
+        dict: Rows loaded per table, or None if generation failed
+    """
+    if units and not donors:
+        print("Error: Blood units need donors; pass a donor count as well.")
+        return None
+    if requests and not receivers:
+        print("Error: Blood requests need receivers; pass a receiver count as well.")
+        return None
+
+    as_of = as_of or datetime.date.today()
+    started = time.monotonic()
+    try:
+        registry = get_blood_types()
+        type_ids = {name: registry.id_for(name) for name in BLOOD_TYPE_NAMES}
+        missing = [name for name, type_id in type_ids.items() if type_id is None]
+        if missing:
+            print(f"Error: Blood_Types is missing {', '.join(missing)}.")
+            return None
+
+        schema = get_schema()
+        connection = get_connection()
+        if connection is None:
+            print("Error: Could not connect to the database.")
+            return None
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    first_donor_id = _reserve_ids(cursor, "donors", "donor_id", donors)
+                    first_unit_id = _reserve_ids(cursor, "blood_units", "unit_id", units)
+                    first_receiver_id = _reserve_ids(cursor, "receivers", "receiver_id", receivers)
+                    first_request_id = _reserve_ids(cursor, "blood_requests", "request_id", requests)
+        finally:
+            connection.close()
+
+        common = {
+            "seed": seed,
+            "as_of": as_of,
+            "type_ids": type_ids,
+            "storage_location": schema.has_column("blood_units", "storage_location"),
+            "volume_ml": schema.has_column("blood_units", "volume_ml"),
+            "units_fulfilled": schema.has_column("blood_requests", "units_fulfilled"),
+        }
+        tasks = []
+        if donors:
+            tasks += _chunk_tasks("donors", donors, units, chunk_size, first_donor_id, first_unit_id, common)
+        if receivers:
+            tasks += _chunk_tasks("receivers", receivers, requests, chunk_size,
+                                  first_receiver_id, first_request_id, common)
+
+        loaded = {}
+        completed = 0
+        def add_result(result):
+            nonlocal completed
+            completed += 1
+            for table, rows in result.items():
+                loaded[table] = loaded.get(table, 0) + rows
+            print(f"  loaded {completed}/{len(tasks)} chunks "
+                  f"({', '.join(f'{t}: {n}' for t, n in loaded.items())})")
+
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                add_result(_load_chunk(task))
+        else:
+            # spawn, not fork: a forked worker would share the parent's pooled sockets
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                futures = [executor.submit(_load_chunk, task) for task in tasks]
+                for future in as_completed(futures):
+                    add_result(future.result())
+
+        # Fresh statistics, so the planner sees the new volumes right away
+        connection = get_connection()
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    for table in loaded:
+                        cursor.execute(f"ANALYZE {table}")
+        finally:
+            connection.close()
+    except Exception as e:
+        print(f"Error generating test data: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+    print(f"Generated {sum(loaded.values())} rows in {time.monotonic() - started:.1f}s.")
+    return loaded
+
+def generate_test_blood_units(count, seed=DEFAULT_SEED):
+    """
+    Generate `count` blood units, with donors to go with them.
+
+    Returns:
+        bool: True if the units were loaded
+    """
+    donors = max(1, count // AVERAGE_DONATIONS_PER_DONOR)
+    return generate_test_data(donors=donors, units=count, seed=seed) is not None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load synthetic test data")
+    parser.add_argument('--donors', type=int, default=10000, help='Donors to add (default: 10000)')
+    parser.add_argument('--units', type=int, default=30000, help='Blood units to add (default: 30000)')
+    parser.add_argument('--receivers', type=int, default=2000, help='Receivers to add (default: 2000)')
+    parser.add_argument('--requests', type=int, default=6000, help='Blood requests to add (default: 6000)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'Random seed (default: {DEFAULT_SEED})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Parallel loader processes (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--as-of', type=datetime.date.fromisoformat,
+                        help='Generate data relative to this date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'Donors or receivers per chunk (default: {CHUNK_SIZE})')
+    args = parser.parse_args()
+
+    result = generate_test_data(args.donors, args.units, args.receivers, args.requests, args.seed,
+                                args.workers, args.as_of, args.chunk_size)
+    sys.exit(0 if result is not None else 1)
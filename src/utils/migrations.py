@@ -0,0 +1,365 @@
+"""
+Schema Migrations
+
+Numbered, idempotent schema changes recorded in a schema_migrations table.
+At startup run_migrations() issues a single version query; the individual
+migrations only run (each in its own transaction) when the database is
+behind LATEST_VERSION.
+
+To change the schema, append a new (version, name, function) entry to
+MIGRATIONS. The function receives a cursor inside an open transaction and
+must be safe to run against a database that already has the change.
+"""
+
+import os
+import sys
+
+# Allow running this file directly (python src/utils/migrations.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+import psycopg2.errors
+
+from database.connection import get_connection
+from database.notifications import CHANGE_CHANNEL, MAX_NOTIFIED_IDS, NOTIFIED_TABLES
+from database.schema import refresh_schema
+from database.search import DONOR_SEARCH_EXPRESSION, RECEIVER_SEARCH_EXPRESSION, search_expression
+from models.blood_type import compatibility_matrix
+from utils.fix_database import apply_blood_requests_fix, apply_blood_unit_status_fix
+from utils.fix_blood_units import apply_blood_units_table
+
+# Arbitrary key for pg_advisory_xact_lock so two workstations starting at
+# the same time do not apply the same migration twice
+MIGRATION_LOCK_KEY = 4821730
+
+def _base_schema(cursor):
+    """Create the core tables and default blood types from blood_donation.sql."""
+    sql_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blood_donation.sql')
+    with open(sql_file_path, 'r') as f:
+        cursor.execute(f.read())
+
+def _blood_type_compatibility(cursor):
+    """Precompute the ABO/Rh compatibility matrix over Blood_Types and index available units."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Blood_Type_Compatibility (
+            recipient_blood_type_id INTEGER NOT NULL REFERENCES Blood_Types(blood_type_id),
+            donor_blood_type_id INTEGER NOT NULL REFERENCES Blood_Types(blood_type_id),
+            preference INTEGER NOT NULL,
+            conserve BOOLEAN NOT NULL DEFAULT FALSE,
+            PRIMARY KEY (recipient_blood_type_id, donor_blood_type_id)
+        )
+    """)
+    for recipient, donor, preference, conserve in compatibility_matrix():
+        cursor.execute("""
+            INSERT INTO Blood_Type_Compatibility
+                (recipient_blood_type_id, donor_blood_type_id, preference, conserve)
+            SELECT r.blood_type_id, d.blood_type_id, %s, %s
+            FROM Blood_Types r, Blood_Types d
+            WHERE r.type_name = %s AND d.type_name = %s
+            ON CONFLICT DO NOTHING
+        """, (preference, conserve, recipient, donor))
+
+    # Compatible-unit lookups probe one donor type at a time in expiry order
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_units_available_type_expiry
+        ON Blood_Units (blood_type_id, expiration_date)
+        WHERE status = 'Available'
+    """)
+
+def _list_sort_indexes(cursor):
+    """Composite indexes matching the keyset sort keys of the paged lists."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_donors_name_sort
+        ON Donors (last_name, first_name, donor_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receivers_name_sort
+        ON Receivers (first_name, last_name, receiver_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_requests_date_sort
+        ON Blood_Requests (request_date, request_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_units_collection_sort
+        ON Blood_Units (collection_date, unit_id)
+    """)
+
+def _trigram_search_indexes(cursor):
+    """pg_trgm GIN indexes on the donor and receiver search expressions."""
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_donors_search_trgm
+        ON Donors USING gin ({search_expression(DONOR_SEARCH_EXPRESSION)} gin_trgm_ops)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_receivers_search_trgm
+        ON Receivers USING gin ({search_expression(RECEIVER_SEARCH_EXPRESSION)} gin_trgm_ops)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receivers_blood_type
+        ON Receivers (blood_type_id, first_name, last_name, receiver_id)
+    """)
+
+def _change_notify_triggers(cursor):
+    """Statement-level triggers that pg_notify the ids changed in the watched tables."""
+    # One notification per statement: "table:OP:1,2,3", or "table:OP:*" when
+    # too many rows changed to list them within NOTIFY's payload limit
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_entity_change() RETURNS trigger AS $$
+        DECLARE
+            id_count INTEGER;
+            ids TEXT;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                EXECUTE format('SELECT count(*), string_agg(DISTINCT %I::text, '','') FROM old_rows', TG_ARGV[0])
+                    INTO id_count, ids;
+            ELSE
+                EXECUTE format('SELECT count(*), string_agg(DISTINCT %I::text, '','') FROM new_rows', TG_ARGV[0])
+                    INTO id_count, ids;
+            END IF;
+
+            IF id_count > 0 THEN
+                IF id_count > {MAX_NOTIFIED_IDS} THEN
+                    ids := '*';
+                END IF;
+                PERFORM pg_notify('{CHANGE_CHANNEL}', lower(TG_TABLE_NAME) || ':' || TG_OP || ':' || ids);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, id_column in NOTIFIED_TABLES.items():
+        for event, referencing in (("INSERT", "NEW TABLE AS new_rows"),
+                                   ("UPDATE", "NEW TABLE AS new_rows"),
+                                   ("DELETE", "OLD TABLE AS old_rows")):
+            trigger = f"{table}_notify_{event.lower()}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            cursor.execute(f"""
+                CREATE TRIGGER {trigger}
+                AFTER {event} ON {table}
+                REFERENCING {referencing}
+                FOR EACH STATEMENT EXECUTE PROCEDURE notify_entity_change('{id_column}')
+            """)
+
+def _inventory_summary(cursor):
+    """Unit counts per blood type, status and storage location, kept current by triggers."""
+    # Older Blood_Units tables may lack the column the summary is keyed on
+    cursor.execute("ALTER TABLE Blood_Units ADD COLUMN IF NOT EXISTS storage_location VARCHAR(100)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Inventory_Summary (
+            blood_type_id INTEGER NOT NULL REFERENCES Blood_Types(blood_type_id),
+            status VARCHAR(20) NOT NULL,
+            storage_location VARCHAR(100) NOT NULL DEFAULT '',
+            unit_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (blood_type_id, status, storage_location)
+        )
+    """)
+
+    # Statement-level: one upsert of per-group deltas however many units a
+    # statement touches. Rows are upserted in key order so concurrent
+    # statements lock summary rows in the same order.
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION maintain_inventory_summary() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM Inventory_Summary;
+            ELSIF TG_OP = 'INSERT' THEN
+                INSERT INTO Inventory_Summary AS s (blood_type_id, status, storage_location, unit_count)
+                SELECT blood_type_id, status::text, COALESCE(storage_location, ''), count(*)
+                FROM new_rows
+                GROUP BY 1, 2, 3
+                ORDER BY 1, 2, 3
+                ON CONFLICT (blood_type_id, status, storage_location)
+                DO UPDATE SET unit_count = s.unit_count + EXCLUDED.unit_count;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO Inventory_Summary AS s (blood_type_id, status, storage_location, unit_count)
+                SELECT blood_type_id, status::text, COALESCE(storage_location, ''), -count(*)
+                FROM old_rows
+                GROUP BY 1, 2, 3
+                ORDER BY 1, 2, 3
+                ON CONFLICT (blood_type_id, status, storage_location)
+                DO UPDATE SET unit_count = s.unit_count + EXCLUDED.unit_count;
+            ELSE
+                -- Only groups whose count actually changed are written
+                INSERT INTO Inventory_Summary AS s (blood_type_id, status, storage_location, unit_count)
+                SELECT blood_type_id, status, storage_location, sum(delta)
+                FROM (
+                    SELECT blood_type_id, status::text AS status,
+                           COALESCE(storage_location, '') AS storage_location, -1 AS delta
+                    FROM old_rows
+                    UNION ALL
+                    SELECT blood_type_id, status::text, COALESCE(storage_location, ''), 1
+                    FROM new_rows
+                ) changes
+                GROUP BY 1, 2, 3
+                HAVING sum(delta) <> 0
+                ORDER BY 1, 2, 3
+                ON CONFLICT (blood_type_id, status, storage_location)
+                DO UPDATE SET unit_count = s.unit_count + EXCLUDED.unit_count;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for event, referencing in (("INSERT", "REFERENCING NEW TABLE AS new_rows"),
+                               ("UPDATE", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+                               ("DELETE", "REFERENCING OLD TABLE AS old_rows"),
+                               ("TRUNCATE", "")):
+        trigger = f"blood_units_inventory_{event.lower()}"
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger} ON Blood_Units")
+        cursor.execute(f"""
+            CREATE TRIGGER {trigger}
+            AFTER {event} ON Blood_Units
+            {referencing}
+            FOR EACH STATEMENT EXECUTE PROCEDURE maintain_inventory_summary()
+        """)
+
+    # Backfill; writers wait until this transaction commits so no change is
+    # counted twice or missed
+    cursor.execute("LOCK TABLE Blood_Units IN SHARE MODE")
+    cursor.execute("DELETE FROM Inventory_Summary")
+    cursor.execute("""
+        INSERT INTO Inventory_Summary (blood_type_id, status, storage_location, unit_count)
+        SELECT blood_type_id, status::text, COALESCE(storage_location, ''), count(*)
+        FROM Blood_Units
+        GROUP BY 1, 2, 3
+    """)
+
+def _expiry_sweep(cursor):
+    """Index for finding overdue Available units, and a log of expiry sweeps."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_units_status_expiry
+        ON Blood_Units (status, expiration_date)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Expiry_Sweep_Log (
+            sweep_id SERIAL PRIMARY KEY,
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            units_expired INTEGER NOT NULL,
+            batches INTEGER NOT NULL
+        )
+    """)
+
+def _hot_query_indexes(cursor):
+    """Indexes for the remaining hot repository and report queries (see utils/check_indexes.py)."""
+    # get_available_blood_units_by_type: one type's Available units, oldest first
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_units_available_type_collection
+        ON Blood_Units (blood_type_id, collection_date)
+        WHERE status = 'Available'
+    """)
+    # Donor activity report and donor deletes: a donor's units by date
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_units_donor_collection
+        ON Blood_Units (donor_id, collection_date)
+    """)
+    # Request list filtered by status, newest first
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_requests_status_date
+        ON Blood_Requests (status, request_date, request_id)
+    """)
+    # A receiver's requests (receiver details, receiver deletes)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_blood_requests_receiver
+        ON Blood_Requests (receiver_id)
+    """)
+    cursor.execute("ANALYZE Blood_Units")
+    cursor.execute("ANALYZE Blood_Requests")
+
+MIGRATIONS = [
+    (1, "base_schema", _base_schema),
+    (2, "blood_requests_unit_columns", apply_blood_requests_fix),
+    (3, "blood_units_table", apply_blood_units_table),
+    (4, "blood_unit_status_varchar", apply_blood_unit_status_fix),
+    (5, "blood_type_compatibility", _blood_type_compatibility),
+    (6, "list_sort_indexes", _list_sort_indexes),
+    (7, "trigram_search_indexes", _trigram_search_indexes),
+    (8, "change_notify_triggers", _change_notify_triggers),
+    (9, "inventory_summary", _inventory_summary),
+    (10, "expiry_sweep", _expiry_sweep),
+    (11, "hot_query_indexes", _hot_query_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(connection):
+    """Return the highest applied migration version, or 0 on a fresh database."""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+            version = cursor.fetchone()[0]
+        connection.rollback()
+        return version
+    except psycopg2.errors.UndefinedTable:
+        connection.rollback()
+        return 0
+
+def run_migrations():
+    """
+    Bring the database schema up to LATEST_VERSION.
+
+    Returns:
+        int: The schema version after running, or None if there was an error
+    """
+    connection = get_connection()
+    if not connection:
+        print("Error: Could not connect to the database.")
+        return None
+
+    try:
+        current_version = get_schema_version(connection)
+        if current_version >= LATEST_VERSION:
+            return current_version
+
+        print(f"Database schema is at version {current_version}, migrating to {LATEST_VERSION}...")
+        with connection:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL,
+                        applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+        for version, name, apply in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            # One transaction per migration so a failure leaves earlier ones applied
+            with connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+
+                    # Another process may have applied it while we waited for the lock
+                    cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+                    if cursor.fetchone():
+                        current_version = version
+                        continue
+
+                    print(f"Applying migration {version:04d}_{name}")
+                    apply(cursor)
+                    cursor.execute("""
+                        INSERT INTO schema_migrations (version, name)
+                        VALUES (%s, %s)
+                    """, (version, name))
+            current_version = version
+
+        # Columns may have changed under the cached schema map
+        refresh_schema()
+        print(f"Database schema is up to date (version {current_version}).")
+        return current_version
+    except Exception as e:
+        print(f"Error running migrations: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    run_migrations()
@@ -0,0 +1,359 @@
+"""
+Table Partitioning
+
+Blood_Units and Blood_Requests keep every historical row, so they can be
+converted to tables range-partitioned by collection_date / request_date
+(one partition per PARTITION_MONTHS). Date-range reports and the date-ordered
+lists then only touch the partitions they need, old partitions can be
+vacuumed (or archived) on their own, and per-partition indexes stay small.
+
+Lookups by id are not pruned: the callers of get_blood_unit_by_id,
+get_request_by_id, update_blood_unit_status, transition_status,
+fulfill_units and allocate_blood_units only know the id, not its date, so
+each of those statements probes the primary key index of every attached
+partition (one small index lookup per partition, i.e. per year kept). Keep
+RETENTION_MONTHS in mind when judging their cost; detaching old partitions
+also shortens these lookups.
+
+convert_to_partitioned() rebuilds a table as a partitioned one in a single
+transaction (the table is locked while its rows are copied, so run it in a
+maintenance window). The primary key becomes (id, date column) as PostgreSQL
+requires, so the date column becomes NOT NULL; a table with rows lacking a
+date is not converted until they are given one. Ids still come from the same
+sequence. Indexes, triggers (change
+notifications, inventory summary) and foreign keys are recreated on the new
+table.
+
+maintain_partitions() creates partitions ahead of time and detaches
+partitions older than the retention period. Detached partitions are kept as
+ordinary tables (e.g. blood_units_p2015_01) for archiving; a partition that
+still holds active rows is never detached. The application runs it from the
+background expiry sweeper thread; when no table is partitioned it costs a
+single catalog query.
+
+Requires PostgreSQL 11 or later.
+
+Usage:
+    python src/utils/partitioning.py status
+    python src/utils/partitioning.py convert blood_units
+    python src/utils/partitioning.py maintain
+"""
+
+import argparse
+import datetime
+import os
+import sys
+from collections import namedtuple
+
+# Allow running this file directly (python src/utils/partitioning.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import get_connection
+from database.schema import refresh_schema
+
+PartitionSpec = namedtuple("PartitionSpec", ["key_column", "id_column", "active_statuses"])
+
+PARTITIONED_TABLES = {
+    "blood_units": PartitionSpec("collection_date", "unit_id", ("Available", "Assigned", "Quarantined")),
+    "blood_requests": PartitionSpec("request_date", "request_id", ("Pending", "Processing")),
+}
+
+# Width of one partition, how far ahead partitions are created, and how
+# long they stay attached
+PARTITION_MONTHS = 12
+MONTHS_AHEAD = 12
+RETENTION_MONTHS = 120
+
+MIN_SERVER_VERSION = 110000
+
+def _add_months(date, months):
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+def partition_start(date):
+    """First day of the partition containing date."""
+    months_since_epoch = date.year * 12 + date.month - 1
+    start = months_since_epoch - months_since_epoch % PARTITION_MONTHS
+    return datetime.date(start // 12, start % 12 + 1, 1)
+
+def partition_name(table, start):
+    return f"{table}_p{start.year:04d}_{start.month:02d}"
+
+def is_partitioned(cursor, table):
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace
+        )
+    """, (table,))
+    return cursor.fetchone()[0]
+
+def partitioned_tables(cursor):
+    """The tables of PARTITIONED_TABLES that are partitioned, in one query."""
+    cursor.execute("""
+        SELECT c.relname FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = ANY(%s) AND c.relnamespace = current_schema()::regnamespace
+    """, (list(PARTITIONED_TABLES),))
+    return {row[0] for row in cursor.fetchall()}
+
+def list_partitions(cursor, table):
+    """(partition name, bound expression) of every attached partition, oldest first."""
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %s AND p.relnamespace = current_schema()::regnamespace
+        ORDER BY c.relname
+    """, (table,))
+    return cursor.fetchall()
+
+def create_partition(cursor, table, start):
+    """Create the partition starting at `start` unless it exists. Returns True if created."""
+    name = partition_name(table, start)
+    cursor.execute("SELECT to_regclass(%s)", (name,))
+    if cursor.fetchone()[0] is not None:
+        return False
+    end = _add_months(start, PARTITION_MONTHS)
+    cursor.execute(f"""
+        CREATE TABLE {name} PARTITION OF {table}
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+    """)
+    return True
+
+def _remove_from_inventory_summary(cursor, partition):
+    """Take a blood_units partition's units out of Inventory_Summary before it is detached."""
+    cursor.execute("SELECT to_regclass('inventory_summary')")
+    if cursor.fetchone()[0] is None:
+        return
+    cursor.execute(f"""
+        INSERT INTO Inventory_Summary AS s (blood_type_id, status, storage_location, unit_count)
+        SELECT blood_type_id, status::text, COALESCE(storage_location, ''), -count(*)
+        FROM {partition}
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (blood_type_id, status, storage_location)
+        DO UPDATE SET unit_count = s.unit_count + EXCLUDED.unit_count
+    """)
+
+def convert_to_partitioned(table):
+    """
+    Rebuild `table` (a key of PARTITIONED_TABLES) as a range-partitioned table.
+
+    Returns:
+        bool: True if converted (or already partitioned), False on error
+    """
+    spec = PARTITIONED_TABLES[table]
+    connection = get_connection()
+    if not connection:
+        print("Error: Could not connect to the database.")
+        return False
+
+    try:
+        with connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW server_version_num")
+                if int(cursor.fetchone()[0]) < MIN_SERVER_VERSION:
+                    print("Error: Table partitioning needs PostgreSQL 11 or later.")
+                    return False
+                if is_partitioned(cursor, table):
+                    print(f"{table} is already partitioned.")
+                    return True
+
+                cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+
+                # The partition key becomes part of the primary key, so it
+                # cannot stay nullable
+                cursor.execute(f"SELECT count(*) FROM {table} WHERE {spec.key_column} IS NULL")
+                undated = cursor.fetchone()[0]
+                if undated:
+                    print(f"Error: {undated} rows of {table} have no {spec.key_column}. "
+                          f"Set it before converting, e.g. UPDATE {table} SET {spec.key_column} = ... "
+                          f"WHERE {spec.key_column} IS NULL")
+                    return False
+
+                # Capture everything that has to be recreated while the
+                # definitions still name the original table
+                cursor.execute("""
+                    SELECT pg_get_indexdef(i.indexrelid)
+                    FROM pg_index i
+                    WHERE i.indrelid = %s::regclass AND NOT i.indisprimary
+                """, (table,))
+                index_definitions = []
+                for (definition,) in cursor.fetchall():
+                    if definition.startswith("CREATE UNIQUE"):
+                        # A unique index on a partitioned table must include the partition key
+                        print(f"Warning: not recreating unique index: {definition}")
+                    else:
+                        index_definitions.append(definition)
+                cursor.execute("""
+                    SELECT pg_get_triggerdef(t.oid)
+                    FROM pg_trigger t
+                    WHERE t.tgrelid = %s::regclass AND NOT t.tgisinternal
+                """, (table,))
+                trigger_definitions = [row[0] for row in cursor.fetchall()]
+                cursor.execute("""
+                    SELECT conname, pg_get_constraintdef(oid)
+                    FROM pg_constraint
+                    WHERE conrelid = %s::regclass AND contype = 'f'
+                """, (table,))
+                foreign_keys = cursor.fetchall()
+                cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", (table, spec.id_column))
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f"""
+                    SELECT MIN({spec.key_column})::date, MAX({spec.key_column})::date FROM {table}
+                """)
+                oldest, newest = cursor.fetchone()
+
+                legacy = f"{table}_unpartitioned"
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+                cursor.execute(f"""
+                    CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+                    PARTITION BY RANGE ({spec.key_column})
+                """)
+                cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {spec.key_column} SET NOT NULL")
+
+                today = datetime.date.today()
+                start = partition_start(min(oldest or today, today))
+                last = partition_start(_add_months(max(newest or today, today), MONTHS_AHEAD))
+                while start <= last:
+                    create_partition(cursor, table, start)
+                    start = _add_months(start, PARTITION_MONTHS)
+                # Rows dated far outside the created ranges
+                cursor.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+                cursor.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+                if sequence:
+                    cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{spec.id_column}")
+                cursor.execute(f"DROP TABLE {legacy}")
+
+                # Keys and indexes are built once the rows are in, under the
+                # names the old table used. The partition key must be part of
+                # the primary key.
+                cursor.execute(f"""
+                    ALTER TABLE {table} ADD CONSTRAINT {table}_pkey
+                    PRIMARY KEY ({spec.id_column}, {spec.key_column})
+                """)
+
+                for name, definition in foreign_keys:
+                    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+                for definition in index_definitions:
+                    cursor.execute(definition)
+                for definition in trigger_definitions:
+                    cursor.execute(definition)
+                cursor.execute(f"ANALYZE {table}")
+
+        refresh_schema()
+        print(f"{table} is now partitioned by {spec.key_column}.")
+        return True
+    except Exception as e:
+        print(f"Error partitioning {table}: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        connection.close()
+
+def maintain_partitions(months_ahead=MONTHS_AHEAD, retention_months=RETENTION_MONTHS):
+    """
+    Create upcoming partitions and detach expired ones for every partitioned table.
+
+    Returns:
+        dict: {table: (partitions created, partitions detached)}, or None on error
+    """
+    connection = get_connection()
+    if not connection:
+        print("Error: Could not connect to the database.")
+        return None
+
+    today = datetime.date.today()
+    horizon = partition_start(_add_months(today, months_ahead))
+    cutoff = _add_months(today, -retention_months)
+    changes = {}
+    try:
+        with connection.cursor() as cursor:
+            partitioned = partitioned_tables(cursor)
+        connection.rollback()
+
+        for table, spec in PARTITIONED_TABLES.items():
+            if table not in partitioned:
+                continue
+            with connection:
+                with connection.cursor() as cursor:
+                    created = 0
+                    start = partition_start(today)
+                    while start <= horizon:
+                        try:
+                            cursor.execute("SAVEPOINT create_partition")
+                            created += create_partition(cursor, table, start)
+                            cursor.execute("RELEASE SAVEPOINT create_partition")
+                        except Exception as e:
+                            # e.g. the default partition already holds rows in this range
+                            cursor.execute("ROLLBACK TO SAVEPOINT create_partition")
+                            print(f"Could not create partition {partition_name(table, start)}: {e}")
+                        start = _add_months(start, PARTITION_MONTHS)
+
+                    detached = 0
+                    for name, _ in list_partitions(cursor, table):
+                        if name == f"{table}_default":
+                            continue
+                        start = datetime.date(int(name[-7:-3]), int(name[-2:]), 1)
+                        if _add_months(start, PARTITION_MONTHS) > cutoff:
+                            continue
+                        cursor.execute(f"SELECT 1 FROM {name} WHERE status = ANY(%s) LIMIT 1",
+                                       (list(spec.active_statuses),))
+                        if cursor.fetchone():
+                            print(f"Keeping {name}: it still has active rows.")
+                            continue
+                        if table == "blood_units":
+                            _remove_from_inventory_summary(cursor, name)
+                        cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                        detached += 1
+
+                    changes[table] = (created, detached)
+                    if created or detached:
+                        print(f"{table}: created {created} and detached {detached} partitions.")
+        return changes
+    except Exception as e:
+        print(f"Error maintaining partitions: {e}")
+        return None
+    finally:
+        connection.close()
+
+def print_status():
+    connection = get_connection()
+    if not connection:
+        print("Error: Could not connect to the database.")
+        return False
+    try:
+        with connection.cursor() as cursor:
+            for table in PARTITIONED_TABLES:
+                if not is_partitioned(cursor, table):
+                    print(f"{table}: not partitioned")
+                    continue
+                print(f"{table}:")
+                for name, bound in list_partitions(cursor, table):
+                    print(f"  {name}  {bound}")
+        connection.rollback()
+        return True
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the partitioning of Blood_Units and Blood_Requests")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("status", help="List the partitions of each table")
+    convert = subcommands.add_parser("convert", help="Convert a table to a partitioned table")
+    convert.add_argument("table", choices=sorted(PARTITIONED_TABLES))
+    subcommands.add_parser("maintain", help="Create upcoming and detach expired partitions")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        ok = print_status()
+    elif args.command == "convert":
+        ok = convert_to_partitioned(args.table)
+    else:
+        ok = maintain_partitions() is not None
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,118 @@
+"""
+Background Queries for the Tk Views
+
+Tkinter widgets may only be touched from the main thread, so database work
+triggered by the UI (search-as-you-type in particular) is handed to a worker
+thread and the result is delivered back through the Tk event loop.
+
+Jobs are submitted under a key, e.g. "search". Submitting again under the
+same key supersedes the earlier job: a job still waiting out its debounce
+delay is dropped, a queued one is skipped, and the result of one already
+running is discarded, so only the latest query's result reaches the UI.
+"""
+
+import queue
+import threading
+
+# How often the Tk thread checks for finished jobs while any are outstanding
+POLL_INTERVAL_MS = 30
+
+
+class BackgroundQueryExecutor:
+    def __init__(self, widget):
+        """
+        Args:
+            widget: Any Tk widget of the owning view; used for after() calls
+        """
+        self.widget = widget
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._generations = {}
+        self._debounce_ids = {}
+        self._outstanding = 0
+        self._polling = False
+        self._lock = threading.Lock()
+
+        self._worker = threading.Thread(target=self._run, name="view-queries", daemon=True)
+        self._worker.start()
+
+    def submit(self, key, query, on_result, on_error=None, delay_ms=0):
+        """
+        Run query() on the worker thread and call on_result(result) on the Tk
+        thread. With delay_ms the job only starts after that many milliseconds
+        without another submit under the same key (debouncing keystrokes).
+        Errors are passed to on_error(exception) if given, otherwise printed.
+        """
+        generation = self._next_generation(key)
+        self._cancel_debounce(key)
+
+        if delay_ms > 0:
+            self._debounce_ids[key] = self.widget.after(
+                delay_ms, lambda: self._enqueue(key, generation, query, on_result, on_error))
+        else:
+            self._enqueue(key, generation, query, on_result, on_error)
+
+    def cancel(self, key):
+        """Drop any pending job under key and ignore the result of a running one."""
+        self._next_generation(key)
+        self._cancel_debounce(key)
+
+    def _next_generation(self, key):
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+        return generation
+
+    def _is_current(self, key, generation):
+        with self._lock:
+            return self._generations.get(key) == generation
+
+    def _cancel_debounce(self, key):
+        after_id = self._debounce_ids.pop(key, None)
+        if after_id is not None:
+            self.widget.after_cancel(after_id)
+
+    def _enqueue(self, key, generation, query, on_result, on_error):
+        self._debounce_ids.pop(key, None)
+        if not self._is_current(key, generation):
+            return
+        self._outstanding += 1
+        self._jobs.put((key, generation, query, on_result, on_error))
+        if not self._polling:
+            self._polling = True
+            self.widget.after(POLL_INTERVAL_MS, self._poll)
+
+    def _run(self):
+        while True:
+            key, generation, query, on_result, on_error = self._jobs.get()
+            if not self._is_current(key, generation):
+                # Superseded while queued; do not hit the database at all
+                self._results.put((key, generation, None, None, None, None))
+                continue
+            try:
+                self._results.put((key, generation, on_result, on_error, query(), None))
+            except Exception as e:
+                self._results.put((key, generation, on_result, on_error, None, e))
+
+    def _poll(self):
+        """Deliver finished jobs on the Tk thread; reschedules while work remains."""
+        while True:
+            try:
+                key, generation, on_result, on_error, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+            if on_result is None or not self._is_current(key, generation):
+                continue
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Background query '{key}' failed: {error}")
+            else:
+                on_result(result)
+
+        if self._outstanding > 0:
+            self.widget.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
@@ -1,24 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import datetime
+from database.blood_types import get_blood_types
 from database.repositories.blood_request_repo import BloodRequestRepo
 from database.repositories.receiver_repo import ReceiverRepository
+from views.background import BackgroundQueryExecutor
+from views.virtual_tree import ListDataSource, PagedDataSource, VirtualTreeview
 from utils.validation_utils import is_valid_integer
 
+# Wait this long after the last keystroke before searching
+SEARCH_DEBOUNCE_MS = 250
+
 class BloodRequestManagementFrame:
-    def __init__(self, parent_frame):
+    def __init__(self, parent_frame, live_updates=None):
         self.parent = parent_frame
+        if live_updates is not None:
+            live_updates.register(("blood_requests", "receivers"), self.on_requests_changed)
         try:
-            # Run database fixes before initialization
-            from utils.fix_database import fix_blood_requests_table
-            fix_blood_requests_table()
-            
             # Initialize repositories with proper error handling
             self.request_repo = BloodRequestRepo()
             self.receiver_repo = ReceiverRepository()
             from database.repositories.blood_unit_repo import BloodUnitRepository
             self.blood_unit_repo = BloodUnitRepository()
             self.selected_request_id = None
+            self.queries = BackgroundQueryExecutor(parent_frame)
             self.setup_ui()
         except Exception as e:
             import traceback
@@ -41,6 +46,8 @@ class BloodRequestManagementFrame:
             self.request_repo = BloodRequestRepo()
             self.receiver_repo = ReceiverRepository()
             self.selected_request_id = None
+            if not hasattr(self, "queries"):
+                self.queries = BackgroundQueryExecutor(self.parent)
             self.setup_ui()
         except Exception as e:
             error_message = f"Retry failed: {str(e)}"
@@ -81,26 +88,28 @@ class BloodRequestManagementFrame:
         status_combo.pack(side="left", padx=5)
         status_combo.bind("<<ComboboxSelected>>", self.filter_by_status)
         
-        # Requests list
+        # Requests list; only the visible rows are loaded, sorted by the database
         columns = ("ID", "Receiver", "Blood Type", "Units Required", "Status", "Priority", "Date")
-        self.request_tree = ttk.Treeview(left_frame, columns=columns, show="headings")
+        self.request_source = PagedDataSource(self.fetch_requests_page, self.count_requests,
+                                              sort_by="date", descending=True)
+        self.request_list = VirtualTreeview(
+            left_frame, columns, self.request_source,
+            row_id=lambda request: request["request_id"], row_values=self.request_row_values,
+            sort_options={"ID": "id", "Receiver": "receiver", "Blood Type": "blood_type",
+                          "Units Required": "units", "Status": "status", "Priority": "priority",
+                          "Date": "date"})
+        self.request_tree = self.request_list.tree
         
         # Configure columns
         for col in columns:
-            self.request_tree.heading(col, text=col)
             width = 70 if col == "ID" else 100
             if col == "Receiver":
                 width = 150
             self.request_tree.column(col, width=width)
             
-        self.request_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.request_list.pack(fill="both", expand=True, padx=5, pady=5)
         self.request_tree.bind("<<TreeviewSelect>>", self.on_request_select)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.request_tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.request_tree.configure(yscrollcommand=scrollbar.set)
-        
         # Buttons frame
         button_frame = ttk.Frame(left_frame)
         button_frame.pack(fill="x", padx=5, pady=5)
@@ -115,65 +124,76 @@ class BloodRequestManagementFrame:
         # Load requests from database
         self.load_requests()
     
+    def selected_status(self):
+        return None if self.status_var.get() == "All" else self.status_var.get()
+    
+    def fetch_requests_page(self, after, limit, sort_by, descending, offset):
+        return BloodRequestRepo.get_requests_page(self.selected_status(), after, limit,
+                                                  sort_by, descending, offset)
+    
+    def count_requests(self):
+        return BloodRequestRepo.count_requests(self.selected_status())
+    
+    def request_row_values(self, request):
+        # Format the date
+        request_date = request["request_date"].strftime('%Y-%m-%d') if request["request_date"] else "N/A"
+        
+        return (
+            request["request_id"],
+            request["receiver_name"],
+            request["blood_type"],
+            f"{request['units_required']}",
+            request["status"],
+            request["priority"],
+            request_date
+        )
+    
     def load_requests(self):
-        # Clear the tree
-        for item in self.request_tree.get_children():
-            self.request_tree.delete(item)
-        
-        # Get requests from repository
+        # Re-read the visible rows and apply only the changes
         try:
-            status = None if self.status_var.get() == "All" else self.status_var.get()
-            requests = BloodRequestRepo.get_all_requests(status)
-            
-            for request in requests:
-                # Format the date
-                request_date = request["request_date"].strftime('%Y-%m-%d') if request["request_date"] else "N/A"
-                
-                self.request_tree.insert("", "end", values=(
-                    request["request_id"],
-                    request["receiver_name"],
-                    request["blood_type"],
-                    f"{request['units_required']}",
-                    request["status"],
-                    request["priority"],
-                    request_date
-                ))
+            if self.request_list.source is not self.request_source:
+                self.request_list.set_source(self.request_source)
+            else:
+                self.request_list.refresh()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load requests: {e}")
     
     def search_requests(self, event=None):
         search_term = self.search_var.get().lower()
         
-        # Clear the tree
-        for item in self.request_tree.get_children():
-            self.request_tree.delete(item)
+        if not search_term:
+            self.queries.cancel("search")
+            self.load_requests()
+            return
         
-        # Get requests from repository
-        try:
-            if search_term:
-                requests = BloodRequestRepo.search_requests(search_term)
-            else:
-                status = None if self.status_var.get() == "All" else self.status_var.get()
-                requests = BloodRequestRepo.get_all_requests(status)
-            
-            for request in requests:
-                # Format the date
-                request_date = request["request_date"].strftime('%Y-%m-%d') if request["request_date"] else "N/A"
-                
-                self.request_tree.insert("", "end", values=(
-                    request["request_id"],
-                    request["receiver_name"],
-                    request["blood_type"],
-                    f"{request['units_required']}",
-                    request["status"],
-                    request["priority"],
-                    request_date
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to search requests: {e}")
+        # Query off the Tk thread once typing pauses; only the latest result is shown
+        self.queries.submit("search",
+                            lambda: BloodRequestRepo.search_requests(search_term),
+                            self.show_search_results,
+                            lambda e: messagebox.showerror("Error", f"Failed to search requests: {e}"),
+                            delay_ms=SEARCH_DEBOUNCE_MS)
+    
+    def show_search_results(self, requests):
+        self.request_list.set_source(ListDataSource(requests))
+    
+    def on_requests_changed(self, table, ids):
+        # Skip until the frame has been set up (initialization may have failed)
+        if not hasattr(self, "request_list"):
+            return
+        if self.request_list.source is self.request_source:
+            self.request_list.refresh()
+        # Receiver edits only change names in the list; the details panel
+        # follows changes to the request it shows
+        if (table == "blood_requests" and self.selected_request_id is not None
+                and (ids is None or self.selected_request_id in ids)):
+            self.display_request_details(self.selected_request_id)
     
     def filter_by_status(self, event=None):
-        self.load_requests()
+        # A different filter starts again from the top
+        try:
+            self.request_list.set_source(self.request_source)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load requests: {e}")
     
     def on_request_select(self, event=None):
         # Get selected item
@@ -262,6 +282,10 @@ class BloodRequestManagementFrame:
                           command=lambda: self.assign_blood_to_request(request)
                          ).pack(side="left", padx=5, pady=5)
                 
+                ttk.Button(actions_frame, text="Auto-Allocate (FEFO)", 
+                          command=lambda: self.auto_allocate_request(request)
+                         ).pack(side="left", padx=5, pady=5)
+                
         except Exception as e:
             messagebox.showerror("Error", f"Failed to display request details: {e}")
     
@@ -312,9 +336,7 @@ class BloodRequestManagementFrame:
                 blood_type = receiver.get('blood_type', '')
                 if not blood_type:
                     blood_type_id = receiver.get('blood_type_id', 0)
-                    blood_type_map = {1: 'A+', 2: 'A-', 3: 'B+', 4: 'B-', 
-                                     5: 'AB+', 6: 'AB-', 7: 'O+', 8: 'O-'}
-                    blood_type = blood_type_map.get(blood_type_id, 'Unknown')
+                    blood_type = get_blood_types().name_for(blood_type_id) or 'Unknown'
                 self.blood_type_label.config(text=blood_type)
                 
         receiver_combo.bind("<<ComboboxSelected>>", on_receiver_select)
@@ -396,6 +418,40 @@ class BloodRequestManagementFrame:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update request status: {e}")
     
+    def auto_allocate_request(self, request):
+        """Allocate the earliest-expiring available units to the request in one step."""
+        try:
+            result = BloodRequestRepo.allocate_blood_units(request["request_id"])
+            if result is None:
+                messagebox.showwarning("Not Allocated", "This request is no longer Pending or Processing.")
+            elif result["units_allocated"] == 0:
+                messagebox.showwarning("No Units Available", 
+                                     f"No blood units compatible with type {request.get('blood_type')} are available.")
+            else:
+                unit_list = ", ".join(f"#{unit_id}" for unit_id in result["unit_ids"])
+                messagebox.showinfo("Success", 
+                                  f"Allocated {result['units_allocated']} blood units ({unit_list}).\n"
+                                  f"Units fulfilled: {result['units_fulfilled']} / {result['units_required']}")
+            
+            self.load_requests()
+            self.display_request_details(request["request_id"])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to allocate blood units: {e}")
+    
+    def _compatible_unit_values(self, unit):
+        """Treeview values for a unit returned by get_compatible_blood_units."""
+        collection_date = unit["collection_date"].strftime('%Y-%m-%d') if unit["collection_date"] else "N/A"
+        expiry_date = unit["expiration_date"].strftime('%Y-%m-%d') if unit["expiration_date"] else "N/A"
+        return (
+            unit["unit_id"],
+            unit["donor_name"],
+            unit["blood_type"],
+            collection_date,
+            expiry_date,
+            unit["volume_ml"],
+            unit["storage_location"] or "Unknown"
+        )
+    
     def show_assign_blood_units(self):
         if not self.selected_request_id:
             return
@@ -414,7 +470,7 @@ class BloodRequestManagementFrame:
                 
             # Get compatible blood units
             try:
-                compatible_units = BloodRequestRepo.get_compatible_blood_units(request["blood_type_id"])
+                compatible_units = self.blood_unit_repo.get_compatible_blood_units(request["blood_type_id"])
                 
                 if not compatible_units:
                     messagebox.showwarning("No Units", f"No compatible blood units available for blood type {request['blood_type']}")
@@ -497,45 +553,7 @@ class BloodRequestManagementFrame:
             count = 0
             for unit in compatible_units:
                 try:
-                    # Debug info
-                    print(f"Processing unit ID: {unit.get('unit_id', 'unknown')} of type {unit.get('type_name', 'unknown')}")
-                    
-                    # Determine the date column name (could be donation_date or collection_date)
-                    date_column = next((col for col in unit.keys() if col.endswith('_date') and col != 'expiry_date'), None)
-                    print(f"  Found date column: {date_column}")
-                    
-                    # Format dates for display
-                    collection_date = "N/A"
-                    if date_column and unit[date_column]:
-                        collection_date = unit[date_column].strftime('%Y-%m-%d')
-                    
-                    expiry_date = unit["expiry_date"].strftime('%Y-%m-%d') if unit["expiry_date"] else "N/A"
-                    
-                    # Determine location column name (could be location or storage_location)
-                    location_column = "location"  # Default to 'location'
-                    if "storage_location" in unit:
-                        location_column = "storage_location"
-                    
-                    print(f"  Using location column: {location_column}")
-                    print(f"  Location value: {unit.get(location_column, 'Unknown')}")
-                    
-                    # Get donor name
-                    donor_name = unit.get("donor_name", "Unknown Donor")
-                    print(f"  Donor: {donor_name}")
-                    
-                    # Create the values tuple for the treeview item including donor information
-                    values = (
-                        unit["unit_id"],
-                        donor_name,
-                        unit["type_name"],
-                        collection_date,
-                        expiry_date,
-                        unit["volume_ml"],
-                        unit.get(location_column, "Unknown")
-                    )
-                    
-                    print(f"  Inserting values: {values}")
-                    unit_tree.insert("", "end", values=values)
+                    unit_tree.insert("", "end", values=self._compatible_unit_values(unit))
                     count += 1
                 except Exception as e:
                     import traceback
@@ -568,8 +586,16 @@ class BloodRequestManagementFrame:
                     status_label.pack(pady=5)
                     assign_window.update()
                     
-                    # Attempt the assignment
-                    BloodRequestRepo.assign_blood_unit(self.selected_request_id, int(unit_id))
+                    # Assign the unit and count it in one transaction
+                    assignment = BloodRequestRepo.assign_blood_units(self.selected_request_id, [int(unit_id)])
+                    if assignment is None:
+                        status_label.destroy()
+                        messagebox.showerror("Error", f"Request #{self.selected_request_id} is no longer open")
+                        return
+                    if not assignment["units_allocated"]:
+                        status_label.destroy()
+                        messagebox.showerror("Error", f"Blood unit #{unit_id} is no longer available")
+                        return
                     
                     # Success notification
                     status_label.config(text="Assignment successful!", foreground="green")
@@ -579,8 +605,7 @@ class BloodRequestManagementFrame:
                     messagebox.showinfo("Success", f"Blood unit #{unit_id} assigned to request #{self.selected_request_id}")
                     
                     # Check if all units are now assigned
-                    updated_request = BloodRequestRepo.get_request_by_id(self.selected_request_id)
-                    if updated_request["units_assigned"] >= updated_request["units_required"]:
+                    if assignment["units_fulfilled"] >= assignment["units_required"]:
                         assign_window.destroy()
                         self.load_requests()
                         self.display_request_details(self.selected_request_id)
@@ -607,7 +632,7 @@ class BloodRequestManagementFrame:
                     # Refresh the units list to show current availability
                     try:
                         # Get updated list of compatible units
-                        compatible_units = BloodRequestRepo.get_compatible_blood_units(request["blood_type_id"])
+                        compatible_units = self.blood_unit_repo.get_compatible_blood_units(request["blood_type_id"])
                         
                         # Clear the existing tree
                         unit_tree.delete(*unit_tree.get_children())
@@ -616,34 +641,7 @@ class BloodRequestManagementFrame:
                         count = 0
                         for unit in compatible_units:
                             try:
-                                # Determine the date column name (could be donation_date or collection_date)
-                                date_column = next((col for col in unit.keys() if col.endswith('_date') and col != 'expiry_date'), None)
-                                
-                                # Format dates for display
-                                collection_date = "N/A"
-                                if date_column and unit[date_column]:
-                                    collection_date = unit[date_column].strftime('%Y-%m-%d')
-                                
-                                expiry_date = unit["expiry_date"].strftime('%Y-%m-%d') if unit["expiry_date"] else "N/A"
-                                
-                                # Determine location column name
-                                location_column = "location"  # Default
-                                if "storage_location" in unit:
-                                    location_column = "storage_location"
-                                
-                                # Get donor name
-                                donor_name = unit.get("donor_name", "Unknown Donor")
-                                
-                                # Insert the values into the treeview with donor information
-                                unit_tree.insert("", "end", values=(
-                                    unit["unit_id"],
-                                    donor_name,
-                                    unit["type_name"],
-                                    collection_date,
-                                    expiry_date,
-                                    unit["volume_ml"],
-                                    unit.get(location_column, "Unknown")
-                                ))
+                                unit_tree.insert("", "end", values=self._compatible_unit_values(unit))
                                 count += 1
                             except Exception as e:
                                 print(f"Error displaying refreshed unit: {e}")
@@ -691,12 +689,12 @@ class BloodRequestManagementFrame:
                 messagebox.showinfo("Information", "This request already has all required units fulfilled.")
                 return
             
-            # Get matching available blood units
-            available_units = self.blood_unit_repo.get_available_blood_units_by_type(blood_type_id)
+            # Get compatible available blood units, earliest expiry first
+            available_units = self.blood_unit_repo.get_compatible_blood_units(blood_type_id)
             
             if not available_units:
                 messagebox.showwarning("No Units Available", 
-                                     f"No matching blood units of type {request.get('blood_type')} are available.")
+                                     f"No blood units compatible with type {request.get('blood_type')} are available.")
                 return
             
             # Create a new window for blood unit selection
@@ -718,7 +716,7 @@ class BloodRequestManagementFrame:
             ttk.Label(info_frame, text=f"Units Needed: {units_needed}").pack(anchor="w")
             
             # Available blood units list
-            units_frame = ttk.LabelFrame(window, text=f"Available {request['blood_type']} Blood Units", padding=10)
+            units_frame = ttk.LabelFrame(window, text=f"Blood Units Compatible with {request['blood_type']}", padding=10)
             units_frame.pack(fill="both", expand=True, padx=10, pady=10)
             
             # Create a list with checkboxes
@@ -737,11 +735,11 @@ class BloodRequestManagementFrame:
             # Add units to listbox
             unit_map = {}  # Map listbox index to blood unit data
             for i, unit in enumerate(available_units):
-                # Format: Unit ID | Donor | Collection Date | Expiration Date
+                # Format: Unit ID | Blood Type | Donor | Collection Date | Expiration Date
                 collection_date = unit["collection_date"].strftime('%Y-%m-%d') if unit["collection_date"] else "Unknown"
                 expiry_date = unit["expiration_date"].strftime('%Y-%m-%d') if unit["expiration_date"] else "Unknown"
                 
-                display_text = f"Unit #{unit['unit_id']} | {unit['donor_name']} | Collected: {collection_date} | Expires: {expiry_date}"
+                display_text = f"Unit #{unit['unit_id']} | {unit['blood_type']} | {unit['donor_name']} | Collected: {collection_date} | Expires: {expiry_date}"
                 blood_units_list.insert(tk.END, display_text)
                 unit_map[i] = unit
             
@@ -761,37 +759,33 @@ class BloodRequestManagementFrame:
                                          f"You've selected {len(selected_indices)} units but only {units_needed} more are needed. Please select fewer units.")
                     return
                     
-                # Update the status of the selected blood units
-                units_assigned = 0
-                for idx in selected_indices:
-                    unit = unit_map[idx]
-                    try:
-                        self.blood_unit_repo.update_blood_unit_status(unit["unit_id"], "Assigned")
-                        units_assigned += 1
-                    except Exception as e:
-                        messagebox.showerror("Error", f"Failed to assign unit #{unit['unit_id']}: {e}")
+                # Assign the selected units and count them in one statement
+                unit_ids = [unit_map[idx]["unit_id"] for idx in selected_indices]
+                try:
+                    assignment = BloodRequestRepo.assign_blood_units(request["request_id"], unit_ids)
+                except Exception as e:
+                    print(f"Error assigning blood units: {e}")
+                    messagebox.showerror("Error", f"Failed to assign blood units: {e}")
+                    return
+                if assignment is None:
+                    messagebox.showerror("Error", f"Request #{request['request_id']} is no longer open.")
+                    return
+                units_assigned = assignment["units_allocated"]
+                
+                assigned_ids = set(assignment["unit_ids"])
+                skipped = [unit_id for unit_id in unit_ids if unit_id not in assigned_ids]
+                if skipped:
+                    messagebox.showwarning("Units Unavailable",
+                                         f"Blood units {', '.join(f'#{unit_id}' for unit_id in skipped)} are no longer available and were not assigned.")
                 
-                # Update the request's units_fulfilled count
                 if units_assigned > 0:
-                    new_fulfilled = units_fulfilled + units_assigned
-                    try:
-                        print(f"Updating request {request['request_id']} with {new_fulfilled} fulfilled units")
-                        print(f"Original fulfilled: {units_fulfilled}, New assigned: {units_assigned}")
-                        BloodRequestRepo.update_units_fulfilled(request["request_id"], new_fulfilled)
-                        
-                        # Get the updated request
-                        updated_request = BloodRequestRepo.get_request_by_id(request["request_id"])
-                        print(f"After assignment - Status: {updated_request['status']}, Units fulfilled: {updated_request.get('units_fulfilled', 0)}")
-                        
-                        messagebox.showinfo("Success", f"Successfully assigned {units_assigned} blood units to this request.")
-                        
-                        # Close the window and refresh the UI
-                        window.destroy()
-                        self.load_requests()
-                        self.display_request_details(request["request_id"])
-                    except Exception as e:
-                        print(f"Error updating request: {e}")
-                        messagebox.showerror("Error", f"Failed to update request: {e}")
+                    print(f"After assignment - Status: {assignment['status']}, Units fulfilled: {assignment['units_fulfilled']}")
+                    messagebox.showinfo("Success", f"Successfully assigned {units_assigned} blood units to this request.")
+                    
+                    # Close the window and refresh the UI
+                    window.destroy()
+                    self.load_requests()
+                    self.display_request_details(request["request_id"])
             
             ttk.Button(buttons_frame, text="Assign Selected Units", command=assign_selected_units).pack(side="right", padx=5)
             ttk.Button(buttons_frame, text="Cancel", command=window.destroy).pack(side="right", padx=5)
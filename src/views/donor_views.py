@@ -1,13 +1,22 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
+from database.blood_types import get_blood_types
 from database.repositories.donor_repo import DonorRepository
+from views.background import BackgroundQueryExecutor
+from views.virtual_tree import ListDataSource, PagedDataSource, VirtualTreeview
+
+# Wait this long after the last keystroke before searching
+SEARCH_DEBOUNCE_MS = 250
 
 class DonorManagementFrame:
-    def __init__(self, parent_frame):
+    def __init__(self, parent_frame, live_updates=None):
         self.parent = parent_frame
         self.donor_repo = DonorRepository()
+        self.queries = BackgroundQueryExecutor(parent_frame)
         self.setup_ui()
+        if live_updates is not None:
+            live_updates.register(("donors",), self.on_donors_changed)
         
     def setup_ui(self):
         # Clear the parent frame
@@ -32,24 +41,25 @@ class DonorManagementFrame:
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
         search_entry.bind("<KeyRelease>", self.search_donors)
         
-        # Donor list
+        # Donor list; only the visible rows are loaded, sorted by the database
         columns = ("ID", "Name", "Blood Type", "Phone", "Last Donation")
-        self.donor_tree = ttk.Treeview(left_frame, columns=columns, show="headings")
+        self.donor_source = PagedDataSource(self.donor_repo.get_donors_page, self.donor_repo.count_donors,
+                                            sort_by="name")
+        self.donor_list = VirtualTreeview(
+            left_frame, columns, self.donor_source,
+            row_id=lambda donor: donor["donor_id"], row_values=self.donor_row_values,
+            sort_options={"ID": "id", "Name": "name", "Blood Type": "blood_type",
+                          "Phone": "phone", "Last Donation": "last_donation"})
+        self.donor_tree = self.donor_list.tree
         
         # Configure columns
         for col in columns:
-            self.donor_tree.heading(col, text=col)
             width = 100 if col != "Name" else 150
             self.donor_tree.column(col, width=width)
             
-        self.donor_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.donor_list.pack(fill="both", expand=True, padx=5, pady=5)
         self.donor_tree.bind("<<TreeviewSelect>>", self.on_donor_select)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.donor_tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.donor_tree.configure(yscrollcommand=scrollbar.set)
-        
         # Buttons frame
         button_frame = ttk.Frame(left_frame)
         button_frame.pack(fill="x", padx=5, pady=5)
@@ -64,53 +74,52 @@ class DonorManagementFrame:
         # Load donors from database
         self.load_donors()
     
+    def donor_row_values(self, donor):
+        last_donation = donor["last_donation_date"] if donor["last_donation_date"] else "Never"
+        name = f"{donor['first_name']} {donor['last_name']}"
+        
+        return (
+            donor["donor_id"],
+            name,
+            donor["blood_type"],
+            donor["phone_number"],
+            last_donation
+        )
+    
     def load_donors(self):
-        # Clear the tree
-        for item in self.donor_tree.get_children():
-            self.donor_tree.delete(item)
-        
-        # Get donors from repository
+        # Re-read the visible rows and apply only the changes
         try:
-            donors = self.donor_repo.get_all_donors()
-            
-            for donor in donors:
-                last_donation = donor["last_donation_date"] if donor["last_donation_date"] else "Never"
-                name = f"{donor['first_name']} {donor['last_name']}"
-                
-                self.donor_tree.insert("", "end", values=(
-                    donor["donor_id"],
-                    name,
-                    donor["blood_type"],
-                    donor["phone_number"],
-                    last_donation
-                ))
+            if self.donor_list.source is not self.donor_source:
+                self.donor_list.set_source(self.donor_source)
+            else:
+                self.donor_list.refresh()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load donors: {e}")
     
+    def on_donors_changed(self, table, ids):
+        # Changes made elsewhere show up without a manual refresh; search
+        # results are left as they are until the search changes
+        if self.donor_list.source is self.donor_source:
+            self.donor_list.refresh()
+    
     def search_donors(self, event=None):
         search_term = self.search_var.get().lower()
         
-        # Clear the tree
-        for item in self.donor_tree.get_children():
-            self.donor_tree.delete(item)
+        if not search_term:
+            # If search is empty, go back to the paged list
+            self.queries.cancel("search")
+            self.load_donors()
+            return
         
-        # Get donors from repository
-        try:
-            donors = self.donor_repo.search_donors(search_term)
-            
-            for donor in donors:
-                last_donation = donor["last_donation_date"] if donor["last_donation_date"] else "Never"
-                name = f"{donor['first_name']} {donor['last_name']}"
-                
-                self.donor_tree.insert("", "end", values=(
-                    donor["donor_id"],
-                    name,
-                    donor["blood_type"],
-                    donor["phone_number"],
-                    last_donation
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to search donors: {e}")
+        # Query off the Tk thread once typing pauses; only the latest result is shown
+        self.queries.submit("search",
+                            lambda: self.donor_repo.search_donors(search_term),
+                            self.show_search_results,
+                            lambda e: messagebox.showerror("Error", f"Failed to search donors: {e}"),
+                            delay_ms=SEARCH_DEBOUNCE_MS)
+    
+    def show_search_results(self, donors):
+        self.donor_list.set_source(ListDataSource(donors))
     
     def on_donor_select(self, event=None):
         # Clear the right frame
@@ -235,7 +244,7 @@ class DonorManagementFrame:
         
         ttk.Label(scrollable_frame, text="Blood Type:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
         blood_type_combo = ttk.Combobox(scrollable_frame, textvariable=blood_type_var, width=27)
-        blood_type_combo['values'] = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+        blood_type_combo['values'] = get_blood_types().names()
         blood_type_combo.grid(row=4, column=1, padx=5, pady=5)
         
         ttk.Label(scrollable_frame, text="Phone Number:").grid(row=5, column=0, sticky="w", padx=5, pady=5)
@@ -354,7 +363,7 @@ class DonorManagementFrame:
         
         ttk.Label(scrollable_frame, text="Blood Type:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
         blood_type_combo = ttk.Combobox(scrollable_frame, textvariable=blood_type_var, width=27)
-        blood_type_combo['values'] = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+        blood_type_combo['values'] = get_blood_types().names()
         blood_type_combo.grid(row=4, column=1, padx=5, pady=5)
         
         ttk.Label(scrollable_frame, text="Phone Number:").grid(row=5, column=0, sticky="w", padx=5, pady=5)
@@ -565,11 +574,7 @@ class DonorManagementFrame:
             blood_unit_repo = BloodUnitRepository()
             
             # Get blood type ID
-            blood_type_id = None
-            for i, bt in enumerate(['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']):
-                if bt == donor['blood_type']:
-                    blood_type_id = i + 1  # Blood type IDs are 1-based
-                    break
+            blood_type_id = get_blood_types().id_for(donor['blood_type'])
             
             if not blood_type_id:
                 messagebox.showwarning("Warning", "Blood type not recognized. Only donation date updated.")
@@ -0,0 +1,64 @@
+"""
+Live View Updates
+
+Bridges database change notifications (database/notifications.py) to the
+Tk views. Events arrive on the listener thread, are queued, and are
+delivered on the Tk thread a few times per second, merged per table so a
+burst of changes costs each view one refresh.
+"""
+
+import queue
+
+from database.notifications import subscribe
+
+# How often queued change events are delivered to the views
+DELIVERY_INTERVAL_MS = 250
+
+
+class LiveUpdates:
+    def __init__(self, widget, interval_ms=DELIVERY_INTERVAL_MS):
+        """
+        Args:
+            widget: Any Tk widget (normally the root window), used for after()
+        """
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._events = queue.Queue()
+        self._handlers = []
+        self._unsubscribe = subscribe(self._events.put)
+        self._after_id = self.widget.after(self.interval_ms, self._deliver)
+
+    def register(self, tables, handler):
+        """
+        Call handler(table, ids) on the Tk thread when one of `tables` changes.
+        ids is a set of primary keys, or None if the whole table may have changed.
+        """
+        self._handlers.append((frozenset(tables), handler))
+
+    def close(self):
+        self._unsubscribe()
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _deliver(self):
+        changed = {}
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if event.ids is None or changed.get(event.table, set()) is None:
+                changed[event.table] = None
+            else:
+                changed.setdefault(event.table, set()).update(event.ids)
+
+        for table, ids in changed.items():
+            for tables, handler in self._handlers:
+                if table in tables:
+                    try:
+                        handler(table, ids)
+                    except Exception as e:
+                        print(f"Error applying live update for {table}: {e}")
+
+        self._after_id = self.widget.after(self.interval_ms, self._deliver)
@@ -1,14 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import datetime
+from database.blood_types import get_blood_types
 from database.repositories.receiver_repo import ReceiverRepository
+from views.background import BackgroundQueryExecutor
+from views.virtual_tree import ListDataSource, PagedDataSource, VirtualTreeview
 from utils.validation_utils import validate_receiver_data
 
+# Wait this long after the last keystroke before searching
+SEARCH_DEBOUNCE_MS = 250
+
 class ReceiverManagementFrame:
-    def __init__(self, parent_frame):
+    def __init__(self, parent_frame, live_updates=None):
         self.parent = parent_frame
         self.receiver_repo = ReceiverRepository()
+        self.queries = BackgroundQueryExecutor(parent_frame)
         self.setup_ui()
+        if live_updates is not None:
+            live_updates.register(("receivers",), self.on_receivers_changed)
         
     def setup_ui(self):
         # Clear the parent frame
@@ -33,24 +42,25 @@ class ReceiverManagementFrame:
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
         search_entry.bind("<KeyRelease>", self.search_receivers)
         
-        # Receiver list
+        # Receiver list; only the visible rows are loaded, sorted by the database
         columns = ("ID", "Name", "Blood Type", "Hospital", "Reason")
-        self.receiver_tree = ttk.Treeview(left_frame, columns=columns, show="headings")
+        self.receiver_source = PagedDataSource(self.receiver_repo.get_receivers_page,
+                                               self.receiver_repo.count_receivers, sort_by="name")
+        self.receiver_list = VirtualTreeview(
+            left_frame, columns, self.receiver_source,
+            row_id=lambda receiver: receiver["receiver_id"], row_values=self.receiver_row_values,
+            sort_options={"ID": "id", "Name": "name", "Blood Type": "blood_type",
+                          "Hospital": "hospital", "Reason": "reason"})
+        self.receiver_tree = self.receiver_list.tree
         
         # Configure columns
         for col in columns:
-            self.receiver_tree.heading(col, text=col)
             width = 100 if col != "Name" else 150
             self.receiver_tree.column(col, width=width)
             
-        self.receiver_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.receiver_list.pack(fill="both", expand=True, padx=5, pady=5)
         self.receiver_tree.bind("<<TreeviewSelect>>", self.on_receiver_select)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.receiver_tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.receiver_tree.configure(yscrollcommand=scrollbar.set)
-        
         # Buttons frame
         button_frame = ttk.Frame(left_frame)
         button_frame.pack(fill="x", padx=5, pady=5)
@@ -65,88 +75,70 @@ class ReceiverManagementFrame:
         # Load receivers from database
         self.load_receivers()
     
-    def load_receivers(self):
-        # Clear the tree
-        for item in self.receiver_tree.get_children():
-            self.receiver_tree.delete(item)
+    def receiver_row_values(self, receiver):
+        name = f"{receiver['first_name']} {receiver['last_name']}"
         
-        # Get receivers from repository
+        # Get blood type - handle the case where it might be missing
+        blood_type = receiver.get("blood_type", "Unknown")
+        if not blood_type and "blood_type_id" in receiver:
+            # Map blood type ID to string if blood_type is not available
+            blood_type = get_blood_types().name_for(receiver["blood_type_id"]) or "Unknown"
+        
+        return (
+            receiver["receiver_id"],
+            name,
+            blood_type,
+            receiver["hospital_name"],
+            receiver["reason_for_transfusion"][:30] + "..." if len(receiver["reason_for_transfusion"]) > 30 else receiver["reason_for_transfusion"]
+        )
+    
+    def load_receivers(self):
+        # Re-read the visible rows and apply only the changes
         try:
-            # Implement a get_all_receivers method in the ReceiverRepository class
-            receivers = self.receiver_repo.get_all_receivers()
-            
-            for receiver in receivers:
-                name = f"{receiver['first_name']} {receiver['last_name']}"
-                
-                # Get blood type - handle the case where it might be missing
-                blood_type = receiver.get("blood_type", "Unknown")
-                if not blood_type and "blood_type_id" in receiver:
-                    # Map blood type ID to string if blood_type is not available
-                    blood_type_map = {1: 'A+', 2: 'A-', 3: 'B+', 4: 'B-', 
-                                     5: 'AB+', 6: 'AB-', 7: 'O+', 8: 'O-'}
-                    blood_type = blood_type_map.get(receiver["blood_type_id"], "Unknown")
-                
-                self.receiver_tree.insert("", "end", values=(
-                    receiver["receiver_id"],
-                    name,
-                    blood_type,
-                    receiver["hospital_name"],
-                    receiver["reason_for_transfusion"][:30] + "..." if len(receiver["reason_for_transfusion"]) > 30 else receiver["reason_for_transfusion"]
-                ))
+            if self.receiver_list.source is not self.receiver_source:
+                self.receiver_list.set_source(self.receiver_source)
+            else:
+                self.receiver_list.refresh()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load receivers: {e}")
     
+    def on_receivers_changed(self, table, ids):
+        # Changes made elsewhere show up without a manual refresh; search
+        # results are left as they are until the search changes
+        if self.receiver_list.source is self.receiver_source:
+            self.receiver_list.refresh()
+    
     def search_receivers(self, event=None):
         search_term = self.search_var.get().lower()
         
-        # Clear the tree
-        for item in self.receiver_tree.get_children():
-            self.receiver_tree.delete(item)
-        
         if not search_term:
-            # If search is empty, just reload all receivers
+            # If search is empty, go back to the paged list
+            self.queries.cancel("search")
             self.load_receivers()
             return
         
-        # Get receivers from repository
+        # Query off the Tk thread once typing pauses; only the latest result is shown
+        self.queries.submit("search",
+                            lambda: self.receiver_repo.search_receivers(search_term),
+                            lambda receivers: self.show_search_results(receivers, search_term),
+                            lambda e: messagebox.showerror("Error", f"Failed to search receivers: {e}"),
+                            delay_ms=SEARCH_DEBOUNCE_MS)
+    
+    def show_search_results(self, receivers, search_term):
+        def highlight(receiver):
+            # Highlight the row if the term is found in name, blood type, hospital or reason
+            name = f"{receiver['first_name']} {receiver['last_name']}"
+            if (search_term in name.lower() or 
+                search_term in (receiver.get("blood_type") or "").lower() or 
+                search_term in receiver["hospital_name"].lower() or
+                search_term in receiver["reason_for_transfusion"].lower()):
+                return ('highlight',)
+            return ()
+        
         try:
-            # Use the search_receivers method in the ReceiverRepository class
-            receivers = self.receiver_repo.search_receivers(search_term)
-            
-            for receiver in receivers:
-                name = f"{receiver['first_name']} {receiver['last_name']}"
-                
-                # Get blood type - handle the case where it might be missing
-                blood_type = receiver.get("blood_type", "Unknown")
-                if not blood_type and "blood_type_id" in receiver:
-                    # Map blood type ID to string if blood_type is not available
-                    blood_type_map = {1: 'A+', 2: 'A-', 3: 'B+', 4: 'B-', 
-                                     5: 'AB+', 6: 'AB-', 7: 'O+', 8: 'O-'}
-                    blood_type = blood_type_map.get(receiver["blood_type_id"], "Unknown")
-                
-                # Truncate long reason text
-                reason_text = receiver["reason_for_transfusion"]
-                if len(reason_text) > 30:
-                    reason_text = reason_text[:30] + "..."
-                
-                # Insert the item in the tree
-                item_id = self.receiver_tree.insert("", "end", values=(
-                    receiver["receiver_id"],
-                    name,
-                    blood_type,
-                    receiver["hospital_name"],
-                    reason_text
-                ))
-                
-                # Highlight the matching term in the tree if found in name, blood type, or hospital
-                if (search_term in name.lower() or 
-                    search_term in blood_type.lower() or 
-                    search_term in receiver["hospital_name"].lower() or
-                    search_term in receiver["reason_for_transfusion"].lower()):
-                    # Set a highlight color (light yellow background)
-                    self.receiver_tree.item(item_id, tags=('highlight',))
+            self.receiver_list.set_source(ListDataSource(receivers), row_tags=highlight)
             
-            # Configure tag for highlighting
+            # Configure tag for highlighting (light yellow background)
             self.receiver_tree.tag_configure('highlight', background='#FFFF99')
             
             if not receivers:
@@ -193,9 +185,7 @@ class ReceiverManagementFrame:
         blood_type = receiver.get("blood_type", "Unknown")
         if not blood_type and "blood_type_id" in receiver:
             # Map blood type ID to string if blood_type is not available
-            blood_type_map = {1: 'A+', 2: 'A-', 3: 'B+', 4: 'B-', 
-                             5: 'AB+', 6: 'AB-', 7: 'O+', 8: 'O-'}
-            blood_type = blood_type_map.get(receiver["blood_type_id"], "Unknown")
+            blood_type = get_blood_types().name_for(receiver["blood_type_id"]) or "Unknown"
             
         # Format the display in a grid
         row = 0
@@ -305,7 +295,7 @@ class ReceiverManagementFrame:
         
         ttk.Label(personal_frame, text="Blood Type:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
         blood_type_combo = ttk.Combobox(personal_frame, textvariable=blood_type_var, width=27)
-        blood_type_combo['values'] = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+        blood_type_combo['values'] = get_blood_types().names()
         blood_type_combo.grid(row=4, column=1, padx=5, pady=5)
         
         # Medical information fields
@@ -404,38 +394,17 @@ class ReceiverManagementFrame:
             messagebox.showerror("Error", f"Failed to add receiver: {e}")
     
     def get_blood_type_id(self, blood_type):
-        """Get the ID for a blood type from the database or a fallback mapping."""
+        """Get the ID for a blood type from the blood type registry."""
+        blood_types = get_blood_types()
         # Ensure the blood_type is not empty
         if not blood_type:
             print("Warning: Empty blood type provided, defaulting to 'A+'")
-            return 1
-            
-        # Try to get the ID from the database first
-        try:
-            # Make sure we have a connection
-            self.receiver_repo.connect()
-            connection = self.receiver_repo.connection
-                
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT blood_type_id FROM Blood_Types WHERE type_name = %s
-                """, (blood_type,))
-                result = cursor.fetchone()
-                if result:
-                    print(f"Found blood type ID {result[0]} for {blood_type}")
-                    return result[0]
-        except Exception as e:
-            print(f"Error getting blood type ID from database: {e}")
-            import traceback
-            traceback.print_exc()
+            return blood_types.id_for('A+')
         
-        # Fall back to the mapping if database lookup fails
-        blood_type_map = {
-            'A+': 1, 'A-': 2, 'B+': 3, 'B-': 4, 
-            'AB+': 5, 'AB-': 6, 'O+': 7, 'O-': 8
-        }
-        blood_type_id = blood_type_map.get(blood_type, 1)  # Default to 1 if not found
-        print(f"Using mapped blood type ID {blood_type_id} for {blood_type}")
+        blood_type_id = blood_types.id_for(blood_type)
+        if blood_type_id is None:
+            print(f"Warning: Unknown blood type {blood_type!r}, defaulting to 'A+'")
+            return blood_types.id_for('A+')
         return blood_type_id
     
     def show_edit_receiver_form(self, receiver):
@@ -495,7 +464,7 @@ class ReceiverManagementFrame:
         
         ttk.Label(personal_frame, text="Blood Type:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
         blood_type_combo = ttk.Combobox(personal_frame, textvariable=blood_type_var, width=27)
-        blood_type_combo['values'] = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+        blood_type_combo['values'] = get_blood_types().names()
         blood_type_combo.grid(row=4, column=1, padx=5, pady=5)
         
         # Medical information fields
@@ -9,9 +9,14 @@ from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
 from typing import List, Dict, Any
 
-from database.connection import get_connection
-from database.repositories.donor_repo import DonorRepo
 from database.repositories.blood_request_repo import BloodRequestRepo
+from database.repositories.blood_unit_repo import BloodUnitRepository
+from database.repositories.report_repo import REPORTS, ReportRepository
+from utils.report_export import export_report as export_report_csv
+from views.background import BackgroundQueryExecutor
+
+# How often the export progress label is refreshed
+EXPORT_PROGRESS_INTERVAL_MS = 200
 
 class ReportsView(ttk.Frame):
     """Frame for reports generation and display"""
@@ -19,6 +24,13 @@ class ReportsView(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent = parent
+        self.report_repo = ReportRepository()
+        self.queries = BackgroundQueryExecutor(self)
+        
+        # (report name, start date, end date) of the report on screen
+        self.current_export = None
+        self.export_rows = None
+        self.export_status = tk.StringVar()
         
         # Setup UI components
         self.setup_ui()
@@ -61,6 +73,14 @@ class ReportsView(ttk.Frame):
         """Clear the report display area"""
         for widget in self.report_frame.winfo_children():
             widget.destroy()
+        self.current_export = None
+    
+    def add_export_button(self, report_type: str, start_date=None, end_date=None):
+        """Add the export button for the report on screen"""
+        self.current_export = (report_type, start_date, end_date)
+        ttk.Button(self.report_frame, text="Export Report", 
+                  command=self.export_report).pack(pady=10)
+        ttk.Label(self.report_frame, textvariable=self.export_status).pack()
     
     def generate_donor_activity_report(self):
         """Generate a report on donor activity"""
@@ -110,37 +130,8 @@ class ReportsView(ttk.Frame):
                     start_date_str = start_var.get()
                     end_date_str = end_var.get()
                     
-                    connection = get_connection()
-                    try:
-                        with connection:
-                            with connection.cursor() as cursor:
-                                cursor.execute("""
-                                    SELECT 
-                                        d.donor_id, 
-                                        d.first_name, 
-                                        d.last_name, 
-                                        bt.type_name as blood_type,
-                                        COUNT(bu.unit_id) as donation_count
-                                    FROM 
-                                        Donors d
-                                    JOIN 
-                                        Blood_Types bt ON d.blood_type_id = bt.blood_type_id
-                                    LEFT JOIN 
-                                        Blood_Units bu ON d.donor_id = bu.donor_id AND 
-                                        bu.collection_date BETWEEN %s AND %s
-                                    GROUP BY 
-                                        d.donor_id, d.first_name, d.last_name, bt.type_name
-                                    ORDER BY 
-                                        donation_count DESC, d.last_name, d.first_name
-                                """, (start_date_str, end_date_str))
-                                
-                                columns = [desc[0] for desc in cursor.description]
-                                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                    finally:
-                        connection.close()
-                    
                     date_window.destroy()
-                    self.display_donor_activity_report(results, start_date_str, end_date_str)
+                    self.display_donor_activity_report(start_date_str, end_date_str)
                     
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
@@ -151,8 +142,7 @@ class ReportsView(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Error setting up report: {str(e)}")
     
-    def display_donor_activity_report(self, results: List[Dict[str, Any]], 
-                                   start_date: str, end_date: str):
+    def display_donor_activity_report(self, start_date: str, end_date: str):
         """Display donor activity report results"""
         self.clear_report_frame()
         
@@ -161,7 +151,7 @@ class ReportsView(ttk.Frame):
                 font=("Arial", 14, "bold")).pack(pady=(0, 10))
         
         # Create a treeview to display results
-        columns = ("Donor ID", "Donor Name", "Blood Type", "Donations")
+        columns = REPORTS["donor_activity"].headers
         report_tree = ttk.Treeview(self.report_frame, columns=columns, show="headings")
         
         for col in columns:
@@ -177,63 +167,38 @@ class ReportsView(ttk.Frame):
         report_tree.configure(yscrollcommand=scrollbar.set)
         
         # Add data rows
+        total_donors = 0
         total_donations = 0
-        for donor in results:
-            donor_name = f"{donor['first_name']} {donor['last_name']}"
-            donations = donor['donation_count']
-            total_donations += donations
-            
+        for donor in self.report_repo.iter_donor_activity(start_date, end_date):
+            total_donors += 1
+            total_donations += donor["donation_count"]
             report_tree.insert("", "end", values=(
                 donor["donor_id"],
-                donor_name,
+                donor["donor_name"],
                 donor["blood_type"],
-                donations
+                donor["donation_count"]
             ))
         
         # Add summary information
         summary_frame = ttk.Frame(self.report_frame)
         summary_frame.pack(fill="x", pady=10)
         
-        ttk.Label(summary_frame, text=f"Total Donors: {len(results)}",  
+        ttk.Label(summary_frame, text=f"Total Donors: {total_donors}",  
                 font=("Arial", 10, "bold")).pack(side="left", padx=20)
         
         ttk.Label(summary_frame, text=f"Total Donations: {total_donations}", 
                 font=("Arial", 10, "bold")).pack(side="left", padx=20)
         
         # Add export button
-        ttk.Button(self.report_frame, text="Export Report", 
-                  command=lambda: self.export_report("donor_activity")).pack(pady=10)
+        self.add_export_button("donor_activity", start_date, end_date)
     
     def generate_blood_type_inventory(self):
         """Generate a report on current blood type inventory"""
         try:
             self.clear_report_frame()
             
-            connection = get_connection()
-            try:
-                with connection:
-                    with connection.cursor() as cursor:
-                        cursor.execute("""
-                            SELECT 
-                                bt.type_name,
-                                COUNT(CASE WHEN bu.status = 'Available' THEN 1 END) as available_units,
-                                COUNT(CASE WHEN bu.status = 'Used' THEN 1 END) as used_units,
-                                COUNT(CASE WHEN bu.status = 'Expired' THEN 1 END) as expired_units,
-                                COUNT(bu.unit_id) as total_units
-                            FROM 
-                                Blood_Types bt
-                            LEFT JOIN 
-                                Blood_Units bu ON bt.blood_type_id = bu.blood_type_id
-                            GROUP BY 
-                                bt.type_name
-                            ORDER BY 
-                                bt.type_name
-                        """)
-                        
-                        columns = [desc[0] for desc in cursor.description]
-                        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            finally:
-                connection.close()
+            # Counts come from the trigger-maintained inventory summary
+            results = BloodUnitRepository().get_inventory_by_blood_type()
             
             # Report header
             today = datetime.now().strftime("%Y-%m-%d")
@@ -241,7 +206,7 @@ class ReportsView(ttk.Frame):
                     font=("Arial", 14, "bold")).pack(pady=(0, 10))
             
             # Create a treeview to display results
-            columns = ("Blood Type", "Available Units", "Used Units", "Expired Units", "Total Units")
+            columns = REPORTS["blood_inventory"].headers
             report_tree = ttk.Treeview(self.report_frame, columns=columns, show="headings")
             
             for col in columns:
@@ -273,7 +238,7 @@ class ReportsView(ttk.Frame):
                 grand_total += total
                 
                 report_tree.insert("", "end", values=(
-                    item["type_name"],
+                    item["blood_type"],
                     available,
                     used,
                     expired,
@@ -293,8 +258,7 @@ class ReportsView(ttk.Frame):
             ))
             
             # Add export button
-            ttk.Button(self.report_frame, text="Export Report", 
-                      command=lambda: self.export_report("blood_inventory")).pack(pady=10)
+            self.add_export_button("blood_inventory")
         
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
@@ -347,36 +311,8 @@ class ReportsView(ttk.Frame):
                     start_date_str = start_var.get()
                     end_date_str = end_var.get()
                     
-                    connection = get_connection()
-                    try:
-                        with connection:
-                            with connection.cursor() as cursor:
-                                cursor.execute("""
-                                    SELECT 
-                                        bt.type_name,
-                                        br.priority,
-                                        br.status,
-                                        COUNT(br.request_id) as request_count,
-                                        SUM(br.units_required) as total_units_required
-                                    FROM 
-                                        Blood_Requests br
-                                    JOIN 
-                                        Blood_Types bt ON br.blood_type_id = bt.blood_type_id
-                                    WHERE 
-                                        br.request_date BETWEEN %s AND %s
-                                    GROUP BY 
-                                        bt.type_name, br.priority, br.status
-                                    ORDER BY 
-                                        bt.type_name, br.priority
-                                """, (start_date_str, end_date_str))
-                                
-                                columns = [desc[0] for desc in cursor.description]
-                                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                    finally:
-                        connection.close()
-                    
                     date_window.destroy()
-                    self.display_blood_request_summary(results, start_date_str, end_date_str)
+                    self.display_blood_request_summary(start_date_str, end_date_str)
                     
                 except Exception as e:
                     messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
@@ -387,8 +323,7 @@ class ReportsView(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Error setting up report: {str(e)}")
     
-    def display_blood_request_summary(self, results: List[Dict[str, Any]], 
-                                    start_date: str, end_date: str):
+    def display_blood_request_summary(self, start_date: str, end_date: str):
         """Display blood request summary report results"""
         self.clear_report_frame()
         
@@ -397,7 +332,7 @@ class ReportsView(ttk.Frame):
                 font=("Arial", 14, "bold")).pack(pady=(0, 10))
         
         # Create a treeview to display results
-        columns = ("Blood Type", "Priority", "Status", "Request Count", "Units Required")
+        columns = REPORTS["blood_requests"].headers
         report_tree = ttk.Treeview(self.report_frame, columns=columns, show="headings")
         
         for col in columns:
@@ -416,19 +351,15 @@ class ReportsView(ttk.Frame):
         total_requests = 0
         total_units = 0
         
-        for item in results:
-            request_count = item['request_count'] or 0
-            units_required = item['total_units_required'] or 0
-            
-            total_requests += request_count
-            total_units += units_required
-            
+        for item in self.report_repo.iter_request_summary(start_date, end_date):
+            total_requests += item["request_count"]
+            total_units += item["total_units_required"]
             report_tree.insert("", "end", values=(
                 item["type_name"],
                 item["priority"],
                 item["status"],
-                request_count,
-                units_required
+                item["request_count"],
+                item["total_units_required"]
             ))
         
         # Add a separator
@@ -444,8 +375,7 @@ class ReportsView(ttk.Frame):
         ))
         
         # Add export button
-        ttk.Button(self.report_frame, text="Export Report", 
-                  command=lambda: self.export_report("blood_requests")).pack(pady=10)
+        self.add_export_button("blood_requests", start_date, end_date)
     
     def generate_monthly_statistics(self):
         """Generate monthly donation statistics report"""
@@ -456,36 +386,12 @@ class ReportsView(ttk.Frame):
             end_date = datetime.now()
             start_date = datetime(end_date.year - 1, end_date.month, 1)
             
-            connection = get_connection()
-            try:
-                with connection:
-                    with connection.cursor() as cursor:
-                        cursor.execute("""
-                            SELECT 
-                                DATE_TRUNC('month', bu.collection_date) as month,
-                                COUNT(bu.unit_id) as donation_count,
-                                COUNT(DISTINCT bu.donor_id) as unique_donors
-                            FROM 
-                                Blood_Units bu
-                            WHERE 
-                                bu.collection_date BETWEEN %s AND %s
-                            GROUP BY 
-                                DATE_TRUNC('month', bu.collection_date)
-                            ORDER BY 
-                                month
-                        """, (start_date, end_date))
-                        
-                        columns = [desc[0] for desc in cursor.description]
-                        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            finally:
-                connection.close()
-            
             # Report header
             ttk.Label(self.report_frame, text=f"Monthly Donation Statistics ({start_date.strftime('%b %Y')} to {end_date.strftime('%b %Y')})", 
                     font=("Arial", 14, "bold")).pack(pady=(0, 10))
             
             # Create a treeview to display results
-            columns = ("Month", "Number of Donations", "Unique Donors")
+            columns = REPORTS["monthly_statistics"].headers
             report_tree = ttk.Treeview(self.report_frame, columns=columns, show="headings")
             
             for col in columns:
@@ -504,18 +410,13 @@ class ReportsView(ttk.Frame):
             total_donations = 0
             max_unique_donors = 0
             
-            for item in results:
-                month_str = item['month'].strftime("%B %Y")
-                donations = item['donation_count'] or 0
-                unique_donors = item['unique_donors'] or 0
-                
-                total_donations += donations
-                max_unique_donors = max(max_unique_donors, unique_donors)
-                
+            for item in self.report_repo.iter_monthly_statistics(start_date, end_date):
+                total_donations += item["donation_count"]
+                max_unique_donors = max(max_unique_donors, item["unique_donors"])
                 report_tree.insert("", "end", values=(
-                    month_str,
-                    donations,
-                    unique_donors
+                    item["month"],
+                    item["donation_count"],
+                    item["unique_donors"]
                 ))
             
             # Add a separator
@@ -529,19 +430,25 @@ class ReportsView(ttk.Frame):
             ))
             
             # Add export button
-            ttk.Button(self.report_frame, text="Export Report", 
-                      command=lambda: self.export_report("monthly_statistics")).pack(pady=10)
+            self.add_export_button("monthly_statistics", start_date, end_date)
         
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate report: {str(e)}")
     
-    def export_report(self, report_type: str):
+    def export_report(self):
         """Export the current report to a CSV file"""
         try:
-            import csv
             from tkinter import filedialog
             import os
             
+            if self.current_export is None:
+                messagebox.showerror("Error", "No report data found to export")
+                return
+            if self.export_rows is not None:
+                messagebox.showinfo("Export", "An export is already running")
+                return
+            report_type, start_date, end_date = self.current_export
+            
             # Get the date for filename
             today = datetime.now().strftime("%Y%m%d")
             default_filename = f"{report_type}_{today}.csv"
@@ -556,33 +463,35 @@ class ReportsView(ttk.Frame):
             if not file_path:
                 return
             
-            # Find the treeview in the report frame
-            for widget in self.report_frame.winfo_children():
-                if isinstance(widget, ttk.Treeview):
-                    tree = widget
-                    break
-            else:
-                messagebox.showerror("Error", "No report data found to export")
-                return
+            def on_progress(rows):
+                # Called on the export thread; the Tk thread picks it up
+                self.export_rows = rows
             
-            # Get the headers
-            headers = [tree.heading(col)["text"] for col in tree["columns"]]
+            def on_done(rows):
+                self.export_rows = None
+                self.export_status.set(f"Exported {rows} rows")
+                messagebox.showinfo("Export Successful", 
+                                  f"Report exported successfully to {os.path.basename(file_path)}")
             
-            # Get the data
-            data = []
-            for item_id in tree.get_children():
-                values = tree.item(item_id, "values")
-                if values and any(values):  # Skip empty rows
-                    data.append(values)
+            def on_error(error):
+                self.export_rows = None
+                self.export_status.set("")
+                messagebox.showerror("Export Error", f"Failed to export report: {str(error)}")
             
-            # Write to CSV
-            with open(file_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                writer.writerows(data)
-            
-            messagebox.showinfo("Export Successful", 
-                              f"Report exported successfully to {os.path.basename(file_path)}")
+            # The report query is re-run and streamed to the file off the Tk thread
+            self.export_rows = 0
+            self.export_status.set("Exporting...")
+            self.queries.submit("export", lambda: export_report_csv(
+                report_type, file_path, start_date, end_date, progress=on_progress), on_done, on_error)
+            self.after(EXPORT_PROGRESS_INTERVAL_MS, self.show_export_progress)
             
         except Exception as e:
             messagebox.showerror("Export Error", f"Failed to export report: {str(e)}")
+    
+    def show_export_progress(self):
+        """Refresh the export progress label while an export runs"""
+        rows = self.export_rows
+        if rows is None:
+            return
+        self.export_status.set(f"Exporting... {rows} rows written")
+        self.after(EXPORT_PROGRESS_INTERVAL_MS, self.show_export_progress)
@@ -0,0 +1,91 @@
+"""
+Incremental Treeview Updates
+
+TreeviewSync keeps a flat ttk.Treeview in step with a list of rows keyed by
+id. Instead of deleting every item and inserting them all again, sync()
+diffs the new rows against what the tree shows and only deletes, inserts,
+moves or re-renders the rows that changed, so refreshing a long list after
+a single edit costs a handful of Tk calls. Selection and scroll position
+survive a refresh because unchanged items are left alone.
+
+Rows are (iid, values, tags) tuples; iid is the record's primary key.
+"""
+
+from difflib import SequenceMatcher
+
+
+class TreeviewSync:
+    def __init__(self, tree):
+        self.tree = tree
+        # Current contents, in display order, mirrored in Python so diffing
+        # needs no Tk calls: iid -> (values, tags)
+        self._order = []
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._order)
+
+    def clear(self):
+        if self._order:
+            self.tree.delete(*self._order)
+        self._order = []
+        self._rows = {}
+
+    def sync(self, items):
+        """Make the tree show exactly `items`, in order, touching only changed rows."""
+        items = [self._normalize(item) for item in items]
+        new_order = [iid for iid, _, _ in items]
+        new_ids = set(new_order)
+
+        removed = [iid for iid in self._order if iid not in new_ids]
+        if removed:
+            self.tree.delete(*removed)
+            for iid in removed:
+                del self._rows[iid]
+        old_order = [iid for iid in self._order if iid in new_ids]
+
+        # Rows outside the matching blocks were inserted or moved; each is
+        # placed right after its new predecessor, processed in display order
+        matcher = SequenceMatcher(None, old_order, new_order, autojunk=False)
+        for tag, _, _, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            for position in range(j1, j2):
+                iid, values, tags = items[position]
+                if iid in self._rows:
+                    # Detach first so the predecessor's index is not skewed by
+                    # the row's own old position
+                    self.tree.detach(iid)
+                    index = self.tree.index(new_order[position - 1]) + 1 if position else 0
+                    self.tree.move(iid, "", index)
+                else:
+                    index = self.tree.index(new_order[position - 1]) + 1 if position else 0
+                    self.tree.insert("", index, iid=iid, values=values, tags=tags)
+                    self._rows[iid] = (values, tags)
+
+        for iid, values, tags in items:
+            self._update(iid, values, tags)
+
+        self._order = new_order
+
+    def append(self, items):
+        """Add rows at the end (e.g. the next page); rows already shown are updated in place."""
+        for item in items:
+            iid, values, tags = self._normalize(item)
+            if iid in self._rows:
+                self._update(iid, values, tags)
+            else:
+                self.tree.insert("", "end", iid=iid, values=values, tags=tags)
+                self._rows[iid] = (values, tags)
+                self._order.append(iid)
+
+    def _update(self, iid, values, tags):
+        if self._rows[iid] != (values, tags):
+            self.tree.item(iid, values=values, tags=tags)
+            self._rows[iid] = (values, tags)
+
+    @staticmethod
+    def _normalize(item):
+        iid, values = item[0], item[1]
+        tags = item[2] if len(item) > 2 else ()
+        return str(iid), tuple(values), tuple(tags)
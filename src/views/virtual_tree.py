@@ -0,0 +1,272 @@
+"""
+Virtual Treeview
+
+A list widget for tables too large to load into a ttk.Treeview. Only the
+rows in the visible window exist as Tk items; the scrollbar is driven by
+the row count, and rows are pulled from a data source as the window moves.
+Moving the window by a few rows only re-renders the rows that changed
+(see TreeviewSync). Each render also reads OVERSCAN_ROWS rows above and
+below the window from the source, so the blocks that short scrolls move
+into are already cached when they are reached.
+
+PagedDataSource reads a repository's *_page method in blocks. Blocks are
+fetched with the previous block's keyset key when it is known (scrolling)
+and with OFFSET otherwise (dragging the scrollbar far down), and the
+blocks around the window are kept in a small LRU cache. Clicking a column
+heading re-sorts through the repository's ORDER BY whitelist.
+"""
+
+from tkinter import ttk
+from collections import OrderedDict
+
+from database.repositories.paging import DEFAULT_PAGE_SIZE
+from views.tree_sync import TreeviewSync
+
+# Blocks of rows kept in memory per list
+MAX_CACHED_BLOCKS = 20
+
+DEFAULT_ROW_HEIGHT = 20
+
+# Rows read from the data source above and below the visible window
+OVERSCAN_ROWS = 20
+
+
+class PagedDataSource:
+    """Rows of a repository-backed list, fetched and cached in blocks."""
+
+    def __init__(self, fetch_page, count, sort_by=None, descending=False,
+                 block_size=DEFAULT_PAGE_SIZE, max_blocks=MAX_CACHED_BLOCKS):
+        """
+        Args:
+            fetch_page: Callable (after, limit, sort_by, descending, offset) ->
+                (rows, next_after), e.g. DonorRepository.get_donors_page
+            count: Callable () -> total number of rows
+            sort_by: Initial sort option of the repository
+            descending: Initial sort direction
+        """
+        self.fetch_page = fetch_page
+        self.count = count
+        self.sort_by = sort_by
+        self.descending = descending
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.sortable = True
+        self._total = None
+        self._blocks = OrderedDict()
+        # block index -> keyset key of its last row, i.e. where the next block starts
+        self._anchors = {}
+
+    def total(self):
+        if self._total is None:
+            self._total = self.count()
+        return self._total
+
+    def invalidate(self):
+        """Forget cached rows and the row count, e.g. after data changed."""
+        self._total = None
+        self._blocks.clear()
+        self._anchors.clear()
+
+    def set_sort(self, sort_by, descending):
+        self.sort_by = sort_by
+        self.descending = descending
+        self.invalidate()
+
+    def rows(self, start, stop):
+        """Rows start..stop-1 of the list."""
+        rows = []
+        first_block = start // self.block_size
+        last_block = (max(stop, start + 1) - 1) // self.block_size
+        for index in range(first_block, last_block + 1):
+            block = self._block(index)
+            block_start = index * self.block_size
+            rows.extend(block[max(start - block_start, 0):stop - block_start])
+        return rows
+
+    def _block(self, index):
+        if index in self._blocks:
+            self._blocks.move_to_end(index)
+            return self._blocks[index]
+
+        if index == 0:
+            after, offset = None, 0
+        elif (index - 1) in self._anchors:
+            after, offset = self._anchors[index - 1], 0
+        else:
+            after, offset = None, index * self.block_size
+
+        rows, next_after = self.fetch_page(after, self.block_size, self.sort_by,
+                                           self.descending, offset)
+        if next_after is not None:
+            self._anchors[index] = next_after
+
+        self._blocks[index] = rows
+        if len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return rows
+
+
+class ListDataSource:
+    """A fixed list of rows, e.g. search results; not re-sortable."""
+
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.sortable = False
+        self.sort_by = None
+        self.descending = False
+
+    def total(self):
+        return len(self._rows)
+
+    def invalidate(self):
+        pass
+
+    def rows(self, start, stop):
+        return self._rows[start:stop]
+
+
+class VirtualTreeview(ttk.Frame):
+    def __init__(self, parent, columns, data_source, row_id, row_values,
+                 sort_options=None, row_tags=None, **kwargs):
+        """
+        Args:
+            parent: Parent widget
+            columns: Column headings
+            data_source: A PagedDataSource or ListDataSource
+            row_id: Callable (row) -> primary key, used as the item iid
+            row_values: Callable (row) -> tuple of column values
+            sort_options: {heading: repository sort option} for sortable columns
+            row_tags: Optional callable (row) -> tuple of item tags
+        """
+        super().__init__(parent, **kwargs)
+        self.columns = tuple(columns)
+        self.source = data_source
+        self.row_id = row_id
+        self.row_values = row_values
+        self.row_tags = row_tags
+        self.sort_options = sort_options or {}
+        self.top = 0
+        self.visible_rows = 10
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", selectmode="browse")
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by_column(c))
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.items = TreeviewSync(self.tree)
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self.visible_rows) or "break")
+        self._update_headings()
+
+    def set_source(self, data_source, row_tags=None):
+        """Show a different data source (e.g. search results) from the top, freshly read."""
+        self.source = data_source
+        self.row_tags = row_tags
+        self.top = 0
+        self.source.invalidate()
+        self._update_headings()
+        self.render()
+
+    def refresh(self):
+        """Re-read the data and re-render only the rows that changed."""
+        self.source.invalidate()
+        self.render()
+
+    def sort_by_column(self, column):
+        """Sort on a column heading; clicking the same heading again reverses it."""
+        sort_by = self.sort_options.get(column)
+        if sort_by is None or not self.source.sortable:
+            return
+        descending = not self.source.descending if sort_by == self.source.sort_by else False
+        self.source.set_sort(sort_by, descending)
+        self.top = 0
+        self._update_headings()
+        self.render()
+
+    def render(self):
+        """Show the rows of the current window."""
+        total = self.source.total()
+        self.top = max(0, min(self.top, total - self.visible_rows))
+        if total:
+            start = max(0, self.top - OVERSCAN_ROWS)
+            stop = min(self.top + self.visible_rows + OVERSCAN_ROWS, total)
+            rows = self.source.rows(start, stop)
+            # Only the visible slice becomes Tk items
+            rows = rows[self.top - start:self.top - start + self.visible_rows]
+        else:
+            rows = []
+        self.items.sync(
+            (self.row_id(row), self.row_values(row), self.row_tags(row) if self.row_tags else ())
+            for row in rows)
+
+        if total:
+            self.scrollbar.set(self.top / total, min(self.top + self.visible_rows, total) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.top + rows)
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, self.source.total() - self.visible_rows))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(value) * self.source.total()))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self._scroll_by(int(value) * step)
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_arrow(self, direction):
+        """Scroll when the keyboard selection moves past the window edge."""
+        focus = self.tree.focus()
+        children = self.tree.get_children()
+        if not focus or not children:
+            return None
+        at_edge = focus == (children[-1] if direction > 0 else children[0])
+        if not at_edge:
+            return None
+
+        old_top = self.top
+        self._scroll_by(direction)
+        if self.top == old_top:
+            return "break"
+        children = self.tree.get_children()
+        target = children[-1] if direction > 0 else children[0]
+        self.tree.focus(target)
+        self.tree.selection_set(target)
+        return "break"
+
+    def _on_configure(self, event):
+        row_height = ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT
+        try:
+            row_height = int(row_height)
+        except (TypeError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        # One row's worth of height goes to the headings
+        visible_rows = max(1, event.height // row_height - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.render()
+
+    def _update_headings(self):
+        for col in self.columns:
+            text = col
+            if self.source.sortable and self.sort_options.get(col) == self.source.sort_by:
+                text += " ▼" if self.source.descending else " ▲"
+            self.tree.heading(col, text=text)